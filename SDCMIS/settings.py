@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'sdcmisapp.middleware.MetricsMiddleware',  # First, so it times the whole request (see sdcmisapp/metrics.py)
+    'sdcmisapp.middleware.ReplicaMiddleware',  # Reads the read-only pages from a replica (see sdcmisapp/replicas.py)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +60,19 @@ ROOT_URLCONF = 'SDCMIS.urls'
 
 AUTH_USER_MODEL = 'sdcmisapp.CustomUser'
 
+# Loads request.user from the cache when it can (see sdcmisapp/backends.py)
+AUTHENTICATION_BACKENDS = ['sdcmisapp.backends.CachedModelBackend']
+
+# Sessions travel in a signed cookie, so an authenticated request reads neither
+# the database nor the cache for them. They are revoked through the session auth
+# hash the auth middleware checks on every request: changing the password ends the
+# user's sessions, and a deactivated user is refused by the backend. Only
+# JSON-serializable values can be stored in the session.
+# Messages travel in a signed cookie too, so showing one does not write the session.
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -101,6 +116,36 @@ DATABASES = {
 # }
 
 
+# Read replicas (see sdcmisapp/replicas.py): the dashboard, record, search, export and
+# overview pages read the case data from one of these DATABASES aliases; everything
+# else, and every write, uses 'default'. Leave empty to use the primary only.
+
+DATABASE_ROUTERS = ['sdcmisapp.replicas.ReplicaRouter']
+
+SDCMIS_READ_REPLICAS = []
+
+# After a request that wrote, the client reads from the primary for this many seconds,
+# so it sees its own changes whatever the replication lag
+
+SDCMIS_REPLICA_PIN_SECONDS = 5
+
+# To try it locally, with two SQLite files standing in for primary and replica
+# (python manage.py migrate, then python manage.py sync_sqlite_replicas to "replicate"):
+#
+# DATABASES = {
+#     'default': {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db.sqlite3',
+#     },
+#     'replica': {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db-replica.sqlite3',
+#         'TEST': {'MIRROR': 'default'},
+#     },
+# }
+# SDCMIS_READ_REPLICAS = ['replica']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -143,3 +188,73 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Dashboard / listing pagination (keyset based, see sdcmisapp/pagination.py)
+# Can be overridden per request with ?page_size=, up to SDCMIS_MAX_PAGE_SIZE
+
+SDCMIS_PAGE_SIZE = 25
+
+SDCMIS_MAX_PAGE_SIZE = 200
+
+
+# Cache shared by every worker process (required). The dashboard payloads,
+# logged-in users, routing rosters and the holiday calendar are cached here, and
+# invalidated by signals in the process that made the change: only a cache that
+# all workers share lets those invalidations reach the others. A per-process
+# backend (locmem, the default when CACHES is not set) would keep serving stale
+# entries in the other workers, and fails the startup check sdcmisapp.E001.
+# Needs a Redis server and the redis package (see README.md).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
+
+# Per-user dashboard cache (see sdcmisapp/dashboard_cache.py)
+# Entries are invalidated by signals whenever one of the user's records changes.
+# Name a CACHES alias here to keep them apart from the other cached data.
+
+SDCMIS_DASHBOARD_CACHE = 'default'
+
+SDCMIS_DASHBOARD_CACHE_TIMEOUT = 300
+
+
+# Serve the dashboard, record and workflow views with their async versions
+# (sdcmisapp/async_views.py). Only useful when deployed with an ASGI server
+# (SDCMIS/asgi.py), e.g. uvicorn SDCMIS.asgi:application
+
+SDCMIS_ASYNC_VIEWS = False
+
+
+# Auto-assignment when routing (sdcmisapp/assignment.py) picks the investigator
+# with the lowest workload: open cases + this weight x overdue cases (0 = open cases only)
+
+SDCMIS_AUTO_ASSIGN_OVERDUE_WEIGHT = 0
+
+
+# Per-view latency / SQL metrics, served in the Prometheus text format at /metrics
+# to admins. Prometheus cannot log in, so it can instead send
+# "Authorization: Bearer <token>" with this token (leave empty to disable).
+
+SDCMIS_METRICS_TOKEN = ''
+
+
+# How long a logged-in user may be served from the cache (see sdcmisapp/backends.py).
+# Saving a user invalidates it at once in the shared cache; this only bounds how
+# long an entry that was somehow missed can live.
+
+SDCMIS_USER_CACHE_TIMEOUT = 60
+
+
+# Login throttle (see sdcmisapp/throttle.py): (attempts, seconds) per username and per
+# client address. A bucket allows that many attempts at once and refills them over
+# that many seconds; attempts beyond it are refused before the password is hashed.
+
+SDCMIS_LOGIN_THROTTLE = {
+    'username': (5, 300),
+    'ip': (30, 60),
+}
@@ -1,9 +1,15 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.shortcuts import render
+from django.urls import path
 
 # Register your models here.
 
-from . models import iec_records, CustomUser
+from . models import iec_records, CustomUser, Holiday
+from .importer import read_rows, import_records, ImportFileError, IMPORT_COLUMNS, SUPPORTED_EXTENSIONS
+from .backends import invalidate_cached_users
+from .roster import invalidate_rosters
 
 class CustomUserAdmin(BaseUserAdmin):
     # Add 'role', 'location', 'designation' to the fieldsets for editing users
@@ -21,9 +27,62 @@ class CustomUserAdmin(BaseUserAdmin):
     actions = ['approve_selected_users']
 
     def approve_selected_users(self, request, queryset):
+        users = list(queryset.values_list('pk', 'location'))
         queryset.update(is_active=True)
+        # update() skips the signals that keep the routing rosters and cached users current
+        invalidate_rosters({location for _, location in users})
+        invalidate_cached_users([pk for pk, _ in users])
         self.message_user(request, f"{queryset.count()} selected users have been approved and activated.")
     approve_selected_users.short_description = "Approve selected users"
 
-admin.site.register(iec_records)
+class IecImportForm(forms.Form):
+    file = forms.FileField(help_text=f"CSV or XLSX with the columns: {', '.join(IMPORT_COLUMNS)}.")
+    created_by = forms.ModelChoiceField(
+        queryset=CustomUser.objects.filter(is_active=True).order_by('username'),
+        help_text="Recorded as creator and initial assignee; their location is used for the IEC reference numbers.",
+    )
+
+
+class IecRecordsAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/sdcmisapp/iec_records/change_list.html'
+
+    def get_urls(self):
+        custom_urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='sdcmisapp_iec_records_import'),
+        ]
+        return custom_urls + super().get_urls()
+
+    def import_view(self, request):
+        result = None
+        if request.method == "POST":
+            form = IecImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                try:
+                    result = import_records(read_rows(upload.file, upload.name), created_by=form.cleaned_data['created_by'])
+                except ImportFileError as e:
+                    form.add_error('file', str(e))
+                else:
+                    level = messages.SUCCESS if not result.errors else messages.WARNING
+                    self.message_user(request, f"{result.created} record(s) imported, {len(result.errors)} row(s) with errors.", level)
+        else:
+            form = IecImportForm(initial={'created_by': request.user})
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import IEC records",
+            'form': form,
+            'result': result,
+            'supported_extensions': SUPPORTED_EXTENSIONS,
+        }
+        return render(request, 'admin/sdcmisapp/iec_records/import.html', context)
+
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name')
+    date_hierarchy = 'date'
+    search_fields = ('name',)
+
+admin.site.register(iec_records, IecRecordsAdmin)
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(Holiday, HolidayAdmin)
@@ -0,0 +1,192 @@
+"""
+Read-only JSON API over the case records, for the regional offices' own tooling.
+
+    GET /api/records/   iec_records
+    GET /api/ier/       InitialEvaluationReport
+    GET /api/pci/       PreChargeInvestigation
+
+Query parameters (all optional):
+    fields=iec_ref,status,due_date   Fields to return; only those columns are selected
+    status=, location=, assignee=    Filter on the case's status, creator location (e.g. ncr), assignee user id
+    page_size=, cursor=              Keyset pagination, follow "next" until it is null
+
+Users see the same records as on their dashboard. The session login is used
+(no login redirect: unauthenticated requests get a 401 JSON response).
+"""
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .models import iec_records, InitialEvaluationReport, PreChargeInvestigation
+from .pagination import KeysetPaginator, InvalidCursor, get_page_size
+
+
+class ApiError(Exception):
+    """Raised for invalid API parameters; the message is returned to the client with a 400."""
+
+
+class ApiResource:
+    """
+    A listable model: the fields it exposes (API name -> values() lookup), the
+    fields returned when ?fields= is not given and the keyset ordering.
+    `record_path` is the lookup from the model to its iec_records row ('' for iec_records itself).
+    """
+    def __init__(self, model, fields, default_fields, ordering, record_path=''):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.record_path = record_path
+        # The ordering fields are always selected, cursors are built from them
+        self.key_fields = [field.lstrip('-') for field in ordering]
+
+    def selected_fields(self, params):
+        """Returns the API field names asked for with ?fields=. Raises ApiError for unknown names."""
+        if not params.get('fields'):
+            return list(self.default_fields)
+        names = list(dict.fromkeys(name.strip() for name in params['fields'].split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ApiError(f"Unknown field(s): {', '.join(unknown) or '(none given)'}. Available: {', '.join(self.fields)}.")
+        return names
+
+    def queryset(self, user, params):
+        """The user's visible rows, filtered by ?status=, ?location= and ?assignee=."""
+        records = iec_records.objects.for_user(user).apply_list_filters({
+            'status': params.get('status'),
+            'location': params.get('location'),
+        })
+        if params.get('assignee'):
+            try:
+                records = records.filter(assigned_to_id=int(params['assignee']))
+            except ValueError:
+                raise ApiError("assignee must be a user id.")
+        if not self.record_path:
+            return records
+        return self.model.objects.filter(**{f'{self.record_path}__in': records.values('id')})
+
+
+RESOURCES = {
+    'records': ApiResource(
+        iec_records,
+        fields={
+            'id': 'id',
+            'iec_ref': 'iec_ref',
+            'date_received': 'date_received',
+            'date_created': 'date_created',
+            'complainant': 'complainant',
+            'respondent': 'respondent',
+            'charge': 'charge',
+            'remarks': 'remarks',
+            'status': 'status',
+            'due_date': 'due_date',
+            'is_overdue': 'is_overdue',
+            'overdue_since': 'overdue_since',
+            'created_by': 'created_by_id',
+            'assigned_to': 'assigned_to_id',
+            'location': 'created_by__location',  # Joins the creator only when asked for
+        },
+        default_fields=('id', 'iec_ref', 'status', 'due_date', 'assigned_to'),
+        ordering=('-id',),
+    ),
+    'ier': ApiResource(
+        InitialEvaluationReport,
+        fields={
+            'iec_record': 'iec_record',
+            'iec_ref': 'iec_record__iec_ref',
+            'submitted_by': 'submitted_by_id',
+            'submitted_on': 'submitted_on',
+            'director_approval_date': 'director_approval_date',
+            'remarks': 'remarks',
+        },
+        default_fields=('iec_record', 'submitted_on', 'director_approval_date'),
+        ordering=('-iec_record',),
+        record_path='iec_record',
+    ),
+    'pci': ApiResource(
+        PreChargeInvestigation,
+        fields={
+            'iec_record': 'iec_record',
+            'iec_ref': 'iec_record__iec_ref',
+            'precharge_no': 'precharge_no',
+            'notice_pci_submitted_by': 'notice_pci_submitted_by_id',
+            'notice_pci_submitted_on': 'notice_pci_submitted_on',
+            'notice_pci_respondent_received_on': 'notice_pci_respondent_received_on',
+            'notice_pci_remarks': 'notice_pci_remarks',
+            'comment_counter_affidavit_received_on': 'comment_counter_affidavit_received_on',
+            'comment_counter_affidavit_remarks': 'comment_counter_affidavit_remarks',
+            'pci_report_submitted_by': 'pci_report_submitted_by_id',
+            'pci_report_submitted_on': 'pci_report_submitted_on',
+            'pci_report_remarks': 'pci_report_remarks',
+        },
+        default_fields=('iec_record', 'precharge_no', 'notice_pci_submitted_on', 'comment_counter_affidavit_received_on'),
+        ordering=('-iec_record',),
+        record_path='iec_record',
+    ),
+}
+
+
+def api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_error("Authentication required.", status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def list_resource(request, resource):
+    """Returns one page of a resource as {"results": [...], "next": url, "previous": url}."""
+    try:
+        names = resource.selected_fields(request.GET)
+        queryset = resource.queryset(request.user, request.GET)
+    except ApiError as e:
+        return api_error(str(e))
+
+    # Select only the requested columns, plus the keyset ordering fields the cursors are built from
+    lookups = {name: resource.fields[name] for name in names}
+    columns = list(dict.fromkeys([*lookups.values(), *resource.key_fields]))
+    paginator = KeysetPaginator(queryset.values(*columns), page_size=get_page_size(request), ordering=resource.ordering)
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return api_error("Invalid cursor.")
+
+    return JsonResponse({
+        'results': [{name: row[lookup] for name, lookup in lookups.items()} for row in page],
+        'next': _page_link(request, page.next_cursor),
+        'previous': _page_link(request, page.previous_cursor),
+    }, encoder=DjangoJSONEncoder)
+
+
+@require_GET
+@api_login_required
+def records(request):
+    return list_resource(request, RESOURCES['records'])
+
+
+@require_GET
+@api_login_required
+def initial_evaluation_reports(request):
+    return list_resource(request, RESOURCES['ier'])
+
+
+@require_GET
+@api_login_required
+def pre_charge_investigations(request):
+    return list_resource(request, RESOURCES['pci'])
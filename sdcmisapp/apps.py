@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class sdcmisappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sdcmisapp'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401 (registers the checks, connects the signal receivers)
+        from . import metrics
+        metrics.install()  # Times SQL queries for the per-view metrics
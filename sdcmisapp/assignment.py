@@ -0,0 +1,72 @@
+"""
+Workload-balanced auto-assignment: routes a case to the eligible investigator
+with the fewest open cases (optionally counting each overdue case extra, see
+SDCMIS_AUTO_ASSIGN_OVERDUE_WEIGHT).
+"""
+import heapq
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from .workflow_def import RESOLVED_STEP_KEY
+
+
+def _locked_workloads(candidates, today=None, overdue_weight=None):
+    """
+    The candidates annotated with their workload (open cases + overdue_weight x overdue
+    cases), lightest first (ties by username).
+
+    Call it inside the transaction that assigns the cases: the candidates' rows are
+    locked first, so concurrent auto-assignments to the same users wait for each
+    other and each sees the cases assigned before it.
+    """
+    today = today or date.today()
+    if overdue_weight is None:
+        overdue_weight = getattr(settings, 'SDCMIS_AUTO_ASSIGN_OVERDUE_WEIGHT', 0)
+
+    # Lock in id order, so two routings over overlapping candidates cannot deadlock
+    candidate_ids = list(candidates.select_for_update().order_by('pk').values_list('pk', flat=True))
+    if not candidate_ids:
+        return []
+
+    # One grouped aggregate over the (assigned_to, status) index
+    open_cases = Q(assigned_iec_records__status__ne=RESOLVED_STEP_KEY)
+    return list(
+        candidates.model.objects.filter(pk__in=candidate_ids)
+        .annotate(
+            open_cases=Count('assigned_iec_records', filter=open_cases),
+            overdue_cases=Count('assigned_iec_records', filter=open_cases & Q(assigned_iec_records__due_date__lt=today)),
+        )
+        .annotate(workload=F('open_cases') + F('overdue_cases') * overdue_weight)
+        .order_by('workload', 'username')
+    )
+
+
+def least_loaded(candidates, today=None, overdue_weight=None):
+    """
+    Returns the user in the candidates queryset with the lowest workload
+    (ties go to the first username), or None if there are no candidates.
+    Call it inside the transaction that assigns the case (see _locked_workloads()).
+    """
+    users = _locked_workloads(candidates, today, overdue_weight)
+    return users[0] if users else None
+
+
+def spread(candidates, count, today=None, overdue_weight=None):
+    """
+    least_loaded() for count new cases at once: each goes to the candidate with the
+    lowest workload counting the cases handed out before it.
+    Returns count users (an empty list if there are no candidates).
+    """
+    users = _locked_workloads(candidates, today, overdue_weight)
+    if not users:
+        return []
+    heap = [(user.workload, user.username, index) for index, user in enumerate(users)]
+    heapq.heapify(heap)
+    assignees = []
+    for _ in range(count):
+        workload, username, index = heapq.heappop(heap)
+        assignees.append(users[index])
+        heapq.heappush(heap, (workload + 1, username, index))
+    return assignees
@@ -0,0 +1,219 @@
+"""
+Async versions of the dashboard, record and workflow views, for serving SDCMIS under ASGI
+(SDCMIS/asgi.py with uvicorn, daphne...). They are routed instead of the views in views.py
+when SDCMIS_ASYNC_VIEWS is True (see urls.py); behaviour and templates are the same.
+
+Reads use the async ORM and independent queries are awaited together with asyncio.gather.
+Form validation, transactions and template rendering stay synchronous code (run through
+sync_to_async), reusing the helpers from views.py.
+"""
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect, aget_object_or_404
+
+from .forms import RouteTaskForm, NoticePCISubmissionForm, CommentCounterAffidavitSubmissionForm
+from .models import iec_records, PreChargeInvestigation, CaseTransition
+from .workflow_def import get_initial_status_key, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY
+from .transitions import check_transition, TransitionError, ACTOR_CREATOR
+from .pagination import InvalidCursor
+from .roster import arouting_choices
+from .summary import adashboard_summary
+from .dashboard_rows import build_dashboard_rows
+from . import dashboard_cache
+from .views import (
+    _dashboard_listing, _eligible_routing_users, _route_case, _save_notice_pci, _save_comment_counter_affidavit,
+)
+
+
+arender = sync_to_async(render)
+
+
+async def _alist(queryset):
+    return [item async for item in queryset]
+
+#  DASHBOARD
+
+async def _abuild_dashboard_payload(request, user, params, today):
+    """Async version of views._build_dashboard_payload(): the page and the summary are fetched together."""
+    records_qs, paginator = _dashboard_listing(request, user, params, today)
+    page, summary = await asyncio.gather(
+        paginator.aget_page(params.get('cursor')), # Raises InvalidCursor
+        adashboard_summary(records_qs, user),
+    )
+    return {
+        'records': build_dashboard_rows(page, user),
+        'page': page,
+        **summary,
+    }
+
+
+@login_required(login_url='login')
+async def dashboard(request):
+    user = await request.auser()
+    today = date.today()
+
+    params = request.GET.copy()
+    page_query = params.copy()
+    page_query.pop('cursor', None)
+
+    try:
+        payload = await dashboard_cache.aget_or_build(user, params, today, lambda: _abuild_dashboard_payload(request, user, params, today))
+    except InvalidCursor:
+        messages.warning(request, "That page link is no longer valid. Showing the first page.")
+        payload = await dashboard_cache.aget_or_build(user, page_query, today, lambda: _abuild_dashboard_payload(request, user, page_query, today))
+
+    context = {
+        **payload,
+        'page_query': page_query.urlencode(),
+        'sort': params.get('sort'),
+        'overdue_only': bool(params.get('overdue')),
+        'current_date': today,
+    }
+    return await arender(request, 'sdcmisapp/dashboard.html', context=context)
+
+# read view single record
+
+@login_required(login_url='login')
+async def view_iec(request, pk):
+    timeline = CaseTransition.objects.timeline(pk).select_related('actor', 'to_assignee')
+    record, transitions = await asyncio.gather(
+        aget_object_or_404(iec_records, id=pk),
+        _alist(timeline),
+    )
+    return await arender(request, 'sdcmisapp/view_iec.html', context={'iec_records': record, 'transitions': transitions})
+
+# workflow steps
+
+@login_required(login_url='login')
+async def acknowledge_and_route(request, pk):
+    user = await request.auser()
+    eligible_users_qs = _eligible_routing_users(user)
+
+    # The record and the cached roster of users to route to do not depend on each other
+    record, eligible_users_choices = await asyncio.gather(
+        aget_object_or_404(iec_records, id=pk),
+        arouting_choices(user),
+    )
+    eligible_users_exist = bool(eligible_users_choices)
+
+    try:
+        check_transition(record, user, get_initial_status_key(), actor=ACTOR_CREATOR, action="this routing action")
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect('dashboard')
+
+    if request.method == "POST":
+        form = RouteTaskForm(request.POST, eligible_users_queryset=eligible_users_qs, eligible_users_choices=eligible_users_choices)
+        if await sync_to_async(form.is_valid)():
+            try:
+                next_workflow_step, ier_created, next_assignee = await sync_to_async(_route_case)(record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
+                return redirect('dashboard')
+
+            if not ier_created:
+                messages.warning(request, f"Initial Evaluation Report for {record.iec_ref} already exists. Proceeding with routing.")
+            messages.success(request, f"Initial Evaluation Report for {record.iec_ref} submitted and task routed to {next_assignee.username} for '{next_workflow_step.description}'.")
+            return redirect('dashboard')
+        messages.error(request, "Please correct the errors below.")
+    else:
+        form = RouteTaskForm(eligible_users_queryset=eligible_users_qs, eligible_users_choices=eligible_users_choices)
+        if not eligible_users_exist:
+            messages.warning(request, "There are no other active IER or PCI Investigators in your location to route this task to.")
+
+    context = {
+        'record': record,
+        'form': form,
+        'eligible_users_exist': eligible_users_exist
+    }
+    return await arender(request, 'sdcmisapp/acknowledge_route_confirm.html', context)
+
+
+async def _aget_record_and_pci(pk):
+    """Fetches a record (404 if missing) and its PreChargeInvestigation (None if missing) together."""
+    return await asyncio.gather(
+        aget_object_or_404(iec_records.objects.select_related('assigned_to'), id=pk),
+        PreChargeInvestigation.objects.filter(iec_record_id=pk).afirst(),
+    )
+
+
+@login_required(login_url='login')
+async def submit_notice_pci(request, pk):
+    user = await request.auser()
+    iec_record, pci_record = await _aget_record_and_pci(pk)
+
+    if pci_record is None:
+        messages.error(request, f"Pre-Charge Investigation details not found for {iec_record.iec_ref}. This record should have been created when the case was assigned for PCI. Please contact admin.")
+        return redirect('view_iec', pk=iec_record.id)
+
+    try:
+        current_step_config = check_transition(iec_record, user, NOTICE_PCI_STEP_KEY, action="submitting the Notice of PCI")
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect('view_iec', pk=iec_record.id)
+
+    if request.method == "POST":
+        form = NoticePCISubmissionForm(request.POST, instance=pci_record)
+        if await sync_to_async(form.is_valid)():
+            try:
+                next_workflow_step = await sync_to_async(_save_notice_pci)(iec_record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
+                return redirect('dashboard')
+
+            messages.success(request, f"Notice of Pre-Charge Investigation for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
+            return redirect('dashboard')
+        messages.error(request, "Please correct the errors below.")
+    else:
+        form = NoticePCISubmissionForm(instance=pci_record)
+
+    context = {
+        'form': form,
+        'iec_record': iec_record,
+        'pci_record': pci_record,
+        'current_step_description': current_step_config.description
+    }
+    return await arender(request, 'sdcmisapp/submit_notice_pci.html', context)
+
+
+@login_required(login_url='login')
+async def submit_comment_counter_affidavit(request, pk):
+    user = await request.auser()
+    iec_record, pci_record = await _aget_record_and_pci(pk)
+
+    if pci_record is None:
+        messages.error(request, f"Pre-Charge Investigation details not found for {iec_record.iec_ref}. Please contact admin.")
+        return redirect('view_iec', pk=iec_record.id)
+
+    try:
+        current_step_config = check_transition(iec_record, user, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, action="submitting the Comment/Counter Affidavit")
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect('view_iec', pk=iec_record.id)
+
+    if request.method == "POST":
+        form = CommentCounterAffidavitSubmissionForm(request.POST, instance=pci_record)
+        if await sync_to_async(form.is_valid)():
+            try:
+                next_workflow_step = await sync_to_async(_save_comment_counter_affidavit)(iec_record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
+                return redirect('dashboard')
+
+            messages.success(request, f"Comment/Counter Affidavit for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
+            return redirect('dashboard')
+        messages.error(request, "Please correct the errors below.")
+    else:
+        form = CommentCounterAffidavitSubmissionForm(instance=pci_record)
+
+    context = {
+        'form': form,
+        'iec_record': iec_record,
+        'pci_record': pci_record,
+        'current_step_description': current_step_config.description
+    }
+    return await arender(request, 'sdcmisapp/submit_comment_counter_affidavit.html', context)
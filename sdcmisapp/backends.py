@@ -0,0 +1,95 @@
+"""
+Authentication backend that keeps recently loaded users in the cache, so an
+authenticated request does not query the user table to load request.user.
+
+The cache holds the user's fields but not the password hash: only the session
+auth hash derived from it, which is all the per-request session check needs.
+A cached user's password is loaded from the database if something asks for it.
+
+Cached users are dropped when the user is saved or deleted (see signals.py);
+code that changes users with queryset.update() calls invalidate_cached_users().
+That only reaches every worker through a shared cache, which checks.py requires
+at startup; entries also expire after SDCMIS_USER_CACHE_TIMEOUT seconds.
+
+authenticate() checks the password once whatever the outcome; see Loginform for
+how it tells an inactive account from a wrong password.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+DEFAULT_TIMEOUT = 60
+
+
+def _key(user_id):
+    return f'sdcmis:auth_user:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'SDCMIS_USER_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _cache_entry(user):
+    """What is cached of a user: (database alias, {field: value} without the password, session auth hash)."""
+    fields = {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields if field.attname != 'password'}
+    return user._state.db, fields, user.get_session_auth_hash()
+
+
+def _from_cache_entry(entry):
+    """The user as loaded with the password deferred."""
+    db, fields, session_auth_hash = entry
+    user = get_user_model().from_db(db, list(fields), list(fields.values()))
+    user._session_auth_hash = session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user() (called once per request by the auth middleware) reads the cache first."""
+
+    def authenticate(self, request, username=None, password=None, allow_inactive=False, **kwargs):
+        """
+        ModelBackend.authenticate(). With allow_inactive=True an inactive user is returned
+        too when the password is right, so the caller can refuse them with a reason
+        instead of checking the password a second time.
+        """
+        if not allow_inactive:
+            return super().authenticate(request, username, password, **kwargs)
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            UserModel().set_password(password)  # Hash anyway, so unknown usernames take as long as known ones
+            return None
+        return user if user.check_password(password) else None
+
+    def get_user(self, user_id):
+        entry = cache.get(_key(user_id))
+        if entry is None:
+            user = super().get_user(user_id)  # None for missing and inactive users, which are not cached
+            if user is None:
+                return None
+            cache.set(_key(user_id), _cache_entry(user), timeout=_timeout())
+        else:
+            user = _from_cache_entry(entry)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        entry = await cache.aget(_key(user_id))
+        if entry is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(_key(user_id), _cache_entry(user), timeout=_timeout())
+        else:
+            user = _from_cache_entry(entry)
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
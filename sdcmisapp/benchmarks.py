@@ -0,0 +1,258 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .dashboard_cache import invalidate_dashboards
+from .models import iec_records, CustomUser
+from .views import _eligible_routing_users
+from .workflow_def import CASE_WORKFLOW, get_initial_status_key, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, RESOLVED_STEP_KEY
+
+
+RESULTS_FORMAT_VERSION = 1
+
+DEFAULT_ITERATIONS = 20
+WARMUP_ITERATIONS = 2
+
+
+class BenchmarkError(Exception):
+    """Raised when a scenario cannot run against the current data or a request fails."""
+
+
+class Scenario:
+    """
+    One benchmarked request. prepare() picks the user and target from the current
+    data and returns (user, method, url, data, check); check(response) raises
+    BenchmarkError when the request did not do what it should.
+    Writing scenarios run each request in a rolled back transaction, so the data
+    (and every later iteration) is left as it was.
+    """
+    def __init__(self, name, prepare, writes=False, cold_dashboard_cache=False):
+        self.name = name
+        self.prepare = prepare
+        self.writes = writes
+        self.cold_dashboard_cache = cold_dashboard_cache
+
+
+def _expect_status(*codes):
+    def check(response):
+        if response.status_code not in codes:
+            raise BenchmarkError(f"Unexpected HTTP {response.status_code}.")
+    return check
+
+
+def _expect_advanced(record, from_step):
+    def check(response):
+        _expect_status(302)(response)
+        if iec_records.objects.filter(pk=record.pk, status=from_step).exists():
+            raise BenchmarkError(f"Record {record.iec_ref} was not moved on from '{from_step}'.")
+    return check
+
+
+def _user_with_role(role):
+    # Preferably someone with open tasks, so an investigator's dashboard has rows to show
+    users = CustomUser.objects.filter(role=role, is_active=True).order_by('id')
+    user = users.filter(assigned_iec_records__status__ne=RESOLVED_STEP_KEY).first() or users.first()
+    if user is None:
+        raise BenchmarkError(f"No active user with role '{role}'. Run generate_caseload first.")
+    return user
+
+
+def _record_at(step_key, **filters):
+    record = (
+        iec_records.objects.filter(status=step_key, assigned_to__isnull=False, **filters)
+        .select_related('created_by', 'assigned_to')
+        .order_by('id')
+        .first()
+    )
+    if record is None:
+        raise BenchmarkError(f"No record at step '{step_key}'. Run generate_caseload first.")
+    return record
+
+
+def prepare_dashboard(role):
+    def prepare():
+        user = _user_with_role(role)
+        return user, 'get', reverse('dashboard'), None, _expect_status(200)
+    return prepare
+
+
+def prepare_iec_addrecord():
+    user = _user_with_role('ier_inv')
+    data = {
+        'date_received': date.today().isoformat(),
+        'complainant': 'Benchmark Complainant',
+        'respondent': 'Benchmark Respondent',
+        'charge': 'Grave Misconduct',
+        'remarks': 'Created by the benchmark suite and rolled back.',
+    }
+    return user, 'post', reverse('iec_addrecord'), data, _expect_status(200)
+
+
+def prepare_acknowledge_and_route():
+    initial_status_key = get_initial_status_key()
+    for record in iec_records.objects.filter(status=initial_status_key, created_by__isnull=False).select_related('created_by').order_by('id')[:50]:
+        assignee = _eligible_routing_users(record.created_by).first()
+        if assignee is not None:
+            data = {'assign_to': assignee.pk, 'submission_remarks': 'Benchmark'}
+            url = reverse('acknowledge_and_route', args=[record.pk])
+            return record.created_by, 'post', url, data, _expect_advanced(record, initial_status_key)
+    raise BenchmarkError("No record awaiting routing with someone to route it to. Run generate_caseload first.")
+
+
+def prepare_submit_notice_pci():
+    record = _record_at(NOTICE_PCI_STEP_KEY, pre_charge_investigation_details__isnull=False)
+    data = {'precharge_no': 'BENCHMARK-PCI-0001', 'notice_pci_respondent_received_on': date.today().isoformat()}
+    url = reverse('submit_notice_pci', args=[record.pk])
+    return record.assigned_to, 'post', url, data, _expect_advanced(record, NOTICE_PCI_STEP_KEY)
+
+
+def prepare_submit_comment_counter_affidavit():
+    record = _record_at(COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, pre_charge_investigation_details__isnull=False)
+    data = {'comment_counter_affidavit_received_on': date.today().isoformat()}
+    url = reverse('submit_comment_affidavit', args=[record.pk])
+    return record.assigned_to, 'post', url, data, _expect_advanced(record, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY)
+
+
+SCENARIOS = [
+    Scenario('dashboard_director', prepare_dashboard('dir'), cold_dashboard_cache=True),
+    Scenario('dashboard_investigator', prepare_dashboard('pci_inv'), cold_dashboard_cache=True),
+    Scenario('dashboard_investigator_cached', prepare_dashboard('pci_inv')),
+    Scenario('iec_addrecord', prepare_iec_addrecord, writes=True),
+    Scenario('acknowledge_and_route', prepare_acknowledge_and_route, writes=True),
+    Scenario('submit_notice_pci', prepare_submit_notice_pci, writes=True),
+    Scenario('submit_comment_counter_affidavit', prepare_submit_comment_counter_affidavit, writes=True),
+]
+
+
+def _client_host():
+    # A host the request will be accepted for (the test runner's 'testserver' is not allowed here)
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+def run_scenario(scenario, iterations=DEFAULT_ITERATIONS):
+    """
+    Runs a scenario and returns its results: latency (ms), queries per request
+    and peak Python memory allocated while handling one request (KiB).
+    Memory is traced in a separate request, since tracing slows everything down.
+    """
+    user, method, url, data, check = scenario.prepare()
+    client = Client(HTTP_HOST=_client_host())
+    client.force_login(user)
+
+    def request():
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        return response, time.perf_counter() - started
+
+    def iteration(measure):
+        if scenario.cold_dashboard_cache:
+            invalidate_dashboards([user.pk])
+        if not scenario.writes:
+            return measure()
+        with transaction.atomic():
+            result = measure()
+            transaction.set_rollback(True)
+        return result
+
+    def checked():
+        response, _ = request()
+        check(response)
+
+    def timed():
+        with CaptureQueriesContext(connection) as queries:
+            _, elapsed = request()
+        return elapsed * 1000, len(queries)
+
+    def traced():
+        tracemalloc.start()
+        try:
+            request()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    for _ in range(WARMUP_ITERATIONS):
+        iteration(checked)
+    latencies, query_counts = zip(*[iteration(timed) for _ in range(iterations)])
+    peak = iteration(traced)
+
+    return {
+        'user_role': user.role,
+        'iterations': iterations,
+        'latency_ms': {
+            'min': round(min(latencies), 3),
+            'p50': round(statistics.median(latencies), 3),
+            'p95': round(_percentile(latencies, 95), 3),
+            'max': round(max(latencies), 3),
+            'mean': round(statistics.fmean(latencies), 3),
+        },
+        'queries': max(query_counts),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(names=None, iterations=DEFAULT_ITERATIONS, progress=None):
+    """Runs the scenarios (all, or those named) and returns the results document."""
+    scenarios = [scenario for scenario in SCENARIOS if not names or scenario.name in names]
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_scenario(scenario, iterations)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+    return {
+        'format': RESULTS_FORMAT_VERSION,
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'records': iec_records.objects.count(),
+            'users': CustomUser.objects.count(),
+            'workflow_steps': len(CASE_WORKFLOW),
+        },
+        'scenarios': results,
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Compares two results documents. Returns one row per scenario present in both:
+    (name, baseline p50, current p50, p50 change %, baseline queries, current queries,
+     baseline peak KiB, current peak KiB).
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        old_p50, new_p50 = before['latency_ms']['p50'], result['latency_ms']['p50']
+        change = (new_p50 - old_p50) * 100 / old_p50 if old_p50 else 0.0
+        rows.append((
+            name, old_p50, new_p50, round(change, 1),
+            before['queries'], result['queries'],
+            before['peak_memory_kib'], result['peak_memory_kib'],
+        ))
+    return rows
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,89 @@
+"""
+Working-day calendar for due dates: Monday to Friday, minus the Holiday table.
+
+Offsets use NumPy's busday_offset when NumPy is installed, which also works
+on whole arrays of dates at once (see BusinessCalendar.offset_many(), used by
+the bulk due date recomputation). Without NumPy a short loop gives the same dates.
+NumPy is an optional dependency (see README.md).
+"""
+from datetime import timedelta
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from .models import Holiday
+
+try:
+    import numpy
+except ImportError:  # Optional; only makes bulk offsets faster
+    numpy = None
+
+
+# Monday..Sunday, 1 = working day (NumPy weekmask format)
+WEEKMASK = '1111100'
+
+# Cached list of holiday dates; deleted when a Holiday is saved or deleted (see signals.py)
+HOLIDAYS_CACHE_KEY = 'sdcmis:holidays'
+
+# Also re-read this often, so a worker whose cache missed the deletion (a
+# per-process cache) does not count due dates without a new holiday for long
+HOLIDAYS_CACHE_TIMEOUT = 300
+
+
+class BusinessCalendar:
+    """
+    Counts working days. A start date on a weekend or holiday counts from the
+    next working day, so offset(start, 0) is the first working day from start.
+    """
+    def __init__(self, holidays=(), use_numpy=True):
+        self.holidays = frozenset(holidays)
+        use_numpy = use_numpy and numpy is not None
+        self._numpy_calendar = numpy.busdaycalendar(weekmask=WEEKMASK, holidays=sorted(self.holidays)) if use_numpy else None
+
+    def is_working_day(self, day):
+        return WEEKMASK[day.weekday()] == '1' and day not in self.holidays
+
+    def offset(self, start, days):
+        """The date `days` working days after start."""
+        if self._numpy_calendar is not None:
+            return numpy.busday_offset(start, days, roll='forward', busdaycal=self._numpy_calendar).item()
+        day = start
+        while not self.is_working_day(day):
+            day += timedelta(days=1)
+        for _ in range(days):
+            day += timedelta(days=1)
+            while not self.is_working_day(day):
+                day += timedelta(days=1)
+        return day
+
+    def offset_many(self, starts, days):
+        """offset() for a list of start dates and a list of day counts; returns a list of dates."""
+        if self._numpy_calendar is not None and starts:
+            offsets = numpy.busday_offset(
+                numpy.array(starts, dtype='datetime64[D]'), numpy.array(days), roll='forward', busdaycal=self._numpy_calendar,
+            )
+            return offsets.tolist()  # datetime64[D] items convert to datetime.date
+        return [self.offset(start, count) for start, count in zip(starts, days)]
+
+
+@lru_cache(maxsize=4)
+def _calendar_for(holidays):
+    return BusinessCalendar(holidays)
+
+
+def get_calendar():
+    """The current calendar. The holiday dates are read from the cache, the database only after a change."""
+    holidays = cache.get(HOLIDAYS_CACHE_KEY)
+    if holidays is None:
+        holidays = tuple(Holiday.objects.order_by('date').values_list('date', flat=True))
+        cache.set(HOLIDAYS_CACHE_KEY, holidays, timeout=HOLIDAYS_CACHE_TIMEOUT)
+    return _calendar_for(tuple(holidays))
+
+
+def clear_holiday_cache():
+    cache.delete(HOLIDAYS_CACHE_KEY)
+
+
+def add_working_days(start, days):
+    """The date `days` working days after start, on the current calendar."""
+    return get_calendar().offset(start, days)
@@ -0,0 +1,246 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .business_days import get_calendar
+from .dashboard_cache import invalidate_dashboards
+from .models import CustomUser, iec_records, InitialEvaluationReport, PreChargeInvestigation, CaseTransition, IEC_REF_KIND, PRECHARGE_NO_KIND
+from .rollups import add_records, rebuilt_after
+from .roster import invalidate_rosters
+from .search import index_records
+from .sequences import reserve_references
+from .workflow_def import CASE_WORKFLOW, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY
+
+
+# Synthetic users are recognised (and cleared) by this username prefix
+BENCH_USER_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench-password'
+
+# Share of generated cases per workflow step: a large resolved backlog, the rest spread evenly
+RESOLVED_SHARE = 0.35
+
+# Cases are received up to this many days ago
+MAX_CASE_AGE_DAYS = 730
+
+GENERATE_BATCH_SIZE = 5000
+
+COMPLAINANTS = ['Juan Dela Cruz', 'Maria Santos', 'Jose Reyes', 'Ana Bautista', 'Pedro Garcia', 'Rosa Mendoza', 'Carlos Ramos', 'Liza Aquino']
+RESPONDENTS = ['Municipal Treasurer', 'Barangay Captain', 'Records Officer', 'School Principal', 'Budget Officer', 'Clerk III', 'Engineer II']
+CHARGES = ['Grave Misconduct', 'Dishonesty', 'Neglect of Duty', 'Conduct Prejudicial to the Best Interest of the Service', 'Insubordination']
+
+STEP_INDEX = {step.key: index for index, step in enumerate(CASE_WORKFLOW.steps)}
+
+
+def bench_username(location, role, number):
+    return f'{BENCH_USER_PREFIX}{location}_{role}_{number}'
+
+
+def ensure_users(users_per_role=2):
+    """
+    Creates (if missing) users_per_role active users for every location and role.
+    Returns {(location, role): [users]}.
+    """
+    wanted = {
+        bench_username(location, role, number): (location, role)
+        for location, _ in CustomUser.LOCATION_CHOICES
+        for role, _ in CustomUser.ROLE_CHOICES
+        for number in range(1, users_per_role + 1)
+    }
+    existing = set(CustomUser.objects.filter(username__in=wanted).values_list('username', flat=True))
+    password = make_password(BENCH_PASSWORD)  # Hashed once for all of them
+    CustomUser.objects.bulk_create([
+        CustomUser(username=username, password=password, location=location, role=role, designation='Benchmark user', is_active=True)
+        for username, (location, role) in wanted.items() if username not in existing
+    ], batch_size=1000)
+    invalidate_rosters()  # bulk_create skips the signals
+
+    users = {}
+    for user in CustomUser.objects.filter(username__in=wanted).order_by('username'):
+        users.setdefault((user.location, user.role), []).append(user)
+    return users
+
+
+def _pick_status(rng):
+    steps = CASE_WORKFLOW.steps
+    if rng.random() < RESOLVED_SHARE:
+        return CASE_WORKFLOW.final_step
+    return steps[rng.randrange(len(steps) - 1)]
+
+
+def _assignee_for(step, location_users, creator, rng):
+    """Who holds a case at a step: the creator first, then a PCI investigator, then a hearing officer."""
+    index = STEP_INDEX[step.key]
+    if index == 0:
+        return creator
+    if index <= STEP_INDEX[COMMENT_COUNTER_AFFIDAVIT_STEP_KEY] + 1:
+        return rng.choice(location_users['pci_inv'])
+    return rng.choice(location_users['sho'])
+
+
+def _build_case(rng, location_users, today, calendar):
+    """Returns an unsaved (record, step, date the step started) with dates consistent with its step."""
+    creator = rng.choice(location_users['ier_inv'])
+    step = _pick_status(rng)
+    date_received = today - timedelta(days=rng.randint(0, MAX_CASE_AGE_DAYS))
+    # The current step started within twice its allotted time (so about half the open cases are overdue), not before receipt
+    step_started = max(date_received, today - timedelta(days=rng.randint(0, 2 * step.days_to_complete)))
+    if STEP_INDEX[step.key] == 0:
+        date_received = step_started  # The initial step's due date counts from receipt (as in iec_addrecord)
+    record = iec_records(
+        date_received=date_received,
+        complainant=rng.choice(COMPLAINANTS),
+        respondent=rng.choice(RESPONDENTS),
+        charge=rng.choice(CHARGES),
+        remarks=' '.join(rng.choices(CHARGES + RESPONDENTS, k=rng.randint(0, 12))) or None,
+        status=step.key,
+        due_date=calendar.offset(step_started, step.days_to_complete),
+        created_by=creator,
+        assigned_to=_assignee_for(step, location_users, creator, rng),
+    )
+    return record, step, step_started
+
+
+def _entry_transition(record, step, step_started):
+    """The CaseTransition into the record's current step (None at the initial step), so its step start is known."""
+    index = STEP_INDEX[step.key]
+    if index == 0:
+        return None
+    return CaseTransition(
+        record=record,
+        from_step=CASE_WORKFLOW.steps[index - 1].key,
+        to_step=step.key,
+        to_assignee=record.assigned_to,
+        due_date=record.due_date,
+        step_started_on=step_started,
+        created_at=timezone.make_aware(datetime.combine(step_started, time(9))),
+    )
+
+
+def _details_for(record, step, step_started, creator, rng):
+    """
+    The IER and PCI rows a case at this step would have (None when it has not got that far).
+    A step that follows a PCI date started on it, as in the views that call transitions.advance().
+    """
+    index = STEP_INDEX[step.key]
+    affidavit_step = STEP_INDEX[COMMENT_COUNTER_AFFIDAVIT_STEP_KEY]
+    if index == 0:
+        return None, None
+    ier = InitialEvaluationReport(
+        iec_record=record,
+        submitted_by=creator,
+        director_approval_date=record.date_received + timedelta(days=rng.randint(0, 5)),
+        remarks=None,
+    )
+    pci = PreChargeInvestigation(iec_record=record)
+    if index > STEP_INDEX[NOTICE_PCI_STEP_KEY]:
+        if index == affidavit_step:
+            notice_received = step_started
+        elif index == affidavit_step + 1:
+            notice_received = max(record.date_received, step_started - timedelta(days=rng.randint(1, 10)))
+        else:
+            notice_received = record.date_received + timedelta(days=rng.randint(1, 15))
+        pci.notice_pci_submitted_by = record.assigned_to
+        pci.notice_pci_submitted_on = max(record.date_received, notice_received - timedelta(days=rng.randint(0, 5)))
+        pci.notice_pci_respondent_received_on = notice_received
+    if index > affidavit_step:
+        if index == affidavit_step + 1:
+            pci.comment_counter_affidavit_received_on = step_started
+        else:
+            pci.comment_counter_affidavit_received_on = pci.notice_pci_respondent_received_on + timedelta(days=rng.randint(1, 10))
+    if index > affidavit_step + 1:
+        pci.pci_report_submitted_by = record.assigned_to
+        pci.pci_report_submitted_on = pci.comment_counter_affidavit_received_on + timedelta(days=rng.randint(1, 10))
+    return ier, pci
+
+
+def _insert_batch(cases, year):
+    """Inserts a batch of (record, step, location code, (ier, pci), transition) cases, numbering the IEC refs and PCI nos. in blocks."""
+    with transaction.atomic():
+        by_location = {}
+        for case in cases:
+            by_location.setdefault(case[2], []).append(case)
+        for location_code, location_cases in by_location.items():
+            references = reserve_references(IEC_REF_KIND, location_code, year, len(location_cases))
+            for case, reference in zip(location_cases, references):
+                case[0].iec_ref = reference
+
+        records = iec_records.objects.bulk_create([case[0] for case in cases], batch_size=1000)
+        if any(record.pk is None for record in records):
+            ids_by_ref = dict(iec_records.objects.filter(iec_ref__in=[record.iec_ref for record in records]).values_list('iec_ref', 'id'))
+            for record in records:
+                record.pk = ids_by_ref.get(record.iec_ref)
+
+        iers, pcis, transitions = [], [], []
+        for record, _, location_code, (ier, pci), transition in cases:
+            if transition is not None:
+                transition.record_id = record.pk
+                transitions.append(transition)
+            if ier is not None:
+                ier.iec_record_id = record.pk
+                iers.append(ier)
+            if pci is not None:
+                pci.iec_record_id = record.pk
+                pcis.append((location_code, pci))
+        for location_code in {code for code, _ in pcis}:
+            location_pcis = [pci for code, pci in pcis if code == location_code]
+            for pci, number in zip(location_pcis, reserve_references(PRECHARGE_NO_KIND, location_code, year, len(location_pcis))):
+                pci.precharge_no = number
+        InitialEvaluationReport.objects.bulk_create(iers, batch_size=1000)
+        PreChargeInvestigation.objects.bulk_create([pci for _, pci in pcis], batch_size=1000)
+        CaseTransition.objects.bulk_create(transitions, batch_size=1000)
+        add_records(records)  # SLA rollups (bulk_create skips the signals)
+    return records
+
+
+def generate_caseload(record_count, users_per_role=2, seed=0, batch_size=GENERATE_BATCH_SIZE, index_search=True, progress=None):
+    """
+    Generates a reproducible synthetic case load: users for every location and role,
+    and record_count cases spread over the workflow steps with their IER/PCI rows.
+    The same seed always produces the same cases (reference numbers aside).
+
+    Records are built and inserted batch_size at a time, so memory stays flat
+    for millions of records. progress, if given, is called with the running total.
+    Returns the number of records created.
+    """
+    rng = random.Random(seed)
+    users = ensure_users(users_per_role)
+    users_by_location = {
+        location: {role: users[(location, role)] for role, _ in CustomUser.ROLE_CHOICES}
+        for location in sorted({location for location, _ in users})
+    }
+    locations = list(users_by_location)
+    today = date.today()
+    calendar = get_calendar()
+    created = 0
+
+    while created < record_count:
+        cases = []
+        for _ in range(min(batch_size, record_count - created)):
+            location = rng.choice(locations)
+            record, step, step_started = _build_case(rng, users_by_location[location], today, calendar)
+            details = _details_for(record, step, step_started, record.created_by, rng)
+            cases.append((record, step, location.upper(), details, _entry_transition(record, step, step_started)))
+        records = _insert_batch(cases, today.year)
+        if index_search:
+            index_records(records)
+        created += len(records)
+        if progress:
+            progress(created)
+
+    # bulk_create skips the signals, so drop the synthetic users' cached dashboards here
+    invalidate_dashboards([user.pk for group in users.values() for user in group])
+    return created
+
+
+def clear_caseload():
+    """Deletes the synthetic users and every record they created. Returns the number of records deleted."""
+    records = iec_records.objects.filter(created_by__username__startswith=BENCH_USER_PREFIX)
+    count = records.count()
+    with rebuilt_after():
+        records.delete()
+    CustomUser.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
+    invalidate_rosters()
+    return count
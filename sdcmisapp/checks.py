@@ -0,0 +1,32 @@
+"""
+Startup checks (run by manage.py check, runserver, migrate, ...).
+
+The cached users, dashboards, routing rosters and holidays are invalidated in the
+process that made the change, so the caches they live in must be shared by every
+worker (see CACHES in settings.py).
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Backends that keep their entries in the memory of each process (or not at all)
+PER_PROCESS_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    aliases = {'default', getattr(settings, 'SDCMIS_DASHBOARD_CACHE', 'default')}
+    for alias in sorted(aliases):
+        backend = settings.CACHES.get(alias, {}).get('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+        if backend in PER_PROCESS_CACHE_BACKENDS:
+            errors.append(Error(
+                f"The '{alias}' cache uses {backend}, which is not shared between worker processes.",
+                hint="Configure a shared backend (e.g. RedisCache) in CACHES; invalidations made in one worker must reach the others.",
+                obj='settings.CACHES',
+                id='sdcmisapp.E001',
+            ))
+    return errors
@@ -0,0 +1,118 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import replicas
+from .models import INVESTIGATOR_ROLES
+
+
+# Key holding the version token shared by every dashboard that lists all records (admin, director...)
+ALL_RECORDS_VERSION_KEY = 'sdcmis:dashboard:version:all'
+
+DEFAULT_TIMEOUT = 300
+
+
+def _cache():
+    return caches[getattr(settings, 'SDCMIS_DASHBOARD_CACHE', 'default')]
+
+
+def _user_version_key(user_id):
+    return f'sdcmis:dashboard:version:user:{user_id}'
+
+
+def _version_keys(user):
+    """
+    The version tokens a user's dashboard depends on: their own, plus the all-records
+    one when their dashboard lists every record. Investigators only see the records
+    they created or are assigned to, so changes to other records leave their cache alone.
+    """
+    if user.role in INVESTIGATOR_ROLES:
+        return [_user_version_key(user.pk)]
+    return [_user_version_key(user.pk), ALL_RECORDS_VERSION_KEY]
+
+
+def _versions(cache, user):
+    """
+    Returns the current version tokens of _version_keys() in one cache round trip.
+    Missing tokens (never set, evicted or expired) are replaced by fresh random ones,
+    so a payload cached under an older token can never be served again.
+    """
+    keys = _version_keys(user)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def _aversions(cache, user):
+    """Async version of _versions()."""
+    keys = _version_keys(user)
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def _timeout():
+    return getattr(settings, 'SDCMIS_DASHBOARD_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _payload_key(user, versions, params, today):
+    # Everything the payload depends on: who is looking, the list options, the date and the versions
+    options = '&'.join(f'{name}={params.get(name, "")}' for name in ('cursor', 'page_size', 'sort', 'location', 'status', 'overdue'))
+    digest = hashlib.sha256(f'{user.role}|{options}|{today.isoformat()}|{"|".join(versions)}'.encode()).hexdigest()
+    return f'sdcmis:dashboard:payload:{user.pk}:{digest}'
+
+
+def get_or_build(user, params, today, build):
+    """
+    Returns the cached dashboard payload for this user and request options,
+    calling build() (and caching its result) when there is none.
+
+    A payload built from a read replica is not cached: the replica may not have
+    caught up with the changes that set the current version tokens, and the
+    stale payload would be served under them until the next change. Payloads
+    cached from the primary are served to replica reads as well.
+    """
+    cache = _cache()
+    key = _payload_key(user, _versions(cache, user), params, today)
+    payload = cache.get(key)
+    if payload is None:
+        from_replica = replicas.reading_from_replica()
+        payload = build()
+        if not from_replica:
+            cache.set(key, payload, timeout=_timeout())
+    return payload
+
+
+async def aget_or_build(user, params, today, build):
+    """Async version of get_or_build(); build is a coroutine function."""
+    cache = _cache()
+    key = _payload_key(user, await _aversions(cache, user), params, today)
+    payload = await cache.aget(key)
+    if payload is None:
+        from_replica = replicas.reading_from_replica()
+        payload = await build()
+        if not from_replica:
+            await cache.aset(key, payload, timeout=_timeout())
+    return payload
+
+
+def invalidate_dashboards(user_ids):
+    """
+    Invalidates the cached dashboards of the given users (a record's creator and
+    assignees) and of the all-records dashboards, by giving them new version tokens.
+    Other investigators' dashboards do not show the record and keep their cache.
+    The new tokens only reach the workers that share the cache backend: with a
+    per-process one (locmem) the others serve their stale payloads until they
+    expire, hence the shared CACHES backend in settings.py.
+    """
+    keys = {_user_version_key(user_id) for user_id in user_ids if user_id is not None}
+    keys.add(ALL_RECORDS_VERSION_KEY)
+    _cache().set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
@@ -0,0 +1,81 @@
+from django.db.models.functions import Substr
+
+from .models import iec_records
+from .workflow_def import get_initial_status_key, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY
+
+
+# Number of characters of the remarks TextField shown in the dashboard table
+REMARKS_EXCERPT_LENGTH = 80
+
+# Columns selected for each dashboard row. Foreign keys are loaded as raw ids
+# so permission checks never have to fetch a CustomUser.
+ROW_FIELDS = (
+    'id',
+    'date_received',
+    'iec_ref',
+    'complainant',
+    'respondent',
+    'status',
+    'due_date',
+    'created_by_id',
+    'assigned_to_id',
+    # Annotated in SQL by IecRecordQuerySet.with_urgency()
+    'time_remaining',
+    'is_overdue_now',
+)
+
+STATUS_DISPLAY = dict(iec_records.STATUS_CHOICES)
+
+
+class DashboardRow:
+    """
+    A lightweight, read-only row for the dashboard table.
+    Uses __slots__ so a page of rows costs a fraction of full model instances.
+    """
+    __slots__ = (
+        'id', 'date_received', 'iec_ref', 'complainant', 'respondent', 'remarks',
+        'status', 'status_display', 'due_date', 'created_by_id', 'assigned_to_id',
+        'days_remaining', 'overdue_days_count', 'is_overdue',
+        'can_acknowledge_and_route', 'can_submit_notice_pci', 'can_submit_comment_affidavit',
+    )
+
+    def __init__(self, values, user_id):
+        self.id = values['id']
+        self.date_received = values['date_received']
+        self.iec_ref = values['iec_ref']
+        self.complainant = values['complainant']
+        self.respondent = values['respondent']
+        self.remarks = values['remarks_excerpt']
+        self.status = values['status']
+        self.status_display = STATUS_DISPLAY.get(self.status, self.status)
+        self.due_date = values['due_date']
+        self.created_by_id = values['created_by_id']
+        self.assigned_to_id = values['assigned_to_id']
+
+        # Days remaining until the due date (negative when overdue), computed by the database
+        time_remaining = values['time_remaining']
+        self.days_remaining = time_remaining.days if time_remaining is not None else None
+        self.overdue_days_count = abs(self.days_remaining) if self.days_remaining is not None and self.days_remaining < 0 else None
+        self.is_overdue = values['is_overdue_now']
+
+        # Action flags: compare foreign keys by id, no user lookups
+        initial_status_key = get_initial_status_key()
+        is_creator = self.created_by_id == user_id
+        is_assignee = self.assigned_to_id == user_id
+        self.can_acknowledge_and_route = bool(initial_status_key) and self.status == initial_status_key and is_creator
+        self.can_submit_notice_pci = self.status == NOTICE_PCI_STEP_KEY and is_assignee
+        self.can_submit_comment_affidavit = self.status == COMMENT_COUNTER_AFFIDAVIT_STEP_KEY and is_assignee
+
+
+def dashboard_rows_queryset(records_qs, today=None):
+    """
+    Projects a records queryset down to the columns the dashboard shows,
+    with days remaining and the overdue flag computed in SQL.
+    The remarks TextField is truncated in SQL so large texts are never transferred.
+    """
+    return records_qs.with_urgency(today).values(*ROW_FIELDS, remarks_excerpt=Substr('remarks', 1, REMARKS_EXCERPT_LENGTH))
+
+
+def build_dashboard_rows(values_list, user):
+    """Turns projected row dicts (e.g. a page from KeysetPaginator) into DashboardRow objects."""
+    return [DashboardRow(values, user.pk) for values in values_list]
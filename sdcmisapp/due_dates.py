@@ -0,0 +1,98 @@
+"""
+Bulk recomputation of the open cases' due dates, after the holiday calendar or a
+step's days_to_complete changed (manage.py recompute_due_dates).
+
+A case's due date is counted from the step_started_on of its last CaseTransition
+(the date transitions.advance() counted it from, e.g. when the respondent received
+the notice), or, at the initial step, from its date received (as in iec_addrecord
+and the importer). Open cases with no transition past the initial step (moved on
+before transitions were logged) have no known start and keep their due date.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .business_days import get_calendar
+from .dashboard_cache import invalidate_dashboards
+from .models import iec_records, CaseTransition
+from .overdue import sweep_overdue
+from .workflow_def import CASE_WORKFLOW, RESOLVED_STEP_KEY, get_initial_status_key
+
+
+RECOMPUTE_BATCH_SIZE = 5000
+
+
+class RecomputeResult:
+    def __init__(self):
+        self.checked = 0
+        self.updated = 0
+        self.skipped = 0  # No known step start
+
+
+def _recompute_batch(rows, calendar, initial_step_key, result):
+    """Recomputes one batch of (id, status, date_received, due_date, created_by_id, assigned_to_id) rows. Returns the user ids to invalidate."""
+    ids = [row[0] for row in rows]
+    step_started = {}
+    # Newest first, so the first transition seen of each record is its last
+    last_transitions = CaseTransition.objects.filter(record_id__in=ids).order_by('-created_at', '-id')
+    for record_id, started_on, created_at in last_transitions.values_list('record_id', 'step_started_on', 'created_at'):
+        if record_id not in step_started:
+            step_started[record_id] = started_on or timezone.localdate(created_at)
+
+    known, starts, days = [], [], []
+    for row in rows:
+        record_id, status, date_received = row[:3]
+        start = step_started.get(record_id) or (date_received if status == initial_step_key else None)
+        step = CASE_WORKFLOW.get_step(status)
+        if start is None or step is None:
+            result.skipped += 1
+            continue
+        known.append(row)
+        starts.append(start)
+        days.append(step.days_to_complete)
+
+    # One vectorized offset for the whole batch
+    changed = [(row, due_date) for row, due_date in zip(known, calendar.offset_many(starts, days)) if due_date != row[3]]
+    if not changed:
+        return set()
+
+    # bulk_update skips the signals, so the rollups and dashboards are updated here
+    iec_records.objects.bulk_update([iec_records(pk=row[0], due_date=due_date) for row, due_date in changed], ['due_date'], batch_size=1000)
+    rollups.records_changed([
+        ((row[4], row[1], row[3]), (row[4], row[1], due_date)) for row, due_date in changed
+    ])
+    result.updated += len(changed)
+    return {user_id for row, _ in changed for user_id in (row[4], row[5])}
+
+
+def recompute_due_dates(batch_size=RECOMPUTE_BATCH_SIZE, progress=None):
+    """
+    Recomputes the due date of every open case on the current calendar and workflow,
+    batch_size cases (in id order) per transaction. progress, if given, is called with
+    the RecomputeResult after each batch. Returns the RecomputeResult.
+    """
+    calendar = get_calendar()
+    initial_step_key = get_initial_status_key()
+    result = RecomputeResult()
+    user_ids = set()
+    open_cases = (
+        iec_records.objects.filter(status__ne=RESOLVED_STEP_KEY)
+        .order_by('id')
+        .values_list('id', 'status', 'date_received', 'due_date', 'created_by_id', 'assigned_to_id')
+    )
+    last_id = 0
+    while True:
+        rows = list(open_cases.filter(id__gt=last_id)[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            user_ids |= _recompute_batch(rows, calendar, initial_step_key, result)
+        result.checked += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(result)
+
+    if user_ids:
+        invalidate_dashboards(user_ids)
+    sweep_overdue()  # Flags cases whose new due date has passed, unflags the others
+    return result
@@ -1,7 +1,10 @@
+import math
+
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.contrib.auth import get_user_model, authenticate # Import get_user_model and authenticate
+from django.contrib.auth import authenticate
 
 from .models import iec_records, CustomUser, PreChargeInvestigation
+from .throttle import login_throttle, client_address
 
 
 from django import forms
@@ -43,39 +46,24 @@ class Loginform(AuthenticationForm):
         super().__init__(*args, **kwargs)
         # Customize the error message for inactive users
         self.error_messages['inactive'] = "Your account is awaiting admin approval. Please wait or contact support."
+        self.error_messages['throttled'] = "Too many login attempts. Please try again in %(minutes)s minute(s)."
 
     def clean(self):
         username = self.cleaned_data.get('username')
         password = self.cleaned_data.get('password')
 
         if username is not None and password:
-            # authenticate() will return None if user is inactive (due to ModelBackend's user_can_authenticate)
-            # or if credentials are bad / user doesn't exist.
-            self.user_cache = authenticate(self.request, username=username, password=password)
-
+            # Refused before the password is hashed, so a burst of guesses costs next to nothing
+            wait = login_throttle.attempt(username, client_address(self.request))
+            if wait:
+                raise forms.ValidationError(self.error_messages['throttled'], code='throttled', params={'minutes': math.ceil(wait / 60)})
+
+            # allow_inactive: an inactive user with the right password comes back too (see
+            # CachedModelBackend), so the password is checked once whatever the outcome
+            self.user_cache = authenticate(self.request, username=username, password=password, allow_inactive=True)
             if self.user_cache is None:
-                # Since authenticate returned None, we need to figure out why.
-                # Was it an inactive user with correct password, or genuinely bad credentials?
-                UserModel = get_user_model() # This will be CustomUser
-                try:
-                    user = UserModel._default_manager.get_by_natural_key(username)
-                    # We found a user by that username.
-                    # Now, check if the password was correct for this user.
-                    if user.check_password(password):
-                        # Password is correct. If they are inactive, this is the scenario we want to customize.
-                        if not user.is_active:
-                            raise forms.ValidationError(
-                                self.error_messages['inactive'],
-                                code='inactive',
-                            )
-                        # If user is active and password correct, authenticate should have returned the user.
-                        # This path implies an unexpected state, so fall through to generic invalid login.
-                except UserModel.DoesNotExist:
-                    # User does not exist. Fall through to generic invalid login.
-                    pass # The self.get_invalid_login_error() below will handle this.
-                raise self.get_invalid_login_error() # Default error if not specifically an inactive user with correct pass
-            else:
-                self.confirm_login_allowed(self.user_cache) # Standard check for active users
+                raise self.get_invalid_login_error()
+            self.confirm_login_allowed(self.user_cache) # Raises the 'inactive' error for accounts awaiting approval
         return self.cleaned_data
     
 
@@ -110,9 +98,14 @@ class RouteTaskForm(forms.Form):
         queryset=CustomUser.objects.none(),  # Queryset will be set dynamically in the view
         label="Assign to:",
         widget=forms.Select(attrs={'class': 'form-control'}), # Optional: for styling
-        required=True,
+        required=False, # Required unless auto_assign is checked (see clean())
         empty_label="Select a user" # Optional: placeholder text
     )
+    auto_assign = forms.BooleanField(
+        label="Assign automatically to the investigator with the lightest workload",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        required=False
+    )
     director_approval_date = forms.DateField(
         label="IER Approved by Director On",
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
@@ -127,9 +120,36 @@ class RouteTaskForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         eligible_users_queryset = kwargs.pop('eligible_users_queryset', None)
+        # (id, username) choices to render instead of querying the queryset (see roster.py); the queryset still validates the choice
+        eligible_users_choices = kwargs.pop('eligible_users_choices', None)
         super().__init__(*args, **kwargs)
         if eligible_users_queryset is not None:
             self.fields['assign_to'].queryset = eligible_users_queryset
+        if eligible_users_choices is not None:
+            self.fields['assign_to'].choices = [('', self.fields['assign_to'].empty_label), *eligible_users_choices]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('auto_assign'):
+            cleaned_data['assign_to'] = None  # Picked when the case is routed
+        elif not cleaned_data.get('assign_to') and 'assign_to' not in self.errors:
+            self.add_error('assign_to', "Select a user or choose automatic assignment.")
+        return cleaned_data
+
+
+# FORM FOR ROUTING MANY RECORDS AT ONCE
+class BulkRouteTaskForm(RouteTaskForm):
+    # The records are rendered as checkboxes in the template; this only validates the submitted ids
+    records = forms.ModelMultipleChoiceField(
+        queryset=iec_records.objects.none(),  # Set in the view
+        error_messages={'required': "Select at least one record to route."},
+    )
+
+    def __init__(self, *args, **kwargs):
+        records_queryset = kwargs.pop('records_queryset', None)
+        super().__init__(*args, **kwargs)
+        if records_queryset is not None:
+            self.fields['records'].queryset = records_queryset
 
 
 class NoticePCISubmissionForm(forms.ModelForm):
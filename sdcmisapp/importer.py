@@ -0,0 +1,205 @@
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from xml.etree.ElementTree import ParseError
+
+from django.db import transaction, DatabaseError
+
+from .dashboard_cache import invalidate_dashboards
+from .forms import IEC_AddForm
+from .models import iec_records, IEC_REF_KIND
+from .rollups import add_records
+from .search import index_records
+from .sequences import reserve_references, location_code_for
+from .transitions import compute_due_date
+from .workflow_def import CASE_WORKFLOW
+
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Columns read from the file; same fields as the "Add Initial Evaluation of Complaint" form
+IMPORT_COLUMNS = IEC_AddForm.Meta.fields
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+
+
+class ImportFileError(Exception):
+    """Raised when an import file cannot be read at all (bad format, missing columns...)."""
+
+
+class ImportResult:
+    """Outcome of an import: number of records created and the per-row errors."""
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # (row_number, message)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def _normalize_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _check_header(header):
+    missing = [column for column in IMPORT_COLUMNS if column != 'remarks' and column not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}. Expected: {', '.join(IMPORT_COLUMNS)}.")
+
+
+def read_csv_rows(text_file):
+    """
+    Yields (row_number, row_dict) from a CSV text stream, one row at a time.
+    Raises ImportFileError, when the rows are read, for text that is not UTF-8 or not CSV.
+    """
+    reader = csv.reader(text_file)
+    row_number = 1
+    try:
+        header = [_normalize_header(value) for value in next(reader, [])]
+        _check_header(header)
+        for row_number, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue  # Skip blank lines
+            yield row_number, dict(zip(header, values))
+    except UnicodeDecodeError:
+        # The text is decoded in blocks, so the bad bytes are in this row or a later one
+        raise ImportFileError(f"Row {row_number} or a later one is not UTF-8 text. Save the file as \"CSV UTF-8\" and import it again.")
+    except csv.Error as e:
+        raise ImportFileError(f"The file is not a readable CSV file (line {reader.line_num}: {e}).")
+
+
+def read_xlsx_rows(binary_file):
+    """Yields (row_number, row_dict) from the first sheet of an XLSX file, streamed in read-only mode."""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportFileError("Reading .xlsx files requires the openpyxl package (pip install openpyxl).")
+
+    # A corrupt file, or a zip that is not a workbook, fails when opened or as its sheet is read
+    unreadable = (zipfile.BadZipFile, InvalidFileException, KeyError, ParseError)
+    try:
+        workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    except unreadable as e:
+        raise ImportFileError(f"The file is not a readable .xlsx workbook ({e}).")
+    row_number = 1
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalize_header(value) for value in next(rows, ())]
+        _check_header(header)
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None or str(value).strip() == '' for value in values):
+                continue
+            row = {}
+            for column, value in zip(header, values):
+                if isinstance(value, datetime):
+                    value = value.date()
+                if isinstance(value, date):
+                    value = value.isoformat()
+                row[column] = '' if value is None else str(value)
+            yield row_number, row
+    except unreadable as e:
+        raise ImportFileError(f"The workbook could not be read past row {row_number} ({e}).")
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """
+    Returns a row iterator for an uploaded or opened file, chosen by extension.
+    `file` must be a binary stream. A file that cannot be read raises ImportFileError,
+    here or while iterating.
+    """
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return read_csv_rows(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    if name.endswith('.xlsx'):
+        return read_xlsx_rows(file)
+    raise ImportFileError(f"Unsupported file type. Use one of: {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+
+def _insert_chunk(chunk, created_by, result):
+    """Allocates a block of iec_ref numbers and bulk inserts a chunk of records in one transaction."""
+    if not chunk:
+        return
+    try:
+        with transaction.atomic():
+            references = reserve_references(IEC_REF_KIND, location_code_for(created_by), date.today().year, len(chunk))
+            for (_, record), reference in zip(chunk, references):
+                record.iec_ref = reference
+            records = iec_records.objects.bulk_create([record for _, record in chunk], batch_size=IMPORT_CHUNK_SIZE)
+            if any(record.pk is None for record in records):
+                # Backend could not return the new ids from the bulk insert; look them up by reference
+                ids_by_ref = dict(iec_records.objects.filter(iec_ref__in=references).values_list('iec_ref', 'id'))
+                for record in records:
+                    record.pk = ids_by_ref.get(record.iec_ref)
+            # bulk_create skips post_save, so index and count the new records and invalidate dashboards here
+            index_records(records)
+            add_records(records)
+            transaction.on_commit(lambda: invalidate_dashboards([created_by.pk]))
+    except DatabaseError as e:
+        for row_number, _ in chunk:
+            result.add_error(row_number, f"Not saved, the batch failed: {e}")
+    else:
+        result.created += len(chunk)
+
+
+def import_records(rows, created_by, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Validates rows with IEC_AddForm and inserts the valid ones in chunks.
+
+    Args:
+        rows: Iterable of (row_number, row_dict), e.g. from read_rows().
+        created_by (CustomUser): Creator and initial assignee of the records; their
+                                 location is used for the reference numbers.
+        chunk_size (int): Records inserted per transaction.
+        dry_run (bool): Only validate, do not insert anything.
+
+    Returns:
+        ImportResult
+
+    Raises:
+        ImportFileError: If the file cannot be read to the end; the chunks inserted
+                         before that are kept, and the message says how many records.
+    """
+    result = ImportResult()
+    try:
+        _import_rows(rows, created_by, chunk_size, dry_run, result)
+    except ImportFileError as e:
+        if result.created and not dry_run:
+            raise ImportFileError(f"{e} {result.created} record(s) from the rows before it had already been imported.") from e
+        raise
+    return result
+
+
+def _import_rows(rows, created_by, chunk_size, dry_run, result):
+    initial_step = CASE_WORKFLOW.initial_step
+    chunk = []
+
+    for row_number, row in rows:
+        form = IEC_AddForm(data={column: row.get(column, '') for column in IMPORT_COLUMNS})
+        if not form.is_valid():
+            message = "; ".join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items())
+            result.add_error(row_number, message)
+            continue
+
+        record = form.save(commit=False)
+        record.created_by = created_by
+        record.assigned_to = created_by  # Initially assign to the creator for the first step, as in iec_addrecord
+        if initial_step:
+            record.status = initial_step.key
+            record.due_date = compute_due_date(initial_step, record.date_received)
+
+        if dry_run:
+            result.created += 1
+            continue
+
+        chunk.append((row_number, record))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk, created_by, result)
+            chunk = []
+
+    if not dry_run:
+        _insert_chunk(chunk, created_by, result)
@@ -0,0 +1,45 @@
+from django.db.models import Field, Lookup
+from django.db.models.lookups import StartsWith
+
+
+@Field.register_lookup
+class NotEqual(Lookup):
+    """
+    field__ne=value -> "field <> value".
+
+    Unlike exclude()/~Q, which compile to NOT (field = value), a plain <>
+    comparison is allowed in filtered (partial) index predicates on SQL Server,
+    and queries using it match those indexes on every backend.
+    """
+    lookup_name = 'ne'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} <> {rhs}", (*lhs_params, *rhs_params)
+
+
+@Field.register_lookup
+class Prefix(Lookup):
+    """
+    field__prefix='IEC-NCR-' -> "field >= 'IEC-NCR-' AND field < 'IEC-NCR.'".
+
+    Same rows as startswith, written as a range so SQLite can seek the field's
+    index: it never uses an index for startswith, which compiles to LIKE ... ESCAPE.
+    SQL Server seeks LIKE 'prefix%' itself and its collations do not order by
+    code point, so there it stays a startswith.
+    """
+    lookup_name = 'prefix'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        prefix = self.rhs
+        if not prefix:
+            return f"{lhs} IS NOT NULL", lhs_params
+        # The first string after every string starting with prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return f"({lhs} >= %s AND {lhs} < %s)", (*lhs_params, prefix, *lhs_params, upper)
+
+    def as_microsoft(self, compiler, connection):
+        return StartsWith(self.lhs, self.rhs).as_sql(compiler, connection)
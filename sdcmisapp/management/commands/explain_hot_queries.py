@@ -0,0 +1,73 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, NotSupportedError
+from django.db.models import Q
+
+from sdcmisapp.models import iec_records, CustomUser
+from sdcmisapp.workflow_def import get_initial_status_key, RESOLVED_STEP_KEY
+
+
+def hot_queries(user, today):
+    """The iec_records queries issued on every dashboard/routing request, by name."""
+    return [
+        ("dashboard page (all records)", iec_records.objects.order_by('-id')[:25]),
+        ("dashboard page (investigator)", iec_records.objects.filter(Q(created_by=user) | Q(assigned_to=user)).order_by('-id')[:25]),
+        ("open tasks per assignee", iec_records.objects.filter(assigned_to=user, status__ne=RESOLVED_STEP_KEY)),
+        ("pending routing per creator", iec_records.objects.filter(created_by=user, status=get_initial_status_key())),
+        ("overdue open cases", iec_records.objects.overdue(today).order_by('due_date')),
+        ("most overdue first page", iec_records.objects.most_overdue_first(today)[:25]),
+        ("iec_ref prefix", iec_records.objects.filter(iec_ref__prefix=f"IEC-{(user.location or '').upper()}-{today.year}-")),
+    ]
+
+
+def explain(queryset):
+    """Returns the database's plan for a queryset as text."""
+    if connection.vendor == 'microsoft':
+        # mssql-django has no QuerySet.explain(); ask SQL Server for the estimated plan directly
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SET SHOWPLAN_TEXT ON")
+            try:
+                cursor.execute(sql, params)
+                lines = []
+                while True:
+                    lines.extend(row[0] for row in cursor.fetchall())
+                    if not cursor.nextset():
+                        break
+            finally:
+                cursor.execute("SET SHOWPLAN_TEXT OFF")
+        return "\n".join(lines)
+    return queryset.explain()
+
+
+class Command(BaseCommand):
+    help = "Prints the query plan and average latency of the hot iec_records queries, to check they use index seeks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to run the per-user queries for (defaults to the first investigator).")
+        parser.add_argument('--repeat', type=int, default=20, help="Times each query is executed for the latency figure.")
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = CustomUser.objects.filter(username=options['user']).first()
+        else:
+            user = CustomUser.objects.filter(role__in=['ier_inv', 'pci_inv']).order_by('id').first()
+        if user is None:
+            raise CommandError("No matching user found. Create users first or pass --user.")
+
+        self.stdout.write(f"Backend: {connection.vendor}, records: {iec_records.objects.count()}, user: {user.username}\n")
+        for name, queryset in hot_queries(user, date.today()):
+            try:
+                plan = explain(queryset)
+            except NotSupportedError as e:
+                plan = f"(plan not available: {e})"
+
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset.all())
+            elapsed_ms = (time.perf_counter() - started) * 1000 / options['repeat']
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {elapsed_ms:.2f} ms avg"))
+            self.stdout.write(plan + "\n")
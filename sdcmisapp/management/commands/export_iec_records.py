@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sdcmisapp.exports import iter_csv_lines
+from sdcmisapp.models import iec_records, CustomUser
+
+
+class Command(BaseCommand):
+    help = "Streams IEC records joined with their IER and PCI details to CSV (stdout by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write instead of stdout.")
+        parser.add_argument('--user', help="Only export the records this user sees on the dashboard.")
+        parser.add_argument('--location', help="Only records created in this location code (e.g. ncr).")
+        parser.add_argument('--status', help="Only records at this workflow step key.")
+        parser.add_argument('--overdue', action='store_true', help="Only open records past their due date.")
+
+    def handle(self, *args, **options):
+        records_qs = iec_records.objects.all()
+        if options['user']:
+            try:
+                records_qs = records_qs.for_user(CustomUser.objects.get(username=options['user']))
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+        records_qs = records_qs.apply_list_filters(options)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for line in iter_csv_lines(records_qs):
+                    output.write(line)
+        else:
+            for line in iter_csv_lines(records_qs):
+                self.stdout.write(line, ending='')
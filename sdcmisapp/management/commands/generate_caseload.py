@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sdcmisapp.caseload import generate_caseload, clear_caseload, GENERATE_BATCH_SIZE, BENCH_USER_PREFIX, BENCH_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a reproducible synthetic case load for benchmarking: users for every location and role "
+        f"(usernames starting with '{BENCH_USER_PREFIX}', password '{BENCH_PASSWORD}') and iec_records spread "
+        "over the workflow steps with their IER/PCI rows. Do not run against production data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=10000, help="Number of iec_records to create (up to millions).")
+        parser.add_argument('--users-per-role', type=int, default=2, help="Users created per location and role.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same case load.")
+        parser.add_argument('--batch-size', type=int, default=GENERATE_BATCH_SIZE, help="Records inserted per transaction.")
+        parser.add_argument('--no-search-index', action='store_true', help="Skip building the search index for the new records.")
+        parser.add_argument('--clear', action='store_true', help="Delete the previously generated users and records first.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"Deleted {clear_caseload()} generated record(s).")
+
+        started = time.perf_counter()
+
+        def progress(created):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {created}/{options['records']} records ({created / elapsed:.0f}/s)")
+
+        created = generate_caseload(
+            options['records'],
+            users_per_role=options['users_per_role'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            index_search=not options['no_search_index'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{created} record(s) generated in {time.perf_counter() - started:.1f}s."))
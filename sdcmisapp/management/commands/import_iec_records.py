@@ -0,0 +1,55 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sdcmisapp.models import CustomUser
+from sdcmisapp.importer import read_rows, import_records, ImportFileError, IMPORT_CHUNK_SIZE, IMPORT_COLUMNS
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports IEC case records from a CSV or XLSX file with the columns "
+        f"{', '.join(IMPORT_COLUMNS)}. Rows are validated like the Add IEC form "
+        "and inserted in chunks, one transaction per chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the .csv or .xlsx file.")
+        parser.add_argument('--user', required=True, help="Username recorded as creator/assignee; their location is used for the IEC reference numbers.")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Records inserted per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the file without inserting anything.")
+        parser.add_argument('--errors-csv', help="Write the per-row errors to this CSV file instead of the console.")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_records(
+                    read_rows(file, options['path']),
+                    created_by=user,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        if options['errors_csv']:
+            with open(options['errors_csv'], 'w', newline='', encoding='utf-8') as errors_file:
+                writer = csv.writer(errors_file)
+                writer.writerow(['row', 'error'])
+                writer.writerows(result.errors)
+        else:
+            for row_number, message in result.errors:
+                self.stderr.write(f"Row {row_number}: {message}")
+
+        verb = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} record(s) {verb}, {len(result.errors)} row(s) with errors, in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sdcmisapp.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the SLA rollup tables (StepRollup, DueDateRollup) from iec_records and CaseTransition."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} rollup row(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sdcmisapp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the case search index (SearchTerm table) from all iec_records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Records indexed per batch.")
+
+    def handle(self, *args, **options):
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} record(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from sdcmisapp.due_dates import recompute_due_dates, RECOMPUTE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Recomputes the due dates of all open cases on the current holiday calendar and workflow step durations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RECOMPUTE_BATCH_SIZE, help="Cases updated per transaction.")
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f"{result.checked} checked, {result.updated} updated...")
+
+        result = recompute_due_dates(batch_size=options['batch_size'], progress=progress if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.checked} open case(s) checked, {result.updated} due date(s) changed, "
+            f"{result.skipped} skipped (step start unknown)."
+        ))
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sdcmisapp.benchmarks import SCENARIOS, DEFAULT_ITERATIONS, BenchmarkError, run_benchmarks, compare_results, load_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures latency, query count and peak memory of the dashboard and workflow views against the "
+        "current data (see generate_caseload), and writes the results as JSON. Writing views are rolled back. "
+        "With --compare, prints the change against an earlier results file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write the results JSON to this file (default: print it).")
+        parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="Timed requests per scenario.")
+        parser.add_argument('--scenario', action='append', choices=[scenario.name for scenario in SCENARIOS], help="Only run this scenario (repeatable).")
+        parser.add_argument('--compare', help="Results JSON of an earlier run to compare with.")
+        parser.add_argument('--max-regression', type=float, help="With --compare, fail when a median latency grows by more than this percentage or a query count grows.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_results(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        def progress(name, result):
+            latency = result['latency_ms']
+            self.stderr.write(f"{name}: p50 {latency['p50']} ms, p95 {latency['p95']} ms, {result['queries']} queries, {result['peak_memory_kib']} KiB")
+
+        try:
+            results = run_benchmarks(options['scenario'], options['iterations'], progress=progress)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(results, indent=2))
+
+        if baseline is not None:
+            self.report_comparison(compare_results(baseline, results), options['max_regression'])
+
+    def report_comparison(self, rows, max_regression):
+        regressions = []
+        self.stderr.write(f"\n{'scenario':34} {'p50 ms':>19} {'change':>8} {'queries':>9} {'peak KiB':>19}")
+        for name, old_p50, new_p50, change, old_queries, new_queries, old_peak, new_peak in rows:
+            line = f"{name:34} {old_p50:>8} -> {new_p50:<8} {change:>+7}% {old_queries:>3} -> {new_queries:<3} {old_peak:>8} -> {new_peak:<8}"
+            regressed = max_regression is not None and (change > max_regression or new_queries > old_queries)
+            if regressed:
+                regressions.append(name)
+            self.stderr.write(self.style.ERROR(line) if regressed else line)
+        if regressions:
+            raise CommandError(f"Regression beyond {max_regression}% or more queries in: {', '.join(regressions)}")
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sdcmisapp.overdue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = "Flags records that have fallen overdue and unflags those that no longer are (safe to run repeatedly, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Sweep as of this date (YYYY-MM-DD) instead of today.")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date '{options['date']}', expected YYYY-MM-DD.")
+        flagged, unflagged = sweep_overdue(today)
+        self.stdout.write(self.style.SUCCESS(f"Flagged {flagged} record(s) overdue, unflagged {unflagged}."))
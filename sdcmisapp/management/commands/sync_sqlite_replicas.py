@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sdcmisapp.replicas import sync_sqlite_replicas, ReplicaError
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database over the SDCMIS_READ_REPLICAS SQLite files (for testing the read replicas locally)."
+
+    def handle(self, *args, **options):
+        try:
+            aliases = sync_sqlite_replicas()
+        except ReplicaError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Copied the primary database to {', '.join(aliases)}."))
@@ -0,0 +1,177 @@
+"""
+In-process request metrics: latency, SQL query count and SQL time per view,
+collected by middleware.MetricsMiddleware and served in the Prometheus text
+format by views.metrics.
+
+Each worker process keeps its own numbers (they start from zero on restart);
+Prometheus sums them across workers with sum by (view) (...).
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# Histogram upper bounds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Label for requests that did not resolve to a view (404s, etc.)
+UNRESOLVED_VIEW = '<unresolved>'
+
+# Other methods are counted as 'other', so clients cannot create unbounded label values
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+# SQL stats of the request being handled; a mutable object, so queries run by
+# async views in sync_to_async threads add to the same stats
+_request_sql = ContextVar('sdcmis_request_sql', default=None)
+
+
+class SqlStats:
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+class Histogram:
+    """Cumulative-on-export histogram; observe() is a short scan over a few buckets."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe per-view aggregates. One lock, held only for a few additions per request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}  # (view, method, status class) -> count
+            self.latency = {}  # view -> Histogram of seconds
+            self.queries = {}  # view -> Histogram of queries per request
+            self.sql_seconds = {}  # view -> total seconds spent in SQL
+
+    def record(self, view, method, status, seconds, sql):
+        with self._lock:
+            key = (view, method if method in KNOWN_METHODS else 'other', f'{status // 100}xx')
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if view not in self.latency:
+                self.latency[view] = Histogram(LATENCY_BUCKETS)
+                self.queries[view] = Histogram(QUERY_COUNT_BUCKETS)
+                self.sql_seconds[view] = 0.0
+            self.latency[view].observe(seconds)
+            self.queries[view].observe(sql.queries)
+            self.sql_seconds[view] += sql.seconds
+
+    def snapshot(self):
+        with self._lock:
+            return (
+                dict(self.requests),
+                {view: _copy(histogram) for view, histogram in self.latency.items()},
+                {view: _copy(histogram) for view, histogram in self.queries.items()},
+                dict(self.sql_seconds),
+            )
+
+
+def _copy(histogram):
+    copy = Histogram(histogram.buckets)
+    copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+    return copy
+
+
+registry = MetricsRegistry()
+
+
+def start_request():
+    """Starts collecting SQL stats for the current request; returns (stats, token for end_request)."""
+    stats = SqlStats()
+    return stats, _request_sql.set(stats)
+
+
+def end_request(token):
+    _request_sql.reset(token)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    stats = _request_sql.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_timer(connection, **kwargs):
+    """Adds the SQL timer to a database connection (once; called for every new connection)."""
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def install():
+    """Times the queries of every current and future database connection."""
+    connection_created.connect(install_query_timer, dispatch_uid='sdcmisapp_metrics_query_timer')
+    for connection in connections.all(initialized_only=True):
+        install_query_timer(connection)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, histograms):
+    for view, histogram in sorted(histograms.items()):
+        label = f'view="{_escape(view)}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{label},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}'
+        yield f'{name}_sum{{{label}}} {histogram.sum}'
+        yield f'{name}_count{{{label}}} {histogram.count}'
+
+
+def render_prometheus():
+    """The current metrics in the Prometheus text exposition format."""
+    requests, latency, queries, sql_seconds = registry.snapshot()
+    lines = [
+        '# HELP sdcmis_requests_total Requests handled, by view, method and status class.',
+        '# TYPE sdcmis_requests_total counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f'sdcmis_requests_total{{view="{_escape(view)}",method="{method}",status="{status}"}} {count}')
+
+    lines += [
+        '# HELP sdcmis_request_duration_seconds Time to build the response, by view.',
+        '# TYPE sdcmis_request_duration_seconds histogram',
+        *_histogram_lines('sdcmis_request_duration_seconds', latency),
+        '# HELP sdcmis_request_db_queries SQL queries per request, by view.',
+        '# TYPE sdcmis_request_db_queries histogram',
+        *_histogram_lines('sdcmis_request_db_queries', queries),
+        '# HELP sdcmis_request_db_seconds_total Time spent executing SQL, by view.',
+        '# TYPE sdcmis_request_db_seconds_total counter',
+    ]
+    for view, seconds in sorted(sql_seconds.items()):
+        lines.append(f'sdcmis_request_db_seconds_total{{view="{_escape(view)}"}} {seconds}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,96 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics, replicas
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, SQL query count and SQL time of every request, labelled
+    with the URL name it resolved to (see metrics.py). Works for sync and async views.
+    Put it first in MIDDLEWARE so the time spent in the other middleware is included.
+    For streaming responses (e.g. the CSV export) only the time to the first byte is measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sql, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self._record(request, response, time.perf_counter() - started, sql)
+        return response
+
+    async def __acall__(self, request):
+        sql, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self._record(request, response, time.perf_counter() - started, sql)
+        return response
+
+    def _record(self, request, response, seconds, sql):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            view = metrics.UNRESOLVED_VIEW  # 404s and other requests no URL pattern matched
+        else:
+            view = match.view_name if match.url_name else match._func_path  # Unnamed routes (the home page is named "")
+        metrics.registry.record(view, request.method, response.status_code, seconds, sql)
+
+
+class ReplicaMiddleware:
+    """
+    Marks GET/HEAD requests to the read-only views so ReplicaRouter reads them from a
+    replica (see replicas.py), and pins the client to the primary for a few seconds
+    after a request that wrote. Works for sync and async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = replicas.start_request()
+        request._replica_state = state
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state, token = replicas.start_request()
+        request._replica_state = state
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.end_request(token)
+        return self._finish(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas.use_replica(request._replica_state, request)
+
+    def _finish(self, response, state):
+        if state.replica is not None and response.streaming and not response.is_async:
+            response.streaming_content = replicas.in_request_state(response.streaming_content, state)
+        if state.wrote and replicas.replica_aliases():
+            response.set_cookie(replicas.PIN_COOKIE, '1', max_age=replicas.pin_seconds(), httponly=True, samesite='Lax')
+        return response
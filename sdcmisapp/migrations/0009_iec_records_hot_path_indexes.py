@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0008_referencesequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='iec_records',
+            index=models.Index(fields=['assigned_to', 'status'], name='iec_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iec_records',
+            index=models.Index(fields=['created_by', 'status'], name='iec_creator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iec_records',
+            index=models.Index(condition=models.Q(('status__ne', 'resolved')), fields=['due_date'], name='iec_open_due_date_idx'),
+        ),
+    ]
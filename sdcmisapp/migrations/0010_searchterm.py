@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0009_iec_records_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='sdcmisapp.iec_records')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'record'), name='unique_search_term_per_record')],
+            },
+        ),
+    ]
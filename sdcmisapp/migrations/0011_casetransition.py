@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0010_searchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_step', models.CharField(blank=True, max_length=100, null=True)),
+                ('to_step', models.CharField(max_length=100)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='case_transitions', to=settings.AUTH_USER_MODEL)),
+                ('from_assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='sdcmisapp.iec_records')),
+                ('to_assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['record', 'created_at'], name='case_transition_record_idx'), models.Index(fields=['from_step', 'created_at'], name='case_transition_step_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+from sdcmisapp.workflow_def import RESOLVED_STEP_KEY
+
+
+def populate_rollups(apps, schema_editor):
+    """Counts the records that existed before the rollup tables (later changes are counted incrementally)."""
+    iec_records = apps.get_model('sdcmisapp', 'iec_records')
+    StepRollup = apps.get_model('sdcmisapp', 'StepRollup')
+    DueDateRollup = apps.get_model('sdcmisapp', 'DueDateRollup')
+
+    steps = iec_records.objects.values('created_by__location', 'status').annotate(cases=Count('id')).order_by()
+    StepRollup.objects.bulk_create([
+        StepRollup(location=row['created_by__location'] or '', step=row['status'], cases=row['cases'])
+        for row in steps
+    ], batch_size=1000)
+    due_dates = (
+        iec_records.objects.exclude(status=RESOLVED_STEP_KEY).filter(due_date__isnull=False)
+        .values('created_by__location', 'status', 'due_date').annotate(cases=Count('id')).order_by()
+    )
+    DueDateRollup.objects.bulk_create([
+        DueDateRollup(location=row['created_by__location'] or '', step=row['status'], due_date=row['due_date'], cases=row['cases'])
+        for row in due_dates.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0011_casetransition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casetransition',
+            name='was_late',
+            field=models.BooleanField(null=True),
+        ),
+        migrations.CreateModel(
+            name='DueDateRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(blank=True, max_length=10)),
+                ('step', models.CharField(max_length=100)),
+                ('due_date', models.DateField()),
+                ('cases', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'step', 'due_date'), name='unique_due_date_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StepRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(blank=True, max_length=10)),
+                ('step', models.CharField(max_length=100)),
+                ('cases', models.IntegerField(default=0)),
+                ('completed_on_time', models.IntegerField(default=0)),
+                ('completed_late', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'step'), name='unique_step_rollup')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0012_sla_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='iec_records',
+            name='is_overdue',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='iec_records',
+            name='overdue_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='iec_records',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['overdue_since'], name='iec_overdue_flag_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0014_holiday'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='iec_records',
+            name='assigned_to',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_iec_records', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='iec_records',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_iec_records', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.db.models.functions import Cast
+
+
+def restamp_overdue_since(apps, schema_editor):
+    """Cases flagged before overdue_since followed the due date were stamped with the time of the sweep."""
+    iec_records = apps.get_model('sdcmisapp', 'iec_records')
+    overdue_since = ExpressionWrapper(Cast(F('due_date'), DateTimeField()) + timedelta(days=1), output_field=DateTimeField())
+    iec_records.objects.filter(is_overdue=True, due_date__isnull=False).update(overdue_since=overdue_since)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0015_drop_redundant_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(restamp_overdue_since, migrations.RunPython.noop),
+    ]
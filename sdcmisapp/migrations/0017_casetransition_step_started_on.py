@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:54
+
+from django.db import migrations, models
+from django.db.models import DateField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+
+from sdcmisapp.workflow_def import NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY
+
+
+def populate_step_started_on(apps, schema_editor):
+    """
+    The start date the views passed to transitions.advance(): the PCI dates the
+    respondent received the notice / the affidavit came in, else the day of the transition.
+    """
+    CaseTransition = apps.get_model('sdcmisapp', 'CaseTransition')
+    PreChargeInvestigation = apps.get_model('sdcmisapp', 'PreChargeInvestigation')
+    transition_day = Cast('created_at', DateField())
+    for from_step, received_on in [
+        (NOTICE_PCI_STEP_KEY, 'notice_pci_respondent_received_on'),
+        (COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, 'comment_counter_affidavit_received_on'),
+    ]:
+        received = PreChargeInvestigation.objects.filter(iec_record=OuterRef('record')).values(received_on)[:1]
+        CaseTransition.objects.filter(from_step=from_step).update(step_started_on=Coalesce(Subquery(received), transition_day))
+    CaseTransition.objects.filter(step_started_on__isnull=True).update(step_started_on=transition_day)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sdcmisapp', '0016_overdue_since_from_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casetransition',
+            name='step_started_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_step_started_on, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from datetime import date # For generating year in iec_ref
+from datetime import date, timedelta # For generating year in iec_ref
+from django.utils import timezone
 from django.conf import settings # To refer to AUTH_USER_MODEL
-from .workflow_def import get_status_choices, get_initial_status_key
+from .workflow_def import get_status_choices, get_initial_status_key, RESOLVED_STEP_KEY, CASE_WORKFLOW
+from . import lookups  # noqa: F401 (registers the __ne lookup used by the indexes below)
 
 
 # Create your models here.
 
 # Custom User registration
+# The CustomUser fields the routing roster depends on (see roster.py)
+ROSTER_STATE_FIELDS = ('username', 'role', 'location', 'is_active')
+
+
 class CustomUser(AbstractUser):
     LOCATION_CHOICES = [
         ('co', 'CENTRAL OFFICE'),
@@ -65,10 +71,138 @@ class CustomUser(AbstractUser):
         related_query_name="user",
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the routing roster shows of the user as loaded, so saves that change it invalidate it (see roster.py)
+        instance._loaded_roster_state = tuple(instance.__dict__.get(name) for name in ROSTER_STATE_FIELDS)
+        return instance
+
+    def get_session_auth_hash(self):
+        # Users rebuilt from the auth cache carry the hash instead of the password it is derived from (see backends.py)
+        if 'password' not in self.__dict__ and hasattr(self, '_session_auth_hash'):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
+# Reference number kinds handed out by the sequence allocator (see sequences.py)
+IEC_REF_KIND = 'IEC'
+PRECHARGE_NO_KIND = 'PCI'
+
+
+class ReferenceSequence(models.Model):
+    """
+    Holds the last number issued for a kind of reference (IEC ref, PCI no.)
+    per location and year. Incremented atomically by sequences.reserve_numbers().
+    """
+    kind = models.CharField(max_length=10)
+    location = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'location', 'year'], name='unique_reference_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}-{self.location}-{self.year}: {self.last_value}"
+
+
+class Holiday(models.Model):
+    """
+    A non-working day (regular and special non-working holidays). Weekends are never
+    working days; due dates are counted in working days (see business_days.py).
+    """
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date:%Y-%m-%d} {self.name}"
+
+# Roles that only see the records they created or are assigned to
+INVESTIGATOR_ROLES = ['ier_inv', 'pci_inv']
+
+
+class IecRecordQuerySet(models.QuerySet):
+    """Reusable iec_records query helpers, available as iec_records.objects.<method>()."""
+
+    def for_user(self, user):
+        """
+        Records visible to a user on the dashboard, exports, etc.
+        Investigators see the records they created or are assigned to; other roles see all records.
+        """
+        if user.role in INVESTIGATOR_ROLES:
+            # Both conditions are on this table (no join), so no duplicates and no distinct() needed
+            return self.filter(models.Q(created_by=user) | models.Q(assigned_to=user))
+        return self
+
+    def in_location(self, location):
+        """Records created by users of the given location code (e.g. 'ncr')."""
+        return self.filter(created_by__location=location)
+
+    def apply_list_filters(self, params, today=None):
+        """
+        Applies the optional ?location=, ?status= and ?overdue= filters shared by
+        the dashboard listing and the exports. `params` is request.GET or a dict.
+        """
+        queryset = self
+        if params.get('location'):
+            queryset = queryset.in_location(params['location'])
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('overdue'):
+            queryset = queryset.overdue(today)
+        return queryset
+
+    def with_urgency(self, today=None):
+        """
+        Annotates each record, in SQL, with:
+            time_remaining - due_date minus today as a duration (negative when overdue, None without a due date)
+            is_overdue_now - True when the due date has passed and the case is not resolved
+        """
+        today = today or date.today()
+        today_value = models.Value(today, output_field=models.DateField())
+        return self.annotate(
+            time_remaining=models.ExpressionWrapper(models.F('due_date') - today_value, output_field=models.DurationField()),
+            is_overdue_now=models.Case(
+                models.When(models.Q(due_date__lt=today, status__ne=RESOLVED_STEP_KEY), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+    def open_with_due_date(self):
+        """Cases that are not resolved and have a due date (the rows in the iec_open_due_date_idx partial index)."""
+        return self.filter(status__ne=RESOLVED_STEP_KEY, due_date__isnull=False)
+
+    def overdue(self, today=None):
+        """Open cases whose due date has passed."""
+        return self.open_with_due_date().filter(due_date__lt=today or date.today())
+
+    def most_overdue_first(self, today=None):
+        """
+        Open cases annotated with with_urgency(), earliest due date (i.e. most overdue) first.
+        The ordering follows the partial due_date index, so a page of it is one index range read.
+        """
+        return self.open_with_due_date().with_urgency(today).order_by(*URGENCY_ORDERING)
+
+
+# Ordering used by most_overdue_first(); ends in a unique field so it can be keyset paginated
+URGENCY_ORDERING = ('due_date', 'id')
+
+# The iec_records fields the SLA rollups depend on (see rollups.py)
+ROLLUP_STATE_FIELDS = ('created_by_id', 'status', 'due_date')
+
+
 # iec records
 class iec_records(models.Model):
     STATUS_CHOICES = get_status_choices() # Define choices using the imported function
 
+    objects = IecRecordQuerySet.as_manager()
+
     date_created = models.DateTimeField(auto_now_add=True) # Set on creation, not on every save
     date_received = models.DateField()
     iec_ref = models.CharField(max_length=50, unique=True, editable=False, blank=True) # Auto-generated
@@ -79,49 +213,57 @@ class iec_records(models.Model):
     # is_completed = models.BooleanField(default=False) # Consider deriving from status
     due_date = models.DateField(null=True, blank=True) # Allow due_date to be initially null
     status = models.CharField(max_length=100, choices=STATUS_CHOICES, default=get_initial_status_key) # Corrected single definition
-    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='created_iec_records', on_delete=models.SET_NULL, null=True)
-    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='assigned_iec_records', on_delete=models.SET_NULL, null=True, blank=True)
+    # No single-column FK indexes: iec_creator_status_idx and iec_assignee_status_idx lead with these columns
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='created_iec_records', on_delete=models.SET_NULL, null=True, db_index=False)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='assigned_iec_records', on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
+    # Maintained by the sweep_overdue command (see overdue.py) so reports can query "overdue right now";
+    # cleared when the case moves on. The dashboard still works the overdue state out from due_date.
+    is_overdue = models.BooleanField(default=False, editable=False)
+    overdue_since = models.DateTimeField(null=True, blank=True, editable=False)  # When the sweep first flagged it
 
     # Removed direct IER fields from here
     # initial_evaluation_submitted_on = models.DateField(null=True, blank=True)
     # initial_evaluation_director_approval_date = models.DateField(null=True, blank=True)
     # initial_evaluation_remarks = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Open tasks per assignee (investigator dashboards, "Tasks" card)
+            models.Index(fields=['assigned_to', 'status'], name='iec_assignee_status_idx'),
+            # Records awaiting routing per creator ("Pending Requests" card, routing)
+            models.Index(fields=['created_by', 'status'], name='iec_creator_status_idx'),
+            # Overdue/urgency lookups only ever look at cases that are not resolved
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(status__ne=RESOLVED_STEP_KEY),
+                name='iec_open_due_date_idx',
+            ),
+            # Flagged overdue cases, longest overdue first; also what the sweep's unflagging reads
+            models.Index(
+                fields=['overdue_since'],
+                condition=models.Q(is_overdue=True),
+                name='iec_overdue_flag_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.iec_ref} - {self.complainant} ({self.get_status_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the creator/assignee as loaded, so caches of a previous assignee can be invalidated on save
+        instance._loaded_user_ids = (instance.__dict__.get('created_by_id'), instance.__dict__.get('assigned_to_id'))
+        # ...and what the SLA rollups counted it under (see rollups.py); None if any of it was deferred
+        if all(name in instance.__dict__ for name in ROLLUP_STATE_FIELDS):
+            instance._loaded_rollup_state = tuple(instance.__dict__[name] for name in ROLLUP_STATE_FIELDS)
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.pk and not self.iec_ref:  # Only generate if it's a new record and iec_ref isn't already set
-            user_location_code = "NOLOC"  # Default if user or user's location is not set
-
-            if self.created_by:
-                if self.created_by.location: # Check if location is not None or empty
-                    user_location_code = self.created_by.location.upper()
-                # If self.created_by exists but self.created_by.location is None/empty, NOLOC is used.
-            # If self.created_by is None, NOLOC is used.
-
-            current_year = date.today().year
-
-            base_ref_prefix = f"IEC-{user_location_code}-{current_year}-"
-
-            # Find the last record for this location and year to determine the next sequence number
-            last_record = iec_records.objects.filter(
-                iec_ref__startswith=base_ref_prefix
-            ).order_by('iec_ref').last()
-
-            next_sequence_number = 1
-            if last_record and last_record.iec_ref:
-                try:
-                    # Extract the sequence part from the full iec_ref
-                    # Example: IER-NCR-2023-0012 -> 0012
-                    sequence_str = last_record.iec_ref.split('-')[-1]
-                    next_sequence_number = int(sequence_str) + 1
-                except (IndexError, ValueError) as e:
-                    # Log this error or handle it. For now, default to 1 if parsing fails.
-                    # This might happen if an existing iec_ref has an unexpected format.
-                    print(f"Error parsing sequence from {last_record.iec_ref}: {e}") # Consider proper logging
-                    pass # next_sequence_number remains 1
-
-            self.iec_ref = f"{base_ref_prefix}{next_sequence_number:04d}"
+            # Numbers come from the per-location/year sequence table (one atomic increment, no prefix scan)
+            from .sequences import next_reference, location_code_for
+            self.iec_ref = next_reference(IEC_REF_KIND, location_code_for(self.created_by), date.today().year)
         super().save(*args, **kwargs)
 
 
@@ -214,3 +356,163 @@ class PreChargeInvestigation(models.Model):
 
     def __str__(self):
         return f"PCI No: {self.precharge_no} (IEC Ref: {self.iec_record.iec_ref})"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.precharge_no:
+            # Pre-fill the PCI number from the same sequence allocator as iec_ref; staff can still edit it
+            from .sequences import next_reference, location_code_for
+            self.precharge_no = next_reference(PRECHARGE_NO_KIND, location_code_for(self.iec_record.created_by), date.today().year)
+        super().save(*args, **kwargs)
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted index for case search: one row per distinct word of a record's
+    searchable fields, with a relevance weight. Maintained by search.py when
+    records are saved, so searches are index range reads on `term` instead of
+    LIKE '%...%' scans of iec_records.
+    """
+    term = models.CharField(max_length=50)
+    record = models.ForeignKey(iec_records, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # Also serves as the (term, record) index used by prefix searches
+            models.UniqueConstraint(fields=['term', 'record'], name='unique_search_term_per_record'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.record_id} ({self.weight})"
+
+
+class CaseTransitionQuerySet(models.QuerySet):
+    """Transitions are append-only: rows are never updated, and only deleted together with their case."""
+
+    def update(self, **kwargs):
+        raise TypeError("Case transitions are append-only and cannot be updated.")
+
+    def delete(self):
+        raise TypeError("Case transitions are append-only and cannot be deleted.")
+
+    def timeline(self, record_id):
+        """A case's transitions, oldest first (a range read on case_transition_record_idx)."""
+        return self.filter(record_id=record_id).order_by('created_at', 'id')
+
+    def step_durations(self, since=None, until=None):
+        """
+        Per step: number of cases that left it, and the average/longest time they spent
+        there in seconds, for transitions in [since, until). Reads case_transition_step_idx.
+        """
+        queryset = self.filter(from_step__isnull=False)
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+        return (
+            queryset.values('from_step')
+            .annotate(
+                cases=models.Count('id'),
+                avg_seconds=models.Avg('duration_seconds'),
+                max_seconds=models.Max('duration_seconds'),
+            )
+            .order_by('from_step')
+        )
+
+
+class CaseTransition(models.Model):
+    """
+    One workflow step change of a case, appended (by transitions.advance()) in the
+    same transaction as the change itself. duration_seconds is the time the case
+    spent in from_step, so step statistics need no self-join.
+    """
+    record = models.ForeignKey(iec_records, on_delete=models.CASCADE, related_name='transitions')
+    from_step = models.CharField(max_length=100, null=True, blank=True)
+    to_step = models.CharField(max_length=100)
+    from_assignee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    to_assignee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='case_transitions')
+    due_date = models.DateField(null=True, blank=True) # Due date set for to_step
+    step_started_on = models.DateField(null=True, blank=True) # The day to_step's due date is counted from
+    created_at = models.DateTimeField(default=timezone.now)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True)
+    was_late = models.BooleanField(null=True) # from_step was completed after its due date (None when it had none)
+
+    objects = CaseTransitionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-case timeline
+            models.Index(fields=['record', 'created_at'], name='case_transition_record_idx'),
+            # Per-step duration statistics over a period
+            models.Index(fields=['from_step', 'created_at'], name='case_transition_step_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.record_id}: {self.from_step} -> {self.to_step} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    @staticmethod
+    def _step_description(key):
+        step = CASE_WORKFLOW.get_step(key)
+        return step.description if step else key
+
+    @property
+    def from_step_display(self):
+        return self._step_description(self.from_step) if self.from_step else None
+
+    @property
+    def to_step_display(self):
+        return self._step_description(self.to_step)
+
+    @property
+    def entered_at(self):
+        """When the case entered from_step (None when unknown)."""
+        return self.created_at - timedelta(seconds=self.duration_seconds) if self.duration_seconds is not None else None
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Case transitions are append-only and cannot be updated.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Case transitions are append-only and cannot be deleted.")
+
+
+class StepRollup(models.Model):
+    """
+    Per creator location and workflow step: the cases currently at the step and how many
+    left it on time / late. Maintained incrementally by rollups.py (rebuild_rollups rebuilds it).
+    """
+    location = models.CharField(max_length=10, blank=True) # '' when the creator has no location
+    step = models.CharField(max_length=100)
+    cases = models.IntegerField(default=0)
+    completed_on_time = models.IntegerField(default=0)
+    completed_late = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'step'], name='unique_step_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.location or '-'} / {self.step}: {self.cases}"
+
+
+class DueDateRollup(models.Model):
+    """
+    Open cases per creator location, step and due date. The cases overdue on a given day
+    are the rows with an earlier due_date, so no job has to run when cases fall overdue.
+    Holds one row per distinct open due date, however many cases there are.
+    """
+    location = models.CharField(max_length=10, blank=True)
+    step = models.CharField(max_length=100)
+    due_date = models.DateField()
+    cases = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'step', 'due_date'], name='unique_due_date_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.location or '-'} / {self.step} / {self.due_date}: {self.cases}"
@@ -0,0 +1,39 @@
+"""
+The overdue sweep: keeps iec_records.is_overdue / overdue_since in step with the
+due dates, so "overdue right now" is a plain indexed filter for reports, exports
+and the API. Run it from cron (manage.py sweep_overdue), e.g. just after midnight.
+
+Each run is two set-based UPDATEs, and each only touches records whose flag is
+wrong, so running it again the same day changes nothing.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F, Q
+from django.db.models.functions import Cast
+
+from .models import iec_records
+from .workflow_def import RESOLVED_STEP_KEY
+
+
+# When a case became overdue: the start of the day after its due date, whenever the sweep ran
+OVERDUE_SINCE = ExpressionWrapper(Cast(F('due_date'), DateTimeField()) + timedelta(days=1), output_field=DateTimeField())
+
+
+def sweep_overdue(today=None):
+    """
+    Flags the open cases whose due date has passed (stamping overdue_since with the
+    day after the due date) and unflags those that are resolved, moved on or got a
+    later due date. Returns (flagged, unflagged) record counts.
+    """
+    today = today or date.today()
+    with transaction.atomic():
+        # Reads the open due_date partial index (iec_open_due_date_idx)
+        flagged = iec_records.objects.overdue(today).filter(is_overdue=False).update(is_overdue=True, overdue_since=OVERDUE_SINCE)
+        # Reads the flagged-rows partial index (iec_overdue_flag_idx)
+        unflagged = (
+            iec_records.objects.filter(is_overdue=True)
+            .filter(Q(status=RESOLVED_STEP_KEY) | Q(due_date__isnull=True) | Q(due_date__gte=today))
+            .update(is_overdue=False, overdue_since=None)
+        )
+    return flagged, unflagged
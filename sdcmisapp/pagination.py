@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+# Salt for the signed cursors so they can't be swapped with other signed values
+CURSOR_SALT = 'sdcmisapp.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor string cannot be decoded (tampered, stale format, etc.)."""
+
+
+def get_page_size(request, default=None):
+    """
+    Returns the page size for a request.
+
+    Uses ?page_size= when present, otherwise SDCMIS_PAGE_SIZE from settings,
+    clamped between 1 and SDCMIS_MAX_PAGE_SIZE.
+    """
+    if default is None:
+        default = getattr(settings, 'SDCMIS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    max_size = getattr(settings, 'SDCMIS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, max_size))
+
+
+class KeysetPage:
+    """
+    One page of results from a KeysetPaginator.
+    Cursors are opaque strings to be passed back as ?cursor=.
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Keyset (seek) pagination over a queryset.
+
+    Instead of OFFSET, each page filters on the ordering key of the last row
+    seen (e.g. WHERE id < 1234 ORDER BY id DESC), so every page is a single
+    index range read and rows inserted while browsing never shift later pages.
+
+    The ordering must end in a unique field (the default is ('-id',)).
+    Works with model querysets as well as values() querysets.
+    """
+    def __init__(self, queryset, page_size=DEFAULT_PAGE_SIZE, ordering=('-id',)):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def _key_of(self, item):
+        if isinstance(item, dict):
+            return [item[field] for field in self.fields]
+        return [getattr(item, field) for field in self.fields]
+
+    def _encode(self, direction, key):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in key]
+        return signing.dumps({'d': direction, 'o': self.ordering, 'k': values}, salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            direction, ordering, values = data['d'], data['o'], data['k']
+        except (signing.BadSignature, KeyError, TypeError) as e:
+            raise InvalidCursor(str(e))
+        if direction not in ('n', 'p') or tuple(ordering) != self.ordering or len(values) != len(self.fields):
+            raise InvalidCursor("Cursor does not match this listing.")
+        return direction, [self._to_python(field, value) for field, value in zip(self.fields, values)]
+
+    def _to_python(self, field_name, value):
+        # Convert isoformat strings back to dates etc. using the model field or annotation
+        query = self.queryset.query
+        if field_name in query.annotations:
+            output_field = query.annotations[field_name].output_field
+        else:
+            output_field = self.queryset.model._meta.get_field(field_name)
+        return output_field.to_python(value)
+
+    def _seek_filter(self, key, forward):
+        """
+        Builds the lexicographic "row comes after key" filter for the ordering:
+        (a > x) OR (a = x AND b > y) ... with > / < flipped per field direction.
+        """
+        condition = Q()
+        for position in range(len(self.fields) - 1, -1, -1):
+            field = self.fields[position]
+            descending = self.ordering[position].startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field}__{lookup}': key[position]})
+            if position < len(self.fields) - 1:
+                step |= Q(**{field: key[position]}) & condition
+            condition = step
+        return condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _page_queryset(self, cursor):
+        """Returns (direction, queryset) for the page after/before the cursor, fetching one extra row."""
+        size = self.page_size
+        if not cursor:
+            return None, self.queryset.order_by(*self.ordering)[:size + 1]
+        direction, key = self._decode(cursor)
+        if direction == 'n':
+            return direction, self.queryset.filter(self._seek_filter(key, True)).order_by(*self.ordering)[:size + 1]
+        # Walk backwards with the ordering flipped, rows are put back in display order in _make_page
+        return direction, self.queryset.filter(self._seek_filter(key, False)).order_by(*self._reversed_ordering())[:size + 1]
+
+    def _make_page(self, direction, rows):
+        size = self.page_size
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if direction is None:
+            return KeysetPage(
+                rows,
+                next_cursor=self._encode('n', self._key_of(rows[-1])) if has_more else None,
+                page_size=size,
+            )
+        if direction == 'n':
+            next_cursor = self._encode('n', self._key_of(rows[-1])) if has_more else None
+            previous_cursor = self._encode('p', self._key_of(rows[0])) if rows else None
+        else:
+            rows.reverse()
+            previous_cursor = self._encode('p', self._key_of(rows[0])) if has_more else None
+            next_cursor = self._encode('n', self._key_of(rows[-1])) if rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor, page_size=size)
+
+    def get_page(self, cursor=None):
+        """
+        Returns the KeysetPage for the given cursor (None for the first page).
+        Raises InvalidCursor for cursors that cannot be decoded.
+        """
+        direction, queryset = self._page_queryset(cursor)
+        return self._make_page(direction, list(queryset))
+
+    async def aget_page(self, cursor=None):
+        """Async version of get_page(), for async views."""
+        direction, queryset = self._page_queryset(cursor)
+        return self._make_page(direction, [row async for row in queryset])
@@ -0,0 +1,169 @@
+"""
+Read replicas: read-only pages (REPLICA_VIEWS) read the case data from one of the
+SDCMIS_READ_REPLICAS database aliases instead of the primary (default), so heavy
+dashboard and report reads do not compete with workflow writes.
+
+    ReplicaRouter       routes the reads of a request marked by middleware.ReplicaMiddleware
+    SDCMIS_READ_REPLICAS  replica aliases in DATABASES; empty (the default) sends everything to primary
+
+A request is only read from a replica when it is a GET/HEAD of one of REPLICA_VIEWS.
+Everything else stays on the primary:
+    - writes, always; and once a request has written, its later reads too (read-after-write)
+    - requests for SDCMIS_REPLICA_PIN_SECONDS after one that wrote (a cookie), so a
+      user redirected to the dashboard after routing a case sees the change despite
+      replication lag
+    - sessions, users and other apps' tables, so logging in never depends on the lag
+
+Replicas are never migrated (they get the schema by replication). Locally, two
+SQLite files can stand in for primary and replica; manage.py sync_sqlite_replicas
+copies the primary file over the replicas.
+"""
+import contextvars
+import random
+import sqlite3
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# URL names of the read-only views served from a replica
+REPLICA_VIEWS = frozenset({'dashboard', 'view_iec', 'search', 'export_iec_csv', 'national_overview'})
+
+SAFE_METHODS = frozenset({'GET', 'HEAD'})
+
+# Set on responses to requests that wrote; while present, requests read from the primary
+PIN_COOKIE = 'sdcmis_primary'
+
+DEFAULT_PIN_SECONDS = 5
+
+# Read state of the request being handled; a mutable object, so queries run by
+# async views in sync_to_async threads see (and pin) the same state
+_request_reads = ContextVar('sdcmis_request_reads', default=None)
+
+
+class ReadState:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None  # Alias to read from, when the request may use a replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'SDCMIS_READ_REPLICAS', []))
+
+
+def pin_seconds():
+    return getattr(settings, 'SDCMIS_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def start_request():
+    """Starts tracking the reads and writes of the current request; returns (state, token for end_request)."""
+    state = ReadState()
+    return state, _request_reads.set(state)
+
+
+def end_request(token):
+    _request_reads.reset(token)
+
+
+def in_request_state(iterator, state):
+    """
+    Iterates in a context where state is the request's read state, for streaming
+    responses (e.g. the CSV export), whose rows are read after the middleware returns.
+    """
+    context = contextvars.copy_context()
+    context.run(_request_reads.set, state)
+    iterator = iter(iterator)
+    while True:
+        try:
+            chunk = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield chunk
+
+
+def reading_from_replica():
+    """True when the case data read now (in the current request) comes from a replica, which may lag."""
+    state = _request_reads.get()
+    return state is not None and state.replica is not None and not state.wrote
+
+
+def use_replica(state, request):
+    """Lets the request read from a replica when it is a GET/HEAD of a replica view and not pinned to the primary."""
+    replicas = replica_aliases()
+    match = getattr(request, 'resolver_match', None)
+    if (
+        replicas
+        and request.method in SAFE_METHODS
+        and match is not None and match.url_name in REPLICA_VIEWS
+        and PIN_COOKIE not in request.COOKIES
+    ):
+        state.replica = random.choice(replicas)  # One replica for the whole request
+
+
+def _replicated(model):
+    return model._meta.app_label == 'sdcmisapp' and model._meta.label != settings.AUTH_USER_MODEL
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _request_reads.get()
+        if state is None:
+            return None  # Not in a request (management commands...): Django's default
+        if state.replica is None or state.wrote or not _replicated(model):
+            # Explicit, else related rows of an instance read from a replica would be read there too
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_reads.get()
+        if state is not None:
+            state.wrote = True  # The rest of the request reads what it wrote
+        # Explicit, else Django would write an instance back to the database it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaError(Exception):
+    """Raised when the SQLite stand-in replicas cannot be refreshed from the configuration."""
+
+
+def sync_sqlite_replicas():
+    """
+    Copies the primary SQLite database over every replica (SQLite's online backup, so
+    the primary may be in use), standing in for replication when testing locally.
+    Returns the aliases copied.
+    """
+    aliases = replica_aliases()
+    if not aliases:
+        raise ReplicaError("SDCMIS_READ_REPLICAS is empty; there is no replica to copy to.")
+    databases = {alias: connections[alias].settings_dict for alias in [DEFAULT_DB_ALIAS, *aliases]}
+    for alias, database in databases.items():
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise ReplicaError(f"Database '{alias}' is not SQLite; real replicas are kept in sync by the database server.")
+
+    primary = sqlite3.connect(databases[DEFAULT_DB_ALIAS]['NAME'])
+    try:
+        for alias in aliases:
+            connections[alias].close()
+            replica = sqlite3.connect(databases[alias]['NAME'])
+            try:
+                primary.backup(replica)
+            finally:
+                replica.close()
+    finally:
+        primary.close()
+    return aliases
@@ -0,0 +1,287 @@
+"""
+SLA rollups: case counts per creator location and workflow step, kept up to date
+as cases are created, change step and are deleted, so the national overview reads
+a few hundred rollup rows instead of scanning iec_records.
+
+    StepRollup     cases at each step, and how many left it on time / late
+    DueDateRollup  open cases per due date, from which the overdue counts follow
+
+Saved records are handled by the signal receivers in signals.py, as are creators
+changing location (creator_moved()); code that bulk inserts records (importer,
+caseload generator) calls add_records(), and bulk deletes run inside rebuilt_after().
+rebuild() recomputes everything from iec_records and CaseTransition.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import iec_records, CustomUser, CaseTransition, StepRollup, DueDateRollup, ROLLUP_STATE_FIELDS
+from .workflow_def import CASE_WORKFLOW, RESOLVED_STEP_KEY
+
+
+# StepRollup/DueDateRollup location for cases whose creator has no location
+NO_LOCATION = ''
+
+# True inside rebuilt_after(): the signal receivers leave the rollups alone
+_suspended = ContextVar('sdcmis_rollups_suspended', default=False)
+
+
+def is_suspended():
+    return _suspended.get()
+
+
+@contextmanager
+def rebuilt_after():
+    """
+    Skips the per-record rollup updates for the changes made inside the block and
+    rebuilds the tables once at the end. For bulk deletes, where Django sends a
+    post_delete signal (and so a few rollup queries) per record.
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+    rebuild()
+
+
+def _locations_of(user_ids):
+    """{user id: location code} for the given creators, in one query."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    return dict(CustomUser.objects.filter(pk__in=user_ids).values_list('pk', 'location'))
+
+
+def _bump(model, keys, **deltas):
+    """
+    Adds the deltas to the rollup row with the given keys, creating it if needed.
+    Same pattern as sequences.reserve_numbers(): one UPDATE ... SET n = n + delta,
+    and a create in a savepoint when the row does not exist yet.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    with transaction.atomic():
+        if model.objects.filter(**keys).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**keys, **deltas)
+        except IntegrityError:
+            # Created concurrently; add to it
+            model.objects.filter(**keys).update(**updates)
+
+
+def _contributions(states, locations):
+    """
+    Turns (created_by_id, status, due_date) states into the rollup counts they make up:
+    ({(location, step): cases}, {(location, step, due_date): open cases}).
+    """
+    steps, due_dates = Counter(), Counter()
+    for created_by_id, status, due_date in states:
+        location = locations.get(created_by_id) or NO_LOCATION
+        steps[location, status] += 1
+        if due_date is not None and status != RESOLVED_STEP_KEY:
+            due_dates[location, status, due_date] += 1
+    return steps, due_dates
+
+
+def _apply(steps, due_dates):
+    """Adds count deltas (negative to remove cases) to the rollup rows."""
+    for (location, step), cases in steps.items():
+        _bump(StepRollup, {'location': location, 'step': step}, cases=cases)
+    for (location, step, due_date), cases in due_dates.items():
+        keys = {'location': location, 'step': step, 'due_date': due_date}
+        _bump(DueDateRollup, keys, cases=cases)
+        if cases < 0:
+            DueDateRollup.objects.filter(**keys, cases__lte=0).delete()  # Keep the table to the open due dates
+
+
+def record_state(record):
+    """What the rollups count a record under: (created_by_id, status, due_date)."""
+    return tuple(getattr(record, name) for name in ROLLUP_STATE_FIELDS)
+
+
+def record_changed(old_state, new_state):
+    """
+    Moves a record's counts from old_state to new_state (either may be None, for
+    creation and deletion). Nothing is written when the state did not change.
+    """
+    records_changed([(old_state, new_state)])
+
+
+def records_changed(changes):
+    """record_changed() for many (old_state, new_state) pairs, writing each rollup row once."""
+    changes = [(old_state, new_state) for old_state, new_state in changes if old_state != new_state]
+    if not changes:
+        return
+    old = [old_state for old_state, _ in changes if old_state]
+    new = [new_state for _, new_state in changes if new_state]
+    locations = _locations_of(state[0] for state in old + new)
+    with transaction.atomic():
+        old_steps, old_due_dates = _contributions(old, locations)
+        new_steps, new_due_dates = _contributions(new, locations)
+        # Only the difference is written, e.g. nothing for the StepRollup when only the due date moved
+        steps = Counter(new_steps)
+        steps.subtract(old_steps)
+        due_dates = Counter(new_due_dates)
+        due_dates.subtract(old_due_dates)
+        _apply(steps, due_dates)
+
+
+def add_records(records):
+    """Counts records inserted without signals (bulk_create)."""
+    states = [record_state(record) for record in records]
+    steps, due_dates = _contributions(states, _locations_of(state[0] for state in states))
+    with transaction.atomic():
+        _apply(steps, due_dates)
+
+
+def transition_recorded(transition):
+    """Counts a step completed on time or late (transitions out of steps without due date are not counted)."""
+    transitions_recorded([transition])
+
+
+def transitions_recorded(transitions):
+    """transition_recorded() for many transitions (e.g. bulk created), writing each rollup row once."""
+    counted = [transition for transition in transitions if transition.was_late is not None and transition.from_step]
+    if not counted:
+        return
+    creators = dict(iec_records.objects.filter(pk__in={transition.record_id for transition in counted}).values_list('pk', 'created_by_id'))
+    locations = _locations_of(creators.values())
+    completions = Counter()
+    for transition in counted:
+        location = locations.get(creators.get(transition.record_id)) or NO_LOCATION
+        completions[location, transition.from_step, 'completed_late' if transition.was_late else 'completed_on_time'] += 1
+    with transaction.atomic():
+        for (location, step, field), count in completions.items():
+            _bump(StepRollup, {'location': location, 'step': step}, **{field: count})
+
+
+def creator_moved(user_id, old_location, new_location):
+    """
+    Moves the counts of the cases a user created from old_location to new_location:
+    the rollups count cases under their creator's location, which changed (or was lost,
+    for a deleted creator whose cases are kept without one). Three grouped queries.
+    """
+    old_location, new_location = old_location or NO_LOCATION, new_location or NO_LOCATION
+    if old_location == new_location:
+        return
+    steps, due_dates = Counter(), Counter()
+    for row in iec_records.objects.filter(created_by_id=user_id).values('status').annotate(cases=Count('id')).order_by():
+        steps[old_location, row['status']] -= row['cases']
+        steps[new_location, row['status']] += row['cases']
+    open_cases = iec_records.objects.open_with_due_date().filter(created_by_id=user_id)
+    for row in open_cases.values('status', 'due_date').annotate(cases=Count('id')).order_by():
+        due_dates[old_location, row['status'], row['due_date']] -= row['cases']
+        due_dates[new_location, row['status'], row['due_date']] += row['cases']
+    completed = (
+        CaseTransition.objects.filter(record__created_by_id=user_id, was_late__isnull=False)
+        .values('from_step')
+        .annotate(late=Count('id', filter=Q(was_late=True)), on_time=Count('id', filter=Q(was_late=False)))
+        .order_by()
+    )
+    with transaction.atomic():
+        _apply(steps, due_dates)
+        for row in completed:
+            for location, sign in ((old_location, -1), (new_location, 1)):
+                _bump(
+                    StepRollup, {'location': location, 'step': row['from_step']},
+                    completed_on_time=sign * row['on_time'], completed_late=sign * row['late'],
+                )
+
+
+@transaction.atomic
+def rebuild():
+    """Recomputes both rollup tables from scratch with three grouped queries. Returns the rows written."""
+    StepRollup.objects.all().delete()
+    DueDateRollup.objects.all().delete()
+
+    rows = {}
+    for row in iec_records.objects.values('created_by__location', 'status').annotate(cases=Count('id')).order_by():
+        key = (row['created_by__location'] or NO_LOCATION, row['status'])
+        rows[key] = StepRollup(location=key[0], step=key[1], cases=row['cases'])
+
+    completions = (
+        CaseTransition.objects.filter(was_late__isnull=False)
+        .values('record__created_by__location', 'from_step')
+        .annotate(late=Count('id', filter=Q(was_late=True)), on_time=Count('id', filter=Q(was_late=False)))
+        .order_by()
+    )
+    for row in completions:
+        key = (row['record__created_by__location'] or NO_LOCATION, row['from_step'])
+        rollup = rows.setdefault(key, StepRollup(location=key[0], step=key[1]))
+        rollup.completed_on_time += row['on_time']
+        rollup.completed_late += row['late']
+    StepRollup.objects.bulk_create(rows.values(), batch_size=1000)
+
+    due_dates = (
+        iec_records.objects.open_with_due_date()
+        .values('created_by__location', 'status', 'due_date')
+        .annotate(cases=Count('id'))
+        .order_by()
+    )
+    due_date_rows = DueDateRollup.objects.bulk_create([
+        DueDateRollup(location=row['created_by__location'] or NO_LOCATION, step=row['status'], due_date=row['due_date'], cases=row['cases'])
+        for row in due_dates.iterator()
+    ], batch_size=1000)
+    return len(rows) + len(due_date_rows)
+
+
+def national_overview(today=None):
+    """
+    Backlog, overdue and on-time numbers per location and per step, read from the
+    rollup tables (two small grouped queries, whatever the number of cases).
+
+    Returns {'locations': [...], 'steps': [...], 'totals': {...}}, each row a dict with
+    cases, backlog (open cases), overdue, completed_on_time, completed_late and on_time_rate (%).
+    """
+    today = today or date.today()
+    locations, steps = {}, {}
+
+    def row(table, key, **initial):
+        return table.setdefault(key, {**initial, 'cases': 0, 'backlog': 0, 'overdue': 0, 'completed_on_time': 0, 'completed_late': 0})
+
+    for rollup in StepRollup.objects.all():
+        for target in (row(locations, rollup.location, location=rollup.location), row(steps, rollup.step, step=rollup.step)):
+            target['cases'] += rollup.cases
+            if rollup.step != RESOLVED_STEP_KEY:
+                target['backlog'] += rollup.cases
+            target['completed_on_time'] += rollup.completed_on_time
+            target['completed_late'] += rollup.completed_late
+
+    overdue = (
+        DueDateRollup.objects.filter(due_date__lt=today, cases__gt=0)
+        .values('location', 'step')
+        .annotate(overdue=Sum('cases'))
+        .order_by()
+    )
+    for item in overdue:
+        row(locations, item['location'], location=item['location'])['overdue'] += item['overdue']
+        row(steps, item['step'], step=item['step'])['overdue'] += item['overdue']
+
+    location_names = dict(CustomUser.LOCATION_CHOICES)
+    location_order = {code: index for index, (code, _) in enumerate(CustomUser.LOCATION_CHOICES)}
+    totals = row({}, None)
+    for item in locations.values():
+        item['name'] = location_names.get(item['location'], item['location'] or 'No location')
+        for field in ('cases', 'backlog', 'overdue', 'completed_on_time', 'completed_late'):
+            totals[field] += item[field]
+    for item in steps.values():
+        step = CASE_WORKFLOW.get_step(item['step'])
+        item['name'] = step.description if step else item['step']
+    for item in [*locations.values(), *steps.values(), totals]:
+        completed = item['completed_on_time'] + item['completed_late']
+        item['on_time_rate'] = round(item['completed_on_time'] * 100 / completed) if completed else None
+
+    return {
+        'locations': sorted(locations.values(), key=lambda item: location_order.get(item['location'], len(location_order))),
+        'steps': sorted(steps.values(), key=lambda item: CASE_WORKFLOW.index_of(item['step']) if item['step'] in CASE_WORKFLOW else len(CASE_WORKFLOW)),
+        'totals': totals,
+    }
@@ -0,0 +1,88 @@
+"""
+Cached per-location roster of the active users a case can be routed to, grouped
+by role, so rendering the routing form needs no query on the user table.
+
+The roster of a location is invalidated when one of its users is created, deleted,
+or has their username, role, location or active flag changed (see signals.py).
+Code that changes users with queryset.update() or bulk_create() calls
+invalidate_rosters() itself. The invalidation reaches every worker through the shared
+CACHES backend (see settings.py); entries also expire after ROSTER_TIMEOUT, which bounds
+how long a worker that missed it (a per-process cache) lists a deactivated or moved user.
+Routing is validated against the database anyway.
+"""
+from django.core.cache import cache
+
+from .models import CustomUser, ROSTER_STATE_FIELDS
+
+
+# Roles a case can be routed to at the initial step
+ROUTING_ROLES = ('ier_inv', 'pci_inv')
+
+ROSTER_TIMEOUT = 300
+
+
+def _key(location):
+    return f'sdcmis:roster:{location}'
+
+
+def _roster_queryset(location):
+    return (
+        CustomUser.objects.filter(role__in=ROUTING_ROLES, is_active=True, location=location)
+        .order_by('username')
+        .values_list('role', 'pk', 'username')
+    )
+
+
+def _group(rows):
+    roster = {role: [] for role in ROUTING_ROLES}
+    for role, pk, username in rows:
+        roster[role].append((pk, username))
+    return roster
+
+
+def get_roster(location):
+    """{role: [(user id, username), ...]} of the active routing users in a location, by username."""
+    roster = cache.get(_key(location))
+    if roster is None:
+        roster = _group(_roster_queryset(location))
+        cache.set(_key(location), roster, timeout=ROSTER_TIMEOUT)
+    return roster
+
+
+async def aget_roster(location):
+    """Async version of get_roster()."""
+    roster = await cache.aget(_key(location))
+    if roster is None:
+        roster = _group([row async for row in _roster_queryset(location)])
+        await cache.aset(_key(location), roster, timeout=ROSTER_TIMEOUT)
+    return roster
+
+
+def _routing_choices(roster, user):
+    choices = [(pk, username) for role in ROUTING_ROLES for pk, username in roster[role] if pk != user.pk]
+    return sorted(choices, key=lambda choice: choice[1])
+
+
+def routing_choices(user):
+    """(user id, username) choices of the users in the user's location a case can be routed to, other than the user."""
+    if not user.location:
+        return []
+    return _routing_choices(get_roster(user.location), user)
+
+
+async def arouting_choices(user):
+    """Async version of routing_choices()."""
+    if not user.location:
+        return []
+    return _routing_choices(await aget_roster(user.location), user)
+
+
+def roster_state(user):
+    return tuple(getattr(user, name) for name in ROSTER_STATE_FIELDS)
+
+
+def invalidate_rosters(locations=None):
+    """Drops the cached rosters of the given locations (all locations by default)."""
+    if locations is None:
+        locations = [code for code, _ in CustomUser.LOCATION_CHOICES]
+    cache.delete_many([_key(location) for location in set(locations) if location])
@@ -0,0 +1,126 @@
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+
+from .models import SearchTerm, iec_records, INVESTIGATOR_ROLES
+
+
+# Searchable iec_records fields and how much a match in each counts towards the rank
+SEARCH_FIELD_WEIGHTS = {
+    'iec_ref': 8,
+    'complainant': 4,
+    'respondent': 4,
+    'charge': 2,
+    'remarks': 1,
+}
+SEARCH_FIELDS = frozenset(SEARCH_FIELD_WEIGHTS)
+
+# Terms longer than this are cut (matches SearchTerm.term max_length)
+MAX_TERM_LENGTH = 50
+
+# Most words taken from a query; extra words are ignored
+MAX_QUERY_TERMS = 6
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Rough number of SearchTerm rows per record, to weigh the two ways of ranking in search_ranking()
+TERMS_PER_RECORD = 20
+
+
+def tokenize(text):
+    """Lower-cased words of a text, e.g. 'Dela Cruz, Juan' -> ['dela', 'cruz', 'juan']."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+def record_terms(record):
+    """Returns {term: weight} for a record's searchable fields."""
+    terms = defaultdict(int)
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        value = getattr(record, field)
+        for token in set(tokenize(value)):
+            terms[token] += weight
+    return terms
+
+
+def _build_terms(records):
+    return [
+        SearchTerm(term=term, record_id=record.pk, weight=weight)
+        for record in records
+        for term, weight in record_terms(record).items()
+    ]
+
+
+def index_records(records, batch_size=2000):
+    """(Re)builds the search terms of saved records with one delete and batched inserts."""
+    records = [record for record in records if record.pk]
+    if not records:
+        return
+    with transaction.atomic():
+        SearchTerm.objects.filter(record_id__in=[record.pk for record in records]).delete()
+        SearchTerm.objects.bulk_create(_build_terms(records), batch_size=batch_size)
+
+
+def rebuild_index(batch_size=2000):
+    """Re-indexes every record; returns the number of records indexed."""
+    fields = ['id', *SEARCH_FIELDS]
+    count = 0
+    SearchTerm.objects.all().delete()
+    batch = []
+    for record in iec_records.objects.only(*fields).order_by('id').iterator(chunk_size=batch_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            SearchTerm.objects.bulk_create(_build_terms(batch), batch_size=batch_size)
+            count += len(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(_build_terms(batch), batch_size=batch_size)
+    return count + len(batch)
+
+
+def search_ranking(query, user=None):
+    """
+    Returns a values() queryset of {'record_id', 'score'} for records matching
+    every word of the query (each word matches terms by prefix), best first.
+
+    All the work is done on the SearchTerm table: each word is a range seek on
+    the (term, record) index (the __prefix lookup; startswith would be a LIKE,
+    which SQLite reads with a full scan) and the ranking is one GROUP BY record.
+    When a user is given, results are limited to the records they may see.
+    Order the result with SEARCH_ORDERING (e.g. through KeysetPaginator).
+    """
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not words:
+        return SearchTerm.objects.none().values('record_id').annotate(score=Sum('weight'))
+
+    any_word = Q()
+    for word in words:
+        any_word |= Q(term__prefix=word)
+
+    terms = SearchTerm.objects.filter(any_word)
+    if len(words) > 1:
+        # Only the records having the rarest word can match. When reading just their terms
+        # is cheaper than reading every word's range (a word like "iec" is in every record),
+        # the ranking starts from them; counting a word is a short index range read.
+        counts = {word: SearchTerm.objects.filter(term__prefix=word).count() for word in words}
+        rarest = min(words, key=counts.get)
+        if counts[rarest] * TERMS_PER_RECORD < sum(counts.values()):
+            terms = terms.filter(record__in=SearchTerm.objects.filter(term__prefix=rarest).values('record_id'))
+    if user is not None and user.role in INVESTIGATOR_ROLES:
+        terms = terms.filter(record__in=iec_records.objects.for_user(user).values('id'))
+
+    # One "matched" flag per query word, so only records containing all words are kept
+    matched = {
+        f'matched_{position}': Max(Case(When(term__prefix=word, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for position, word in enumerate(words)
+    }
+    return (
+        terms.values('record_id')
+        .annotate(score=Sum('weight'), **matched)
+        .filter(**{name: 1 for name in matched})
+        .values('record_id', 'score')
+    )
+
+
+# Ordering for search_ranking(); ends in a unique field so it can be keyset paginated
+SEARCH_ORDERING = ('-score', '-record_id')
@@ -0,0 +1,84 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ReferenceSequence, iec_records, PreChargeInvestigation, IEC_REF_KIND, PRECHARGE_NO_KIND
+
+
+# Location code used when the creating user (or their location) is not set
+NO_LOCATION_CODE = "NOLOC"
+
+
+def location_code_for(user):
+    """Returns the upper-cased location code used in reference numbers for a user."""
+    if user is not None and user.location:
+        return user.location.upper()
+    return NO_LOCATION_CODE
+
+
+def format_reference(kind, location_code, year, number):
+    """Example: format_reference('IEC', 'NCR', 2025, 12) -> 'IEC-NCR-2025-0012'"""
+    return f"{kind}-{location_code}-{year}-{number:04d}"
+
+
+def _existing_references(kind, prefix):
+    if kind == IEC_REF_KIND:
+        return iec_records.objects.filter(iec_ref__prefix=prefix).values_list('iec_ref', flat=True)
+    if kind == PRECHARGE_NO_KIND:
+        return PreChargeInvestigation.objects.filter(precharge_no__prefix=prefix).values_list('precharge_no', flat=True)
+    return []
+
+
+def _highest_existing_number(kind, location_code, year):
+    """
+    Finds the highest number already used for a kind/location/year.
+    Only called once, when the sequence row is first created, so records
+    created before the sequence table existed are never re-issued.
+    """
+    prefix = format_reference(kind, location_code, year, 0)[:-4]
+    highest = 0
+    for reference in _existing_references(kind, prefix).iterator():
+        try:
+            highest = max(highest, int(reference[len(prefix):]))
+        except ValueError:
+            pass  # Reference with an unexpected format, ignore it
+    return highest
+
+
+def reserve_numbers(kind, location_code, year, count=1):
+    """
+    Atomically reserves `count` consecutive numbers for a kind/location/year
+    and returns them as a range.
+
+    The increment is a single UPDATE ... SET last_value = last_value + count,
+    so concurrent callers are serialized by the row lock and never receive
+    the same number. Numbers reserved by a transaction that later rolls back
+    are simply skipped.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1.")
+
+    sequence = ReferenceSequence.objects.filter(kind=kind, location=location_code, year=year)
+    with transaction.atomic():
+        if not sequence.update(last_value=F('last_value') + count):
+            # First number for this kind/location/year: create the row, seeded from existing data
+            try:
+                with transaction.atomic():
+                    start = _highest_existing_number(kind, location_code, year)
+                    ReferenceSequence.objects.create(kind=kind, location=location_code, year=year, last_value=start + count)
+                    return range(start + 1, start + count + 1)
+            except IntegrityError:
+                # Another process created the row first; increment theirs instead
+                sequence.update(last_value=F('last_value') + count)
+        last_value = sequence.values_list('last_value', flat=True).get()
+    return range(last_value - count + 1, last_value + 1)
+
+
+def next_reference(kind, location_code, year):
+    """Reserves and formats a single reference number."""
+    number = reserve_numbers(kind, location_code, year)[0]
+    return format_reference(kind, location_code, year, number)
+
+
+def reserve_references(kind, location_code, year, count):
+    """Reserves a block of `count` reference numbers for bulk inserts."""
+    return [format_reference(kind, location_code, year, number) for number in reserve_numbers(kind, location_code, year, count)]
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .backends import invalidate_cached_users
+from .business_days import clear_holiday_cache
+from .dashboard_cache import invalidate_dashboards
+from . import rollups
+from .models import iec_records, CustomUser, InitialEvaluationReport, PreChargeInvestigation, CaseTransition, Holiday, ROLLUP_STATE_FIELDS, ROSTER_STATE_FIELDS
+from .roster import invalidate_rosters, roster_state
+from .search import index_records, SEARCH_FIELDS
+
+
+@receiver(post_save, sender=iec_records, dispatch_uid='sdcmisapp_index_iec_record')
+def index_iec_record(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Keeps the search index in step with a record's searchable text."""
+    if raw:
+        return  # Loading fixtures
+    if not created and update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return  # e.g. workflow transitions, which only touch status/assignee/due date
+    index_records([instance])
+
+
+def _invalidate_on_commit(user_ids):
+    # After commit, so a dashboard rebuilt in the meantime cannot cache the old data under the new version
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: invalidate_dashboards(user_ids))
+
+
+@receiver(post_save, sender=iec_records, dispatch_uid='sdcmisapp_invalidate_dashboards_record_saved')
+@receiver(post_delete, sender=iec_records, dispatch_uid='sdcmisapp_invalidate_dashboards_record_deleted')
+def invalidate_record_dashboards(sender, instance, **kwargs):
+    """Invalidates the dashboards of the record's creator and current/previous assignee."""
+    user_ids = {instance.created_by_id, instance.assigned_to_id, *getattr(instance, '_loaded_user_ids', ())}
+    instance._loaded_user_ids = (instance.created_by_id, instance.assigned_to_id)
+    _invalidate_on_commit(user_ids)
+
+
+@receiver(post_save, sender=InitialEvaluationReport, dispatch_uid='sdcmisapp_invalidate_dashboards_ier_saved')
+@receiver(post_delete, sender=InitialEvaluationReport, dispatch_uid='sdcmisapp_invalidate_dashboards_ier_deleted')
+@receiver(post_save, sender=PreChargeInvestigation, dispatch_uid='sdcmisapp_invalidate_dashboards_pci_saved')
+@receiver(post_delete, sender=PreChargeInvestigation, dispatch_uid='sdcmisapp_invalidate_dashboards_pci_deleted')
+def invalidate_detail_dashboards(sender, instance, **kwargs):
+    """Invalidates the dashboards of the users on the case an IER/PCI record belongs to."""
+    if sender._meta.get_field('iec_record').is_cached(instance):
+        record = instance.iec_record
+        user_ids = {record.created_by_id, record.assigned_to_id}
+    else:
+        user_ids = set(
+            iec_records.objects.filter(pk=instance.iec_record_id).values_list('created_by_id', 'assigned_to_id').first() or ()
+        )
+    _invalidate_on_commit(user_ids)
+
+
+# Fields (as passed in update_fields) that change what the SLA rollups count a record under
+ROLLUP_FIELD_NAMES = frozenset({'created_by', 'created_by_id', 'status', 'due_date'})
+
+
+@receiver(pre_save, sender=iec_records, dispatch_uid='sdcmisapp_rollups_record_loading')
+def remember_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Records saved without a loaded rollup state (e.g. fetched with only()) get it from the database."""
+    if raw or instance._state.adding or hasattr(instance, '_loaded_rollup_state') or rollups.is_suspended():
+        return
+    if update_fields is not None and not ROLLUP_FIELD_NAMES.intersection(update_fields):
+        return
+    instance._loaded_rollup_state = iec_records.objects.filter(pk=instance.pk).values_list(*ROLLUP_STATE_FIELDS).first()
+
+
+@receiver(post_save, sender=iec_records, dispatch_uid='sdcmisapp_rollups_record_saved')
+def update_rollups_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Moves the record's SLA rollup counts to its new step / due date."""
+    if raw or rollups.is_suspended():
+        return
+    if not created and update_fields is not None and not ROLLUP_FIELD_NAMES.intersection(update_fields):
+        return
+    new_state = rollups.record_state(instance)
+    rollups.record_changed(None if created else getattr(instance, '_loaded_rollup_state', None), new_state)
+    instance._loaded_rollup_state = new_state
+
+
+@receiver(post_delete, sender=iec_records, dispatch_uid='sdcmisapp_rollups_record_deleted')
+def update_rollups_on_delete(sender, instance, **kwargs):
+    if rollups.is_suspended():
+        return
+    rollups.record_changed(getattr(instance, '_loaded_rollup_state', None) or rollups.record_state(instance), None)
+
+
+@receiver(post_save, sender=CaseTransition, dispatch_uid='sdcmisapp_rollups_transition')
+def count_step_completion(sender, instance, created, raw=False, **kwargs):
+    """Counts the step the case left as completed on time or late."""
+    if created and not raw and not rollups.is_suspended():
+        rollups.transition_recorded(instance)
+
+
+@receiver(pre_save, sender=CustomUser, dispatch_uid='sdcmisapp_rollups_user_loading')
+def remember_creator_location(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The location the rollups count the user's cases under, before the save."""
+    if raw or instance._state.adding or rollups.is_suspended():
+        return
+    if update_fields is not None and 'location' not in update_fields:
+        return
+    location = dict(zip(ROSTER_STATE_FIELDS, getattr(instance, '_loaded_roster_state', ()))).get('location')
+    if location is None:  # Not loaded (or deferred, or really empty): ask the database
+        location = CustomUser.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+    instance._rollup_location = location
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='sdcmisapp_rollups_user_saved')
+def move_rollups_on_location_change(sender, instance, **kwargs):
+    """Moves the counts of the user's cases to their new location."""
+    if hasattr(instance, '_rollup_location'):
+        rollups.creator_moved(instance.pk, instance.__dict__.pop('_rollup_location'), instance.location)
+
+
+@receiver(pre_delete, sender=CustomUser, dispatch_uid='sdcmisapp_rollups_user_deleted')
+def move_rollups_on_user_delete(sender, instance, **kwargs):
+    """The user's cases are kept without a creator (SET_NULL, which sends no signals), so without a location."""
+    if not rollups.is_suspended():
+        rollups.creator_moved(instance.pk, instance.location, None)
+
+
+@receiver(post_save, sender=Holiday, dispatch_uid='sdcmisapp_holiday_saved')
+@receiver(post_delete, sender=Holiday, dispatch_uid='sdcmisapp_holiday_deleted')
+def reload_holidays(sender, instance, **kwargs):
+    """New due dates use the changed calendar; run recompute_due_dates to move the existing ones."""
+    transaction.on_commit(clear_holiday_cache)
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='sdcmisapp_roster_user_saved')
+def invalidate_rosters_on_user_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Invalidates the routing rosters of the user's previous and current location when their roster entry changed."""
+    if raw or (update_fields is not None and not set(ROSTER_STATE_FIELDS).intersection(update_fields)):
+        return  # e.g. last_login on every login
+    loaded = getattr(instance, '_loaded_roster_state', None)
+    current = roster_state(instance)
+    instance._loaded_roster_state = current
+    if created or current != loaded:
+        locations = {instance.location, dict(zip(ROSTER_STATE_FIELDS, loaded or ())).get('location')}
+        transaction.on_commit(lambda: invalidate_rosters(locations))
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid='sdcmisapp_roster_user_deleted')
+def invalidate_rosters_on_user_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_rosters([instance.location]))
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='sdcmisapp_cached_user_saved')
+@receiver(post_delete, sender=CustomUser, dispatch_uid='sdcmisapp_cached_user_deleted')
+def invalidate_cached_user(sender, instance, raw=False, created=False, **kwargs):
+    """Drops the user from the authentication cache, so the next request loads the changed user."""
+    if raw:
+        return
+    if created:
+        # A new user's id may have been used before (e.g. after a rolled back insert); nothing cached under it is this user
+        invalidate_cached_users([instance.pk])
+    transaction.on_commit(lambda: invalidate_cached_users([instance.pk]))
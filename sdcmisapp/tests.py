@@ -1,3 +1,1087 @@
-from django.test import TestCase
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import async_views, backends, checks, metrics, replicas, rollups, views
+from .benchmarks import SCENARIOS, run_benchmarks
+from .business_days import BusinessCalendar, get_calendar
+from .caseload import generate_caseload
+from .due_dates import recompute_due_dates
+from .exports import EXPORT_COLUMNS
+from .forms import RouteTaskForm
+from .importer import read_rows, import_records, ImportFileError
+from .overdue import sweep_overdue
+from .pagination import KeysetPaginator, InvalidCursor, get_page_size
+from .models import iec_records, CustomUser, InitialEvaluationReport, PreChargeInvestigation, CaseTransition, StepRollup, DueDateRollup, Holiday, IEC_REF_KIND
+from .search import search_ranking, SEARCH_ORDERING
+from .sequences import reserve_references
+from .throttle import login_throttle
+from .transitions import advance, check_transition, compute_due_date, TransitionError, ACTOR_ASSIGNEE, ACTOR_CREATOR
+from .workflow_def import CASE_WORKFLOW, CompiledWorkflow, INITIAL_EVALUATION_STEP_KEY, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, RESOLVED_STEP_KEY
+
+
+def make_record(created_by, assigned_to=None, **kwargs):
+    fields = {
+        'date_received': date.today(),
+        'complainant': 'Complainant',
+        'respondent': 'Respondent',
+        'charge': 'Charge',
+        'remarks': 'Remarks ' * 50,
+    }
+    fields.update(kwargs)
+    return iec_records.objects.create(created_by=created_by, assigned_to=assigned_to, **fields)
+
+
+class DashboardQueryCountTests(TestCase):
+    """The dashboard must issue the same number of queries no matter how many rows it shows."""
+
+    def setUp(self):
+        self.director = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        cache.clear()
+        self.client.force_login(self.director)
+        self.client.get(reverse('search'))  # Loads the user into the cache, as on any later request
+
+    def count_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'), {'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_is_constant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.director, self.investigator)
+        few_queries, response = self.count_dashboard_queries()
+        self.assertEqual(len(response.context['records']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):  # Runs the dashboard cache invalidation
+            for _ in range(30):
+                make_record(self.director, self.investigator)
+        many_queries, response = self.count_dashboard_queries()
+        self.assertEqual(len(response.context['records']), 31)
+
+        self.assertEqual(few_queries, many_queries)
+
+    def test_rows_use_ids_and_truncated_remarks(self):
+        make_record(self.director, self.investigator)
+        _, response = self.count_dashboard_queries()
+        row = response.context['records'][0]
+        self.assertEqual(row.created_by_id, self.director.pk)
+        self.assertTrue(row.can_acknowledge_and_route)
+        self.assertLessEqual(len(row.remarks), 80)
+        self.assertFalse(hasattr(row, '__dict__'))
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.records = [make_record(self.user, self.user) for _ in range(5)]
+
+    def ids(self, page):
+        return [record.pk for record in page]
+
+    def test_next_and_previous_cursors(self):
+        paginator = KeysetPaginator(iec_records.objects.all(), page_size=2)
+        first = paginator.get_page()
+        self.assertEqual(self.ids(first), [self.records[4].pk, self.records[3].pk])
+        self.assertFalse(first.has_previous)
+
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual(self.ids(second), [self.records[2].pk, self.records[1].pk])
+        last = paginator.get_page(second.next_cursor)
+        self.assertEqual(self.ids(last), [self.records[0].pk])
+        self.assertFalse(last.has_next)
+
+        self.assertEqual(self.ids(paginator.get_page(last.previous_cursor)), self.ids(second))
+        back_to_first = paginator.get_page(second.previous_cursor)
+        self.assertEqual(self.ids(back_to_first), self.ids(first))
+        self.assertFalse(back_to_first.has_previous)
+
+    def test_inserts_between_pages_skip_or_repeat_nothing(self):
+        paginator = KeysetPaginator(iec_records.objects.values('id', 'iec_ref'), page_size=2)
+        page = paginator.get_page()
+        seen = [row['id'] for row in page]
+        make_record(self.user, self.user)
+        make_record(self.user, self.user)
+        while page.has_next:
+            page = paginator.get_page(page.next_cursor)
+            seen += [row['id'] for row in page]
+        self.assertEqual(seen, [record.pk for record in reversed(self.records)])
+
+    def test_ties_on_the_sort_key_are_broken_by_id(self):
+        paginator = KeysetPaginator(iec_records.objects.all(), page_size=2, ordering=('date_received', 'id'))
+        page, seen = paginator.get_page(), []
+        seen += self.ids(page)
+        while page.has_next:
+            page = paginator.get_page(page.next_cursor)
+            seen += self.ids(page)
+        self.assertEqual(seen, [record.pk for record in self.records])  # All received the same day
+
+    def test_bad_cursors_are_rejected(self):
+        paginator = KeysetPaginator(iec_records.objects.all(), page_size=2)
+        cursor = paginator.get_page().next_cursor
+        other_listing = KeysetPaginator(iec_records.objects.all(), page_size=2, ordering=('date_received', 'id'))
+        for bad in [cursor[:-2] + ('A' if cursor[-2] != 'A' else 'B') + cursor[-1], 'garbage']:
+            with self.assertRaises(InvalidCursor):
+                paginator.get_page(bad)
+        with self.assertRaises(InvalidCursor):
+            other_listing.get_page(cursor)
+
+    def test_dashboard_falls_back_to_the_first_page(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'), {'cursor': 'garbage', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row.id for row in response.context['records']], [self.records[4].pk, self.records[3].pk])
+        self.assertIn('no longer valid', [str(message) for message in response.context['messages']][0])
+
+    def test_page_size_is_clamped(self):
+        factory = RequestFactory()
+        for query, size in [({'page_size': '1000'}, 200), ({'page_size': '0'}, 1), ({'page_size': 'x'}, 25), ({}, 25)]:
+            self.assertEqual(get_page_size(factory.get('/', query)), size, query)
+        with override_settings(SDCMIS_MAX_PAGE_SIZE=10):
+            self.assertEqual(get_page_size(factory.get('/', {'page_size': '50'})), 10)
+
+
+class WorkflowTests(TestCase):
+
+    def test_step_lookups(self):
+        steps = CASE_WORKFLOW.steps
+        self.assertEqual(CASE_WORKFLOW.initial_step.key, INITIAL_EVALUATION_STEP_KEY)
+        self.assertEqual(CASE_WORKFLOW.final_step.key, RESOLVED_STEP_KEY)
+        self.assertEqual(CASE_WORKFLOW.next_step(INITIAL_EVALUATION_STEP_KEY).key, NOTICE_PCI_STEP_KEY)
+        self.assertIsNone(CASE_WORKFLOW.next_step(RESOLVED_STEP_KEY))
+        self.assertEqual([CASE_WORKFLOW.index_of(step.key) for step in steps], list(range(len(steps))))
+        self.assertEqual(steps[CASE_WORKFLOW.index_of(NOTICE_PCI_STEP_KEY) - 1].key, INITIAL_EVALUATION_STEP_KEY)
+        self.assertTrue(CASE_WORKFLOW.is_final(RESOLVED_STEP_KEY))
+        for lookup in (CASE_WORKFLOW.get_step, CASE_WORKFLOW.next_step, CASE_WORKFLOW.index_of):
+            self.assertIsNone(lookup('no_such_step'))
+        self.assertNotIn('no_such_step', CASE_WORKFLOW)
+        with self.assertRaises(ValueError):
+            CompiledWorkflow([steps[0], steps[0]])
+
+    def test_check_transition_and_advance_refuse_wrong_steps_and_actors(self):
+        creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        record = make_record(creator, creator)
+
+        self.assertEqual(check_transition(record, creator, INITIAL_EVALUATION_STEP_KEY, actor=ACTOR_CREATOR).key, INITIAL_EVALUATION_STEP_KEY)
+        for user, step_key, actor in [
+            (investigator, INITIAL_EVALUATION_STEP_KEY, ACTOR_CREATOR),  # Not the creator
+            (creator, NOTICE_PCI_STEP_KEY, ACTOR_ASSIGNEE),  # Not at that step
+            (creator, 'no_such_step', ACTOR_ASSIGNEE),
+        ]:
+            with self.assertRaises(TransitionError):
+                check_transition(record, user, step_key, actor=actor)
+        with self.assertRaisesMessage(TransitionError, 'no longer at step'):
+            advance(record, NOTICE_PCI_STEP_KEY)
+
+        advance(record, INITIAL_EVALUATION_STEP_KEY, assign_to=investigator, actor=creator)
+        with self.assertRaisesMessage(TransitionError, 'not assigned to you'):
+            check_transition(record, creator, NOTICE_PCI_STEP_KEY)
+        self.assertEqual(check_transition(record, investigator, NOTICE_PCI_STEP_KEY).key, NOTICE_PCI_STEP_KEY)
+
+        record.status = RESOLVED_STEP_KEY
+        with self.assertRaisesMessage(TransitionError, 'No subsequent step'):
+            advance(record, RESOLVED_STEP_KEY)
+
+    def test_due_dates_count_working_days(self):
+        friday = date(2025, 6, 6)
+        step = CASE_WORKFLOW.get_step(NOTICE_PCI_STEP_KEY)  # 2 days
+        self.assertEqual(compute_due_date(step, friday), date(2025, 6, 10))
+
+
+class UrgencyTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.today = date.today()
+        self.due_today = make_record(self.user, self.user, due_date=self.today)
+        self.yesterday = make_record(self.user, self.user, due_date=self.today - timedelta(days=1))
+        self.no_due_date = make_record(self.user, self.user, due_date=None)
+        self.resolved = make_record(self.user, self.user, due_date=self.today - timedelta(days=9), status=RESOLVED_STEP_KEY)
+        self.long_overdue = make_record(self.user, self.user, due_date=self.today - timedelta(days=5))
+
+    def test_urgency_at_the_due_date_boundary(self):
+        rows = {row['id']: row for row in iec_records.objects.with_urgency(self.today).values('id', 'time_remaining', 'is_overdue_now')}
+        self.assertEqual((rows[self.due_today.pk]['time_remaining'], rows[self.due_today.pk]['is_overdue_now']), (timedelta(0), False))
+        self.assertEqual((rows[self.yesterday.pk]['time_remaining'], rows[self.yesterday.pk]['is_overdue_now']), (timedelta(days=-1), True))
+        self.assertEqual((rows[self.no_due_date.pk]['time_remaining'], rows[self.no_due_date.pk]['is_overdue_now']), (None, False))
+        self.assertFalse(rows[self.resolved.pk]['is_overdue_now'])
+
+    def test_overdue_and_most_overdue_first_leave_out_resolved_cases(self):
+        self.assertEqual(set(iec_records.objects.overdue(self.today)), {self.yesterday, self.long_overdue})
+        self.assertEqual(
+            list(iec_records.objects.most_overdue_first(self.today)),
+            [self.long_overdue, self.yesterday, self.due_today],
+        )
+
+    def test_dashboard_sort_and_overdue_filter(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+        def listed(**params):
+            return [row.id for row in self.client.get(reverse('dashboard'), params).context['records']]
+
+        self.assertEqual(listed(sort='urgency'), [self.long_overdue.pk, self.yesterday.pk, self.due_today.pk])
+        self.assertEqual(listed(sort='urgency', overdue='1'), [self.long_overdue.pk, self.yesterday.pk])
+        self.assertEqual(len(listed()), 5)  # Newest first, every case
+
+
+class ReferenceSequenceTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('creator', password='pw', role='dir', location='ncr')
+        self.year = date.today().year
+
+    def test_references_continue_from_existing_records(self):
+        make_record(None, iec_ref=f'IEC-NCR-{self.year}-0007')
+        record = make_record(self.user)
+        self.assertEqual(record.iec_ref, f'IEC-NCR-{self.year}-0008')
+
+    def test_block_reservation_is_contiguous(self):
+        first = make_record(self.user)
+        block = reserve_references(IEC_REF_KIND, 'NCR', self.year, 3)
+        self.assertEqual(block, [f'IEC-NCR-{self.year}-000{n}' for n in (2, 3, 4)])
+        self.assertEqual(make_record(self.user).iec_ref, f'IEC-NCR-{self.year}-0005')
+        self.assertEqual(first.iec_ref, f'IEC-NCR-{self.year}-0001')
+
+    def test_prefix_lookup_matches_startswith(self):
+        for ref in ['IEC-NCR-2025-0001', 'IEC-NCR-20250', 'IEC-NCR-2025.', 'IEC-NCR-2024-0009', 'IEC-NCS-2025-0001']:
+            make_record(None, iec_ref=ref)
+        for prefix in ['IEC-NCR-2025-', 'IEC-NCR-2025', 'IEC-NC', '']:
+            self.assertEqual(
+                set(iec_records.objects.filter(iec_ref__prefix=prefix).values_list('iec_ref', flat=True)),
+                set(iec_records.objects.filter(iec_ref__startswith=prefix).values_list('iec_ref', flat=True)),
+                prefix,
+            )
+
+
+class ImportTests(TestCase):
+
+    CSV = (
+        "Date Received,Complainant,Respondent,Charge,Remarks\n"
+        "2026-01-05,Zebulon Quist,Treasurer,Dishonesty,\n"
+        "not a date,Ana,Clerk,Neglect,\n"
+        "2026-01-06,Maria,,Misconduct,\n"
+        "\n"
+        "2026-01-07,Pedro,Engineer,Insubordination,Late filing\n"
+        "2026-01-08,Rosa,Principal,Dishonesty,\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('importer', password='pw', role='ier_inv', location='ncr')
+        self.year = date.today().year
+
+    def rows(self, text=None):
+        return read_rows(io.BytesIO((text or self.CSV).encode()), 'cases.csv')
+
+    def test_valid_rows_are_inserted_in_chunks_with_reserved_references(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = import_records(self.rows(), created_by=self.user, chunk_size=2)
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual([row for row, _ in result.errors], [3, 4])
+        self.assertIn('date_received', result.errors[0][1])
+        self.assertIn('respondent', result.errors[1][1])
+        table = connection.ops.quote_name(iec_records._meta.db_table)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith(f'INSERT INTO {table}')]
+        self.assertEqual(len(inserts), 2)  # Chunks of 2 and 1
+
+        records = iec_records.objects.order_by('id')
+        self.assertEqual([record.iec_ref for record in records], [f'IEC-NCR-{self.year}-000{n}' for n in (1, 2, 3)])
+        self.assertTrue(all(record.assigned_to == self.user and record.due_date for record in records))
+        # Indexed for search and counted in the rollups, though bulk_create sends no signals
+        self.assertEqual([row['record_id'] for row in search_ranking('quist')], [records[0].pk])
+        counted = set(StepRollup.objects.values_list('location', 'step', 'cases'))
+        rollups.rebuild()
+        self.assertEqual(counted, set(StepRollup.objects.values_list('location', 'step', 'cases')))
+        self.assertEqual(counted, {('ncr', INITIAL_EVALUATION_STEP_KEY, 3)})
+
+    def test_missing_columns_reject_the_file(self):
+        with self.assertRaisesMessage(ImportFileError, 'Missing column(s): charge'):
+            import_records(self.rows("date_received,complainant,respondent\n2026-01-05,A,B\n"), created_by=self.user)
+
+    def test_unreadable_csv_files_raise_import_file_error(self):
+        with self.assertRaisesMessage(ImportFileError, 'not UTF-8 text'):
+            list(read_rows(io.BytesIO(b'iec_ref\n\xe9\xff\n'), 'a.csv'))
+        too_long = self.CSV + '2026-01-09,"' + 'x' * (csv.field_size_limit() + 1) + '",R,C,\n'
+        with self.assertRaisesMessage(ImportFileError, 'not a readable CSV file'):
+            list(self.rows(too_long))
+
+        # Bad bytes past the first decoded block: the chunks before them are kept, and the message says so
+        valid = self.CSV + '2026-01-09,Lito,Clerk,Neglect,\n' * 400
+        with self.assertRaisesMessage(ImportFileError, 'had already been imported'):
+            import_records(read_rows(io.BytesIO(valid.encode() + b'2026-01-10,Jos\xe9,Clerk,Neglect,\n'), 'a.csv'), created_by=self.user, chunk_size=50)
+        self.assertTrue(iec_records.objects.exists())
+
+    @skipUnless(importlib.util.find_spec('openpyxl'), "openpyxl is not installed")
+    def test_unreadable_workbooks_raise_import_file_error(self):
+        not_a_workbook = io.BytesIO()
+        with zipfile.ZipFile(not_a_workbook, 'w') as archive:
+            archive.writestr('readme.txt', 'Not a workbook')
+        for content in [b'not a zip file', not_a_workbook.getvalue()]:
+            with self.assertRaisesMessage(ImportFileError, 'not a readable .xlsx workbook'):
+                list(read_rows(io.BytesIO(content), 'cases.xlsx'))
+
+    def test_command_and_admin_view_report_unreadable_files(self):
+        latin1 = self.CSV.replace('Maria', 'Mar\xeda').encode('latin-1')
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            file.write(latin1)
+            file.flush()
+            with self.assertRaisesMessage(CommandError, 'not UTF-8 text'):
+                call_command('import_iec_records', file.name, user='importer', stdout=io.StringIO())
+
+        admin = CustomUser.objects.create_superuser('admin', password='pw', role='admin', location='co')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('cases.csv', latin1, content_type='text/csv')
+        response = self.client.post(reverse('admin:sdcmisapp_iec_records_import'), {'file': upload, 'created_by': self.user.pk})
+        self.assertContains(response, 'not UTF-8 text')
+
+    def test_command_and_admin_view(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cases.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(self.CSV)
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_iec_records', path, user='importer', dry_run=True, stdout=stdout, stderr=stderr)
+            self.assertIn('3 record(s) would be created, 2 row(s) with errors', stdout.getvalue())
+            self.assertIn('Row 3: date_received', stderr.getvalue())
+            self.assertFalse(iec_records.objects.exists())
+
+        admin = CustomUser.objects.create_superuser('admin', password='pw', role='admin', location='co')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('cases.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('admin:sdcmisapp_iec_records_import'), {'file': upload, 'created_by': self.user.pk})
+        self.assertContains(response, '3 record(s) imported, 2 row(s) with errors.')
+        self.assertEqual(iec_records.objects.filter(created_by=self.user).count(), 3)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.director = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        self.other = CustomUser.objects.create_user('other', password='pw', role='ier_inv', location='r1')
+        self.created = make_record(self.investigator, self.other, complainant='Created, "quoted"')
+        self.assigned = make_record(self.other, self.investigator, status=NOTICE_PCI_STEP_KEY)
+        self.unrelated = make_record(self.other, self.other)
+
+    def export(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('export_iec_csv'), params)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_streams_a_header_and_one_row_per_visible_record(self):
+        header, *rows = self.export(self.director)
+        self.assertEqual(header, [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual([row[1] for row in rows], [self.created.iec_ref, self.assigned.iec_ref, self.unrelated.iec_ref])
+        row = dict(zip(header, rows[1]))
+        self.assertEqual(row['Complainant'], 'Complainant')
+        self.assertEqual(row['Status'], dict(iec_records.STATUS_CHOICES)[NOTICE_PCI_STEP_KEY])
+        self.assertEqual((row['Created By'], row['Location'], row['Assigned To']), ('other', 'r1', 'investigator'))
+        self.assertEqual(dict(zip(header, rows[0]))['Complainant'], 'Created, "quoted"')
+
+    def test_investigators_export_only_their_records(self):
+        _, *rows = self.export(self.investigator)
+        self.assertEqual([row[1] for row in rows], [self.created.iec_ref, self.assigned.iec_ref])
+        # The dashboard filters apply too
+        _, *rows = self.export(self.director, status=NOTICE_PCI_STEP_KEY)
+        self.assertEqual([row[1] for row in rows], [self.assigned.iec_ref])
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.both = make_record(self.user, complainant='Juan Dela Cruz', respondent='Municipal Treasurer', remarks=None)
+        self.one_word = make_record(self.user, complainant='Juan Santos', respondent='Clerk', remarks=None)
+        self.in_remarks = make_record(self.user, complainant='Maria', respondent='Clerk', remarks='Juan the treasurer')
+
+    def ranked(self, query):
+        return [row['record_id'] for row in search_ranking(query).order_by(*SEARCH_ORDERING)]
+
+    def test_every_word_must_match_and_heavier_fields_rank_first(self):
+        self.assertEqual(self.ranked('juan treas'), [self.both.pk, self.in_remarks.pk])
+        self.assertEqual(self.ranked('juan'), [self.one_word.pk, self.both.pk, self.in_remarks.pk])
+        self.assertEqual(self.ranked(self.in_remarks.iec_ref), [self.in_remarks.pk])  # Reference numbers weigh most
+        self.assertEqual(self.ranked('juan nobody'), [])
+
+    def test_both_ways_of_ranking_agree(self):
+        for terms_per_record in (0, 1000):  # Never / always start from the rarest word's records
+            with mock.patch('sdcmisapp.search.TERMS_PER_RECORD', terms_per_record):
+                self.assertEqual(self.ranked('juan treas'), [self.both.pk, self.in_remarks.pk])
+
+    def test_saving_a_record_reindexes_it(self):
+        self.both.complainant = 'Pedro Garcia'
+        self.both.save()
+        self.assertEqual(self.ranked('juan treas'), [self.in_remarks.pk])
+        self.assertEqual(self.ranked('garcia'), [self.both.pk])
+        with mock.patch('sdcmisapp.signals.index_records') as index_records:
+            self.both.save(update_fields=['due_date'])  # No searchable field saved
+        index_records.assert_not_called()
+
+
+@override_settings(SDCMIS_READ_REPLICAS=[])  # Payloads built from a replica are not cached (see ReplicaRoutingTests)
+class DashboardCacheTests(TestCase):
+
+    def setUp(self):
+        self.director = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.other = CustomUser.objects.create_user('other', password='pw', role='pci_inv', location='ncr')
+        cache.clear()
+
+    def dashboard_refs(self, user):
+        self.client.force_login(user)
+        return [row.iec_ref for row in self.client.get(reverse('dashboard')).context['records']]
+
+    def test_second_request_is_served_from_cache(self):
+        make_record(self.creator)
+        self.dashboard_refs(self.creator)
+        with CaptureQueriesContext(connection) as queries:
+            self.dashboard_refs(self.creator)
+        self.assertFalse([query for query in queries.captured_queries if 'iec_records' in query['sql']])
+
+    def test_saving_a_record_invalidates_creator_and_assignees(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record = make_record(self.creator)
+        self.assertEqual(self.dashboard_refs(self.creator), [record.iec_ref])
+        self.assertEqual(self.dashboard_refs(self.other), [])
+        self.assertEqual(self.dashboard_refs(self.director), [record.iec_ref])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.assigned_to = self.other
+            record.save()
+        self.assertEqual(self.dashboard_refs(self.other), [record.iec_ref])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        self.assertEqual(self.dashboard_refs(self.creator), [])
+        self.assertEqual(self.dashboard_refs(self.other), [])
+        self.assertEqual(self.dashboard_refs(self.director), [])
+
+    def test_other_investigators_keep_their_cached_dashboard(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            own = make_record(self.other, self.other)
+        self.assertEqual(self.dashboard_refs(self.other), [own.iec_ref])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.creator)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.dashboard_refs(self.other), [own.iec_ref])
+        self.assertFalse([query for query in queries.captured_queries if 'iec_records' in query['sql']])
+
+
+class AsyncViewTests(TestCase):
+    """The async views (SDCMIS_ASYNC_VIEWS) behave like the sync ones."""
+
+    def setUp(self):
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        cache.clear()
+
+    def make_request(self, method, path, data=None):
+        request = getattr(AsyncRequestFactory(), method)(path, data)
+        request.user = self.investigator
+
+        async def auser():
+            return self.investigator
+        request.auser = auser
+        request._messages = CookieStorage(request)
+        return request
+
+    async def test_dashboard_lists_the_users_records(self):
+        record = await iec_records.objects.acreate(
+            created_by=self.investigator, assigned_to=self.investigator, date_received=date.today(),
+            complainant='Complainant', respondent='Respondent', charge='Charge',
+        )
+        response = await async_views.dashboard(self.make_request('get', reverse('dashboard')))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, record.iec_ref)
+
+    async def test_submit_notice_pci_advances_the_case(self):
+        record = await iec_records.objects.acreate(
+            created_by=self.investigator, assigned_to=self.investigator, date_received=date.today(),
+            complainant='Complainant', respondent='Respondent', charge='Charge', status=NOTICE_PCI_STEP_KEY,
+        )
+        await PreChargeInvestigation.objects.acreate(iec_record=record)
+        request = self.make_request('post', reverse('submit_notice_pci', args=[record.pk]), {'precharge_no': 'PCI-1'})
+        response = await async_views.submit_notice_pci(request, record.pk)
+        self.assertEqual(response.status_code, 302)
+        await record.arefresh_from_db()
+        self.assertEqual(record.status, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY)
+
+
+class ApiTests(TestCase):
+
+    def setUp(self):
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        self.other = CustomUser.objects.create_user('other', password='pw', role='pci_inv', location='r1')
+        self.client.force_login(self.investigator)
+
+    def test_requires_login_with_json_401(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_records'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('error', response.json())
+
+    def test_sparse_fields_select_only_those_columns(self):
+        make_record(self.investigator, self.investigator)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_records'), {'fields': 'iec_ref,status'})
+        self.assertEqual(list(response.json()['results'][0]), ['iec_ref', 'status'])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"remarks"', sql)
+        self.assertNotIn('"complainant"', sql)
+
+        response = self.client.get(reverse('api_records'), {'fields': 'iec_ref,nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination_walks_every_visible_record(self):
+        refs = {make_record(self.investigator, self.investigator).iec_ref for _ in range(5)}
+        make_record(self.other, self.other)  # Not visible to the investigator
+        seen, url = [], reverse('api_records') + '?page_size=2&fields=iec_ref'
+        while url:
+            body = self.client.get(url).json()
+            seen += [row['iec_ref'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(sorted(seen), sorted(refs))
+
+    def test_filters_apply_to_related_resources(self):
+        record = make_record(self.investigator, self.investigator)
+        PreChargeInvestigation.objects.create(iec_record=record)
+        body = self.client.get(reverse('api_pci'), {'assignee': self.investigator.pk, 'fields': 'iec_ref,precharge_no'}).json()
+        self.assertEqual(body['results'][0]['iec_ref'], record.iec_ref)
+        body = self.client.get(reverse('api_pci'), {'location': 'r1'}).json()
+        self.assertEqual(body['results'], [])
+
+
+class BenchmarkSuiteTests(TestCase):
+
+    def test_caseload_covers_locations_roles_and_steps(self):
+        generate_caseload(300, users_per_role=1, seed=7, batch_size=120)
+        self.assertEqual(CustomUser.objects.count(), len(CustomUser.LOCATION_CHOICES) * len(CustomUser.ROLE_CHOICES))
+        self.assertEqual(iec_records.objects.count(), 300)
+        self.assertGreater(iec_records.objects.values('status').distinct().count(), 10)
+        # Every case past the initial evaluation has its IER and PCI rows
+        routed = iec_records.objects.exclude(status=INITIAL_EVALUATION_STEP_KEY).count()
+        self.assertEqual(InitialEvaluationReport.objects.count(), routed)
+        self.assertEqual(PreChargeInvestigation.objects.count(), routed)
+
+    def test_every_scenario_runs_and_leaves_the_data_unchanged(self):
+        generate_caseload(150, users_per_role=1, seed=1)
+        statuses = list(iec_records.objects.order_by('id').values_list('status', flat=True))
+        results = run_benchmarks(iterations=1)
+        self.assertEqual(set(results['scenarios']), {scenario.name for scenario in SCENARIOS})
+        uncached = {name: result for name, result in results['scenarios'].items() if name != 'dashboard_investigator_cached'}
+        self.assertTrue(all(result['queries'] > 0 for result in uncached.values()))
+        # The session is in the cookie; the user and the dashboard come from the cache
+        self.assertEqual(results['scenarios']['dashboard_investigator_cached']['queries'], 0)
+        self.assertEqual(list(iec_records.objects.order_by('id').values_list('status', flat=True)), statuses)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.admin = CustomUser.objects.create_user('admin', password='pw', role='admin', location='co')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+
+    def test_records_latency_and_queries_per_view(self):
+        make_record(self.investigator, self.investigator)
+        self.client.force_login(self.investigator)
+        self.client.get(reverse('dashboard'))
+        self.client.get('/')
+        self.client.get('/no-such-page/')
+
+        requests, latency, queries, _ = metrics.registry.snapshot()
+        self.assertEqual(requests[('dashboard', 'GET', '2xx')], 1)
+        self.assertEqual(requests[('sdcmisapp.views.home', 'GET', '2xx')], 1)  # Its route is named ""
+        self.assertEqual(requests[(metrics.UNRESOLVED_VIEW, 'GET', '4xx')], 1)
+        self.assertEqual(latency['dashboard'].count, 1)
+        self.assertGreater(queries['dashboard'].sum, 0)
+
+    def test_endpoint_is_for_admins_only(self):
+        self.client.force_login(self.investigator)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sdcmis_request_duration_seconds_bucket{view="dashboard",le="+Inf"} 1', response.content.decode())
+
+    @override_settings(SDCMIS_METRICS_TOKEN='s3cret')
+    def test_scraper_token(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class CaseTransitionTests(TestCase):
+
+    def setUp(self):
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        self.record = make_record(self.creator, self.creator)
+
+    def route(self):
+        self.client.force_login(self.creator)
+        return self.client.post(reverse('acknowledge_and_route', args=[self.record.pk]), {'assign_to': self.investigator.pk})
+
+    def test_routing_appends_a_transition(self):
+        self.route()
+        transition = CaseTransition.objects.get(record=self.record)
+        self.assertEqual((transition.from_step, transition.to_step), (INITIAL_EVALUATION_STEP_KEY, NOTICE_PCI_STEP_KEY))
+        self.assertEqual((transition.from_assignee, transition.to_assignee, transition.actor), (self.creator, self.investigator, self.creator))
+        self.assertIsNotNone(transition.duration_seconds)
+
+        self.client.force_login(self.investigator)
+        self.client.post(reverse('submit_notice_pci', args=[self.record.pk]), {'precharge_no': 'PCI-1'})
+        timeline = list(CaseTransition.objects.timeline(self.record.pk).values_list('to_step', flat=True))
+        self.assertEqual(timeline, [NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY])
+
+        stats = {row['from_step']: row['cases'] for row in CaseTransition.objects.step_durations()}
+        self.assertEqual(stats, {INITIAL_EVALUATION_STEP_KEY: 1, NOTICE_PCI_STEP_KEY: 1})
+        self.assertContains(self.client.get(reverse('view_iec', args=[self.record.pk])), 'History')
+
+    def test_a_record_routed_in_the_meantime_is_not_routed_again(self):
+        stale = iec_records.objects.get(pk=self.record.pk)  # Fetched before the other routing
+        self.route()
+        form = RouteTaskForm({'assign_to': self.investigator.pk}, eligible_users_queryset=CustomUser.objects.all(), eligible_users_choices=[(self.investigator.pk, 'investigator')])
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.assertRaises(TransitionError):
+            views._route_case(stale, self.creator, form)
+        self.assertEqual(CaseTransition.objects.filter(record=self.record).count(), 1)
+
+    def test_transitions_are_append_only(self):
+        self.route()
+        transition = CaseTransition.objects.get(record=self.record)
+        with self.assertRaises(TypeError):
+            transition.save()
+        with self.assertRaises(TypeError):
+            CaseTransition.objects.all().delete()
+        # ...but go away with their case
+        self.record.delete()
+        self.assertFalse(CaseTransition.objects.exists())
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        self.director = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+
+    def rollup_rows(self):
+        step_rows = StepRollup.objects.exclude(cases=0, completed_on_time=0, completed_late=0)  # Emptied rows are kept
+        return (
+            set(step_rows.values_list('location', 'step', 'cases', 'completed_on_time', 'completed_late')),
+            set(DueDateRollup.objects.values_list('location', 'step', 'due_date', 'cases')),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        records = [make_record(self.creator, self.creator) for _ in range(3)]
+        generate_caseload(20, users_per_role=1, index_search=False)
+        self.client.force_login(self.creator)
+        self.client.post(reverse('acknowledge_and_route', args=[records[0].pk]), {'assign_to': self.investigator.pk})
+        records[1].delete()
+
+        incremental = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertEqual(rollups.national_overview()['totals']['cases'], 22)
+
+    def test_rollups_follow_a_creator_who_moves_or_is_deleted(self):
+        records = [make_record(self.creator, self.creator, due_date=date.today()) for _ in range(3)]
+        self.client.force_login(self.creator)
+        self.client.post(reverse('acknowledge_and_route', args=[records[0].pk]), {'assign_to': self.investigator.pk})
+        self.assertTrue(CaseTransition.objects.filter(record__created_by=self.creator, was_late__isnull=False).exists())
+
+        def assert_matches_rebuild():
+            incremental = self.rollup_rows()
+            rollups.rebuild()
+            self.assertEqual(incremental, self.rollup_rows())
+
+        self.creator.location = 'r7'
+        self.creator.save()
+        assert_matches_rebuild()
+
+        self.creator.delete()
+        self.assertEqual(StepRollup.objects.filter(location=rollups.NO_LOCATION).aggregate(Sum('cases'))['cases__sum'], 3)
+        assert_matches_rebuild()
+
+    def test_overview_reads_only_the_rollups(self):
+        self.client.force_login(self.director)
+        self.client.get(reverse('national_overview'))  # User query out of the way
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('national_overview'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'iec_records' in query['sql']])
+
+        self.client.force_login(self.investigator)
+        self.assertEqual(self.client.get(reverse('national_overview')).status_code, 403)
+
+
+class OverdueSweepTests(TestCase):
+
+    def test_sweep_flags_and_unflags_in_bulk(self):
+        creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        today = date.today()
+        late = make_record(creator, creator, due_date=today - timedelta(days=2))
+        on_time = make_record(creator, creator, due_date=today)
+        make_record(creator, creator, due_date=today - timedelta(days=2), status=RESOLVED_STEP_KEY)
+
+        self.assertEqual(sweep_overdue(today), (1, 0))
+        self.assertEqual(sweep_overdue(today), (0, 0))  # Idempotent
+        late.refresh_from_db()
+        self.assertTrue(late.is_overdue)
+        # Overdue since the day after its due date, not since the sweep ran
+        self.assertEqual(late.overdue_since, datetime.combine(today - timedelta(days=1), time(), tzinfo=dt_timezone.utc))
+
+        # A day later the other one is overdue too; the first keeps its original timestamp
+        self.assertEqual(sweep_overdue(today + timedelta(days=1)), (1, 0))
+        self.assertEqual(iec_records.objects.get(pk=late.pk).overdue_since, late.overdue_since)
+        self.assertEqual(iec_records.objects.get(pk=on_time.pk).overdue_since.date(), today + timedelta(days=1))
+
+        iec_records.objects.filter(pk=on_time.pk).update(status=RESOLVED_STEP_KEY)
+        self.assertEqual(sweep_overdue(today + timedelta(days=1)), (0, 1))
+        self.assertEqual(list(iec_records.objects.filter(is_overdue=True).values_list('pk', flat=True)), [late.pk])
+
+
+class BusinessDayTests(TestCase):
+
+    def test_offsets_skip_weekends_and_holidays(self):
+        friday = date(2025, 6, 6)
+        calendar = BusinessCalendar([date(2025, 6, 12)])  # Independence Day, a Thursday
+        self.assertEqual(calendar.offset(friday, 1), date(2025, 6, 9))
+        self.assertEqual(calendar.offset(date(2025, 6, 7), 0), date(2025, 6, 9))  # Saturday rolls to Monday
+        self.assertEqual(calendar.offset(friday, 5), date(2025, 6, 16))
+        self.assertEqual(calendar.offset_many([friday, date(2025, 6, 11)], [1, 1]), [date(2025, 6, 9), date(2025, 6, 13)])
+
+    @skipUnless(importlib.util.find_spec('numpy'), "numpy is not installed")
+    def test_numpy_offsets_match_the_loop(self):
+        holidays = [date(2025, 6, 12), date(2025, 6, 13), date(2025, 12, 25), date(2025, 12, 30)]
+        starts = [date(2025, 6, 1) + timedelta(days=n) for n in range(0, 240, 3)]
+        days = [n % 17 for n in range(len(starts))]
+        vectorized = BusinessCalendar(holidays)
+        loop = BusinessCalendar(holidays, use_numpy=False)
+        self.assertIsNotNone(vectorized._numpy_calendar)
+        self.assertEqual(vectorized.offset_many(starts, days), loop.offset_many(starts, days))
+        self.assertEqual([vectorized.offset(start, 3) for start in starts], [loop.offset(start, 3) for start in starts])
+
+    def test_recompute_moves_open_due_dates_after_a_calendar_change(self):
+        cache.clear()
+        creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        received = date(2025, 6, 11)
+        record = make_record(creator, creator, date_received=received, due_date=get_calendar().offset(received, 1))
+        self.assertEqual(record.due_date, date(2025, 6, 12))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(date=date(2025, 6, 12), name='Independence Day')
+        result = recompute_due_dates(batch_size=1)
+        self.assertEqual((result.checked, result.updated, result.skipped), (1, 1, 0))
+        record.refresh_from_db()
+        self.assertEqual(record.due_date, date(2025, 6, 13))
+
+        incremental = set(DueDateRollup.objects.values_list('location', 'step', 'due_date', 'cases'))
+        rollups.rebuild()
+        self.assertEqual(incremental, set(DueDateRollup.objects.values_list('location', 'step', 'due_date', 'cases')))
+
+    def test_recompute_on_an_unchanged_calendar_changes_nothing(self):
+        creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        generate_caseload(30, users_per_role=1, index_search=False)
+        record = make_record(creator, creator, due_date=get_calendar().offset(date.today(), 1))
+        advance(record, INITIAL_EVALUATION_STEP_KEY, assign_to=investigator, actor=creator)
+        # Counted from when the respondent received the notice, not from the day it was submitted
+        advance(record, NOTICE_PCI_STEP_KEY, start_date=date.today() - timedelta(days=10), actor=investigator)
+        due_dates = dict(iec_records.objects.values_list('pk', 'due_date'))
+
+        result = recompute_due_dates()
+        self.assertEqual(result.updated, 0)
+        self.assertEqual(dict(iec_records.objects.values_list('pk', 'due_date')), due_dates)
+
+
+class RoutingRosterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.investigator = CustomUser.objects.create_user('investigator', password='pw', role='pci_inv', location='ncr')
+        self.record = make_record(self.creator, self.creator)
+        self.client.force_login(self.creator)
+
+    def roster_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('acknowledge_and_route', args=[self.record.pk]))
+        return response, [query for query in queries.captured_queries if '"role" IN' in query['sql']]
+
+    def test_routing_form_renders_from_the_cached_roster(self):
+        self.roster_queries()
+        response, queries = self.roster_queries()
+        self.assertEqual(queries, [])
+        self.assertContains(response, f'<option value="{self.investigator.pk}">investigator</option>', html=True)
+
+    def test_roster_follows_user_changes(self):
+        self.roster_queries()
+        newcomer = CustomUser.objects.create_user('newcomer', password='pw', role='pci_inv', location='ncr', is_active=False)
+
+        # Activated in bulk by the admin action, which bypasses the signals
+        admin_user = CustomUser.objects.create_superuser('root', password='pw')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:sdcmisapp_customuser_changelist'), {'action': 'approve_selected_users', '_selected_action': [newcomer.pk]})
+        self.client.force_login(self.creator)
+        self.assertContains(self.roster_queries()[0], f'<option value="{newcomer.pk}">newcomer</option>', html=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.investigator.location = 'r1'
+            self.investigator.save()
+        self.assertNotContains(self.roster_queries()[0], f'<option value="{self.investigator.pk}">investigator</option>', html=True)
+
+
+class AutoAssignTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.busy = CustomUser.objects.create_user('busy', password='pw', role='pci_inv', location='ncr')
+        self.idle = CustomUser.objects.create_user('idle', password='pw', role='pci_inv', location='ncr')
+        # busy: two open cases; idle: one overdue case and resolved ones, which do not count
+        for _ in range(2):
+            make_record(self.creator, self.busy, status=NOTICE_PCI_STEP_KEY, due_date=date.today())
+        make_record(self.creator, self.idle, status=NOTICE_PCI_STEP_KEY, due_date=date.today() - timedelta(days=3))
+        for _ in range(3):
+            make_record(self.creator, self.idle, status=RESOLVED_STEP_KEY)
+        self.client.force_login(self.creator)
+
+    def auto_route(self):
+        record = make_record(self.creator, self.creator)
+        self.client.post(reverse('acknowledge_and_route', args=[record.pk]), {'auto_assign': 'on'})
+        return iec_records.objects.get(pk=record.pk).assigned_to
+
+    def test_auto_assign_picks_the_lightest_workload(self):
+        self.assertEqual(self.auto_route(), self.idle)
+        # Now both have two open cases: ties go by username
+        self.assertEqual(self.auto_route(), self.busy)
+
+    @override_settings(SDCMIS_AUTO_ASSIGN_OVERDUE_WEIGHT=2)
+    def test_overdue_cases_can_weigh_more(self):
+        self.assertEqual(self.auto_route(), self.busy)
+
+    def test_manual_choice_is_still_required_without_auto_assign(self):
+        record = make_record(self.creator, self.creator)
+        response = self.client.post(reverse('acknowledge_and_route', args=[record.pk]), {})
+        self.assertContains(response, "Select a user or choose automatic assignment.")
+
+
+class BulkRouteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.creator = CustomUser.objects.create_user('creator', password='pw', role='ier_inv', location='ncr')
+        self.investigators = [CustomUser.objects.create_user(f'investigator{n}', password='pw', role='pci_inv', location='ncr') for n in range(2)]
+        self.client.force_login(self.creator)
+
+    def bulk_route(self, records, **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bulk_route'), {'records': [record.pk for record in records], **data})
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_statements_do_not_grow_with_the_number_of_records(self):
+        self.bulk_route([make_record(self.creator, self.creator)], assign_to=self.investigators[0].pk)  # Creates the sequence and rollup rows
+        few = self.bulk_route([make_record(self.creator, self.creator) for _ in range(2)], assign_to=self.investigators[0].pk)
+        many = self.bulk_route([make_record(self.creator, self.creator) for _ in range(30)], assign_to=self.investigators[0].pk)
+        self.assertEqual(few, many)
+        self.assertEqual(iec_records.objects.filter(status=NOTICE_PCI_STEP_KEY, assigned_to=self.investigators[0]).count(), 33)
+        self.assertEqual(InitialEvaluationReport.objects.count(), 33)
+        self.assertEqual(PreChargeInvestigation.objects.exclude(precharge_no='').values('precharge_no').distinct().count(), 33)
+        self.assertEqual(CaseTransition.objects.filter(to_step=NOTICE_PCI_STEP_KEY).count(), 33)
+
+        counts = StepRollup.objects.exclude(cases=0).values_list('location', 'step', 'cases')
+        incremental = set(counts)
+        rollups.rebuild()
+        self.assertEqual(incremental, set(counts))
+
+    def test_records_are_checked_one_by_one_and_spread_when_auto_assigned(self):
+        other = CustomUser.objects.create_user('other', password='pw', role='ier_inv', location='ncr')
+        mine = [make_record(self.creator, self.creator) for _ in range(4)]
+        not_mine = make_record(other, other)
+        self.client.post(reverse('bulk_route'), {'records': [mine[0].pk], 'assign_to': self.investigators[0].pk})
+        response = self.client.post(reverse('bulk_route'), {'records': [record.pk for record in mine], 'auto_assign': 'on'}, follow=True)
+
+        self.assertContains(response, f"{mine[0].iec_ref} was not routed")  # Already routed
+        self.assertContains(response, "3 record(s) routed")
+        loads = sorted(iec_records.objects.filter(assigned_to__in=self.investigators).values_list('assigned_to__username', flat=True))
+        self.assertEqual(loads, ['investigator0', 'investigator0', 'investigator1', 'investigator1'])
+
+        # Records of other users are not accepted at all
+        response = self.client.post(reverse('bulk_route'), {'records': [not_mine.pk], 'assign_to': self.investigators[0].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(iec_records.objects.get(pk=not_mine.pk).status, INITIAL_EVALUATION_STEP_KEY)
+
+
+class CachedIdentityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.client.force_login(self.user)
+
+    def test_authenticated_page_makes_no_identity_queries(self):
+        self.client.get(reverse('search'))  # Caches the user
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('search'))
+        user = response.wsgi_request.user
+        self.assertEqual((user, user.role, user.location), (self.user, 'dir', 'ncr'))
+
+        # Neither the cache nor the user rebuilt from it hold the password hash
+        self.assertNotIn(self.user.password, repr(cache.get(backends._key(self.user.pk))))
+        self.assertNotIn('password', user.__dict__)
+
+    def test_user_changes_reach_the_next_request(self):
+        self.client.get(reverse('search'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertRedirects(self.client.get(reverse('search')), f"{reverse('login')}?next={reverse('search')}", fetch_redirect_response=False)
+
+    def test_startup_check_requires_a_shared_cache(self):
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}
+        with override_settings(CACHES={'default': redis}):
+            self.assertEqual(checks.check_shared_cache(None), [])
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with override_settings(CACHES={'default': redis, 'dashboards': locmem}, SDCMIS_DASHBOARD_CACHE='dashboards'):
+            self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['sdcmisapp.E001'])
+
+    def test_password_change_ends_existing_sessions(self):
+        self.client.get(reverse('search'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new')
+            self.user.save()
+        self.assertRedirects(self.client.get(reverse('search')), f"{reverse('login')}?next={reverse('search')}", fetch_redirect_response=False)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+
+    def setUp(self):
+        login_throttle.reset()
+        CustomUser.objects.create_user('active', password='right', role='dir', location='ncr')
+        CustomUser.objects.create_user('pending', password='right', role='dir', location='ncr', is_active=False)
+
+    def post_login(self, username, password):
+        """Posts the login form; returns (response, passwords hashed)."""
+        with mock.patch.object(MD5PasswordHasher, 'encode', autospec=True, side_effect=MD5PasswordHasher.encode) as encode:
+            response = self.client.post(reverse('login'), {'username': username, 'password': password})
+        return response, encode.call_count
+
+    def test_each_attempt_hashes_the_password_once(self):
+        for username, password in [('active', 'wrong'), ('pending', 'wrong'), ('nobody', 'right')]:
+            response, hashed = self.post_login(username, password)
+            self.assertEqual((response.status_code, hashed), (200, 1), username)
+            self.assertContains(response, 'Please enter a correct username and password')
+
+        response, hashed = self.post_login('pending', 'right')
+        self.assertEqual(hashed, 1)
+        self.assertContains(response, 'Your account is awaiting admin approval')
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+        response, hashed = self.post_login('active', 'right')
+        self.assertEqual(hashed, 1)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+    @override_settings(SDCMIS_LOGIN_THROTTLE={'username': (2, 300), 'ip': (4, 300)})
+    def test_bursts_are_refused_before_hashing(self):
+        for _ in range(2):
+            self.assertEqual(self.post_login('Active', 'wrong')[0].status_code, 200)
+        # The username's bucket is empty, whatever its case and even with the right password
+        response, hashed = self.post_login('active', 'right')
+        self.assertEqual((response.status_code, hashed), (429, 0))
+        self.assertContains(response, 'Too many login attempts', status_code=429)
+
+        # Other usernames go on until the address's bucket is empty too
+        self.assertEqual(self.post_login('pending', 'wrong')[0].status_code, 200)
+        self.assertEqual(self.post_login('nobody', 'wrong')[0].status_code, 200)
+        response, hashed = self.post_login('someone', 'wrong')
+        self.assertEqual((response.status_code, hashed), (429, 0))
+
+
+class ReplicaRoutingTests(TestCase):
+    """Which requests may read from a replica; the test database has no replica, so the router's decisions are checked."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('director', password='pw', role='dir', location='ncr')
+        self.client.force_login(self.user)
+
+    def test_router_reads_case_data_from_the_replica_until_the_request_writes(self):
+        router = replicas.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(iec_records))  # Outside a request
+        state, token = replicas.start_request()
+        try:
+            state.replica = 'replica'
+            self.assertEqual(router.db_for_read(iec_records), 'replica')
+            self.assertEqual(router.db_for_read(CustomUser), 'default')  # Authentication never waits for replication
+            self.assertEqual(router.db_for_write(iec_records), 'default')
+            self.assertEqual(router.db_for_read(iec_records), 'default')
+        finally:
+            replicas.end_request(token)
+
+    @override_settings(SDCMIS_READ_REPLICAS=['default'])  # Stands in for a replica alias
+    def test_only_reads_of_the_read_only_pages_use_a_replica(self):
+        def replica_of(response):
+            return response.wsgi_request._replica_state.replica
+
+        self.assertEqual(replica_of(self.client.get(reverse('dashboard'))), 'default')
+        response = self.client.get(reverse('export_iec_csv'))
+        b''.join(response.streaming_content)
+        self.assertEqual(replica_of(response), 'default')
+        self.assertIsNone(replica_of(self.client.get(reverse('bulk_route'))))
+
+        # A request that writes pins the client to the primary for a while
+        response = self.client.post(reverse('iec_addrecord'), {
+            'date_received': date.today().isoformat(), 'complainant': 'C', 'respondent': 'R', 'charge': 'Charge',
+        })
+        self.assertTrue(iec_records.objects.filter(complainant='C').exists())
+        self.assertIsNone(replica_of(response))
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], 5)
+        self.assertIsNone(replica_of(self.client.get(reverse('dashboard'))))
+
+    @override_settings(SDCMIS_READ_REPLICAS=['default'])
+    def test_dashboards_read_from_a_replica_are_not_cached(self):
+        make_record(self.user, self.user)
+
+        def dashboard_reads_records(pinned=False):
+            if pinned:
+                self.client.cookies[replicas.PIN_COOKIE] = '1'
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('dashboard'))
+            self.client.cookies.pop(replicas.PIN_COOKIE, None)
+            self.assertEqual(response.wsgi_request._replica_state.replica, None if pinned else 'default')
+            return any('iec_records' in query['sql'] for query in queries.captured_queries)
+
+        # The replica may lag behind the version tokens, so what it shows is built each time
+        self.assertTrue(dashboard_reads_records())
+        self.assertTrue(dashboard_reads_records())
+        # Built from the primary and cached, then served to replica reads too
+        self.assertTrue(dashboard_reads_records(pinned=True))
+        self.assertFalse(dashboard_reads_records())
@@ -0,0 +1,81 @@
+"""
+In-process token-bucket throttle for login attempts, checked by Loginform before
+the password is hashed, so a burst of guesses costs a dictionary lookup each
+instead of a PBKDF2 run.
+
+Every attempt takes a token from the bucket of the username and from the bucket
+of the client address; the attempt is refused when either is empty. Buckets
+refill continuously (SDCMIS_LOGIN_THROTTLE sets their size and refill period).
+
+Each worker process keeps its own buckets, so the effective limit is per worker;
+that is enough to stop a burst from pinning the CPUs. The client address is
+REMOTE_ADDR: behind a reverse proxy it should pass the client address on there.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# (attempts, seconds): a bucket holds this many attempts and refills that many in this many seconds
+DEFAULT_RATES = {
+    'username': (5, 300),
+    'ip': (30, 60),
+}
+
+# Buckets kept per kind; the least recently used are forgotten first (as if full again)
+MAX_BUCKETS = 10000
+
+
+def _rates():
+    return {**DEFAULT_RATES, **getattr(settings, 'SDCMIS_LOGIN_THROTTLE', {})}
+
+
+class LoginThrottle:
+    """Thread-safe username and address buckets. One lock, held for a few arithmetic operations per attempt."""
+
+    def __init__(self, max_buckets=MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._buckets = {kind: OrderedDict() for kind in DEFAULT_RATES}  # kind -> key -> (tokens, updated)
+
+    def _level(self, kind, key, now, rates):
+        """(tokens, seconds until the next token) in a bucket, refilled up to now."""
+        capacity, period = rates[kind]
+        tokens, updated = self._buckets[kind].get(key, (capacity, now))
+        per_second = capacity / period
+        tokens = min(capacity, tokens + (now - updated) * per_second)
+        return tokens, (1 - tokens) / per_second
+
+    def attempt(self, username, ip, now=None):
+        """
+        Takes a token for the attempt from both buckets. Returns 0 when the attempt may go
+        ahead, else the seconds until it may (and nothing is taken).
+        """
+        now = time.monotonic() if now is None else now
+        rates = _rates()
+        keys = {'username': username.strip().casefold(), 'ip': ip or ''}
+        with self._lock:
+            levels = {kind: self._level(kind, key, now, rates) for kind, key in keys.items()}
+            wait = max((seconds for tokens, seconds in levels.values() if tokens < 1), default=0)
+            if wait:
+                return wait
+            for kind, key in keys.items():
+                buckets = self._buckets[kind]
+                buckets[key] = (levels[kind][0] - 1, now)
+                buckets.move_to_end(key)
+                if len(buckets) > self.max_buckets:
+                    buckets.popitem(last=False)
+            return 0
+
+
+login_throttle = LoginThrottle()
+
+
+def client_address(request):
+    return request.META.get('REMOTE_ADDR') if request is not None else None
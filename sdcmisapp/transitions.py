@@ -0,0 +1,193 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import rollups
+from .business_days import add_working_days
+from .dashboard_cache import invalidate_dashboards
+from .models import iec_records, CaseTransition
+from .workflow_def import CASE_WORKFLOW
+
+
+# Who is allowed to act on a record at a given step
+ACTOR_CREATOR = 'creator'
+ACTOR_ASSIGNEE = 'assignee'
+
+
+class TransitionError(Exception):
+    """
+    Raised when a workflow action is not allowed for a record or user.
+    The message is meant to be shown to the user (e.g. via messages.error).
+    """
+
+
+def compute_due_date(step, start_date=None):
+    """Returns the due date for a step that starts on start_date (defaults to today), counted in working days."""
+    return add_working_days(start_date or date.today(), step.days_to_complete)
+
+
+def check_transition(record, user, step_key, actor=ACTOR_ASSIGNEE, action=None):
+    """
+    Validates that a record is at the given step and that the user may act on it.
+
+    Args:
+        record (iec_records): The case being acted on.
+        user (CustomUser): The user performing the action.
+        step_key (str): The step the record is expected to be at.
+        actor (str): ACTOR_CREATOR or ACTOR_ASSIGNEE, who may act at this step.
+        action (str): Optional description of the action for error messages
+                      (e.g. "submitting the Notice of PCI").
+
+    Returns:
+        TaskStep: The current step.
+
+    Raises:
+        TransitionError: If the step is not configured, the record is at another
+                         step, or the user is not the creator/assignee.
+    """
+    step = CASE_WORKFLOW.get_step(step_key)
+    if step is None:
+        raise TransitionError(f"Workflow '{step_key}' step is not configured. Cannot proceed.")
+
+    if actor == ACTOR_CREATOR and record.created_by_id != user.pk:
+        raise TransitionError(f"Only the creator of the record can perform {action or 'this action'}.")
+
+    if record.status != step.key:
+        current_step = CASE_WORKFLOW.get_step(record.status)
+        current_status_display = current_step.description if current_step else record.status
+        raise TransitionError(f"Record {record.iec_ref} (current status: '{current_status_display}') is not in the expected state ('{step.description}') for {action or 'this action'}.")
+
+    if actor == ACTOR_ASSIGNEE and record.assigned_to_id != user.pk:
+        assignee = record.assigned_to.username if record.assigned_to_id else 'N/A'
+        raise TransitionError(f"This task ('{step.description}') for {record.iec_ref} is not assigned to you. It is assigned to {assignee}.")
+
+    return step
+
+
+def entered_step_at(record):
+    """When the record entered its current step: its last transition, or its creation."""
+    last = CaseTransition.objects.timeline(record.pk).reverse().values_list('created_at', flat=True).first()
+    return last or record.date_created
+
+
+def build_transition(record, from_step, from_assignee_id, from_due_date, actor=None, entered_at=None, now=None, started_on=None):
+    """
+    Returns the unsaved CaseTransition for a record that has just moved on from from_step
+    (due on from_due_date) to a step whose due date was counted from started_on.
+    """
+    now = now or timezone.now()
+    entered_at = entered_at or entered_step_at(record)
+    return CaseTransition(
+        record=record,
+        from_step=from_step,
+        to_step=record.status,
+        from_assignee_id=from_assignee_id,
+        to_assignee_id=record.assigned_to_id,
+        actor=actor,
+        due_date=record.due_date,
+        step_started_on=started_on,
+        created_at=now,
+        duration_seconds=max(0, int((now - entered_at).total_seconds())) if entered_at else None,
+        was_late=timezone.localdate(now) > from_due_date if from_due_date else None,
+    )
+
+
+def advance(record, step_key, assign_to=None, start_date=None, actor=None):
+    """
+    Moves a record from step_key to the next workflow step, saves it and appends
+    a CaseTransition (call it inside the transaction of the action, so both are
+    saved or neither is).
+
+    The due date is the next step's duration counted from start_date (today if not given).
+    The assignee is only changed when assign_to is given. actor is the user acting.
+
+    Returns:
+        TaskStep: The step the record moved to.
+
+    Raises:
+        TransitionError: If the record is not at step_key or there is no next step.
+    """
+    if record.status != step_key:
+        raise TransitionError(f"Record {record.iec_ref} is no longer at step '{step_key}'.")
+
+    next_step = CASE_WORKFLOW.next_step(step_key)
+    if next_step is None:
+        current_step = CASE_WORKFLOW.get_step(step_key)
+        description = current_step.description if current_step else step_key
+        raise TransitionError(f"No subsequent step defined in the workflow after '{description}' for record {record.iec_ref}.")
+
+    from_assignee_id, from_due_date = record.assigned_to_id, record.due_date
+    start_date = start_date or date.today()
+    record.status = next_step.key
+    if assign_to is not None:
+        record.assigned_to = assign_to
+    record.due_date = compute_due_date(next_step, start_date)
+    # The new step starts on time; the next sweep_overdue flags it again if it falls behind
+    record.is_overdue, record.overdue_since = False, None
+    record.save(update_fields=['status', 'assigned_to', 'due_date', 'is_overdue', 'overdue_since'])
+    build_transition(record, step_key, from_assignee_id, from_due_date, actor=actor, started_on=start_date).save()
+    return next_step
+
+
+def advance_many(records, step_key, assign_to=None, start_date=None, actor=None):
+    """
+    advance() for many records at step_key: one bulk UPDATE of the records and one bulk
+    INSERT of their transitions, whatever their number. assign_to is None, one user for
+    all the records, or a list with one user per record. Call it inside a transaction.
+
+    bulk_update()/bulk_create() skip the signals, so the SLA rollups are updated and the
+    cached dashboards invalidated (after commit) here.
+
+    Returns:
+        TaskStep: The step the records moved to.
+
+    Raises:
+        TransitionError: If a record is not at step_key (nothing is saved) or there is no next step.
+    """
+    records = list(records)
+    for record in records:
+        if record.status != step_key:
+            raise TransitionError(f"Record {record.iec_ref} is no longer at step '{step_key}'.")
+    next_step = CASE_WORKFLOW.next_step(step_key)
+    if next_step is None:
+        current_step = CASE_WORKFLOW.get_step(step_key)
+        description = current_step.description if current_step else step_key
+        raise TransitionError(f"No subsequent step defined in the workflow after '{description}'.")
+    if not records:
+        return next_step
+
+    assignees = assign_to if isinstance(assign_to, (list, tuple)) else [assign_to] * len(records)
+    start_date = start_date or date.today()
+    due_date = compute_due_date(next_step, start_date)  # Same start, so the same due date for all
+    entered = dict(
+        CaseTransition.objects.filter(record__in=records).values('record_id').annotate(entered=Max('created_at')).values_list('record_id', 'entered')
+    )
+    now = timezone.now()
+
+    changes, transitions, user_ids = [], [], set()
+    for record, assignee in zip(records, assignees):
+        old_state = rollups.record_state(record)
+        from_assignee_id, from_due_date = record.assigned_to_id, record.due_date
+        record.status = next_step.key
+        if assignee is not None:
+            record.assigned_to = assignee
+        record.due_date = due_date
+        record.is_overdue, record.overdue_since = False, None
+        new_state = rollups.record_state(record)
+        changes.append((old_state, new_state))
+        record._loaded_rollup_state = new_state
+        transitions.append(build_transition(
+            record, step_key, from_assignee_id, from_due_date, actor=actor,
+            entered_at=entered.get(record.pk) or record.date_created, now=now, started_on=start_date,
+        ))
+        user_ids |= {record.created_by_id, from_assignee_id, record.assigned_to_id}
+        record._loaded_user_ids = (record.created_by_id, record.assigned_to_id)
+
+    iec_records.objects.bulk_update(records, ['status', 'assigned_to', 'due_date', 'is_overdue', 'overdue_since'], batch_size=500)
+    CaseTransition.objects.bulk_create(transitions, batch_size=500)
+    rollups.records_changed(changes)
+    rollups.transitions_recorded(transitions)
+    transaction.on_commit(lambda: invalidate_dashboards(user_ids))
+    return next_step
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import views, async_views, api
+
+# Under ASGI, the dashboard, record and workflow views can be served by their async versions
+case_views = async_views if getattr(settings, 'SDCMIS_ASYNC_VIEWS', False) else views
 
 urlpatterns = [
 
@@ -14,22 +18,38 @@ urlpatterns = [
 
     #crud
 
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', case_views.dashboard, name='dashboard'),
+
+    path('export/', views.export_iec_csv, name='export_iec_csv'),
 
     path('iec_addrecord/', views.iec_addrecord, name='iec_addrecord'),
 
     path('update_iec/<int:pk>', views.update_iec, name='update_iec'),
 
-    path('view_iec/<int:pk>', views.view_iec, name='view_iec'),
+    path('view_iec/<int:pk>', case_views.view_iec, name='view_iec'),
 
     path('delete_iec/<int:pk>', views.delete_iec, name='delete_iec'),
     
-    path('iec_record/<int:pk>/acknowledge_route/', views.acknowledge_and_route, name='acknowledge_and_route'),
+    path('iec_record/<int:pk>/acknowledge_route/', case_views.acknowledge_and_route, name='acknowledge_and_route'),
+
+    path('bulk_route/', views.bulk_route, name='bulk_route'),
     
-    path('iec_record/<int:pk>/submit_notice_pci/', views.submit_notice_pci, name='submit_notice_pci'),
+    path('iec_record/<int:pk>/submit_notice_pci/', case_views.submit_notice_pci, name='submit_notice_pci'),
     
-    path('iec_record/<int:pk>/submit_comment_affidavit/', views.submit_comment_counter_affidavit, name='submit_comment_affidavit'),
+    path('iec_record/<int:pk>/submit_comment_affidavit/', case_views.submit_comment_counter_affidavit, name='submit_comment_affidavit'),
+
+    path('search/', views.search_record, name='search'),
+
+    path('overview/', views.national_overview, name='national_overview'),
+
+    path('metrics', views.metrics, name='metrics'),
+
+    # read-only JSON API (see api.py)
+
+    path('api/records/', api.records, name='api_records'),
+
+    path('api/ier/', api.initial_evaluation_reports, name='api_ier'),
 
-    # path('search/', views.search_record, name='search'),
+    path('api/pci/', api.pre_charge_investigations, name='api_pci'),
     
 ]
@@ -1,16 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import StreamingHttpResponse, HttpResponse, HttpResponseForbidden
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 
-from .forms import CreateUserForm, Loginform, IEC_AddForm, IEC_UpdateForm, RouteTaskForm, NoticePCISubmissionForm, CommentCounterAffidavitSubmissionForm
+from .forms import CreateUserForm, Loginform, IEC_AddForm, IEC_UpdateForm, RouteTaskForm, BulkRouteTaskForm, NoticePCISubmissionForm, CommentCounterAffidavitSubmissionForm
 from django.contrib.auth.models import auth, Group
 from django.contrib.auth import authenticate
+from django.core.exceptions import NON_FIELD_ERRORS
 
 from django.contrib import messages
-from datetime import timedelta, date # For due_date calculation
+from datetime import date # For due_date calculation
+from django.db import transaction
 from django.db.models import Q # For complex lookups
 from django.contrib.auth.decorators import login_required
 
-from .models import iec_records, CustomUser, InitialEvaluationReport, PreChargeInvestigation
-from .workflow_def import get_initial_status_key, CASE_WORKFLOW_STEPS, get_task_step_by_key
+from .models import iec_records, CustomUser, InitialEvaluationReport, PreChargeInvestigation, CaseTransition, URGENCY_ORDERING, INVESTIGATOR_ROLES, PRECHARGE_NO_KIND
+from .workflow_def import get_initial_status_key, CASE_WORKFLOW, NOTICE_PCI_STEP_KEY, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY
+from .transitions import check_transition, advance, advance_many, compute_due_date, TransitionError, ACTOR_CREATOR
+from .pagination import KeysetPaginator, InvalidCursor, get_page_size
+from .summary import dashboard_summary
+from .dashboard_rows import dashboard_rows_queryset, build_dashboard_rows
+from .exports import iter_csv_lines
+from .search import search_ranking, SEARCH_ORDERING
+from . import dashboard_cache, rollups
+from .roster import routing_choices, ROUTING_ROLES
+from .assignment import least_loaded, spread
+from .sequences import reserve_references, location_code_for
+from .metrics import render_prometheus
 
 
 # home page
@@ -44,6 +60,7 @@ def register(request):
 
 def login(request):  
     form = Loginform()
+    status = 200
     
     if request.method == "POST":
         form = Loginform(request, data=request.POST)
@@ -64,9 +81,11 @@ def login(request):
             # The Loginform (AuthenticationForm) now has a custom error message for inactive users.
             # Its errors will be displayed by the template (e.g., via {{ form|crispy }} or {{ form.errors }}).
             # No need to add an additional message via django.contrib.messages for the inactive case here.
-            pass # Form is invalid, template will display form.errors
+            # Form is invalid, template will display form.errors
+            if form.has_error(NON_FIELD_ERRORS, 'throttled'):
+                status = 429
     context = {'form':form}
-    return render(request, 'sdcmisapp/login.html',context=context)
+    return render(request, 'sdcmisapp/login.html',context=context, status=status)
 
 # USER LOGOUT
 
@@ -78,103 +97,138 @@ def logout(request):
 
 #  DASHBOARD
 
+def _dashboard_listing(request, user, params, today):
+    """Returns the user's records queryset (for the summary) and the paginator for the listing."""
+    # Filter records based on user role (investigators only see their own/assigned records)
+    records_qs = iec_records.objects.for_user(user)
+
+    # ?sort=urgency lists open cases with the most overdue first; the default is newest first
+    ordering = ('-id',)
+    page_records_qs = records_qs.apply_list_filters(params, today)
+    if params.get('sort') == 'urgency':
+        ordering = URGENCY_ORDERING
+        page_records_qs = page_records_qs.open_with_due_date()
+
+    # Keyset pagination over a column projection: only one page of compact rows is loaded per request
+    paginator = KeysetPaginator(dashboard_rows_queryset(page_records_qs, today), page_size=get_page_size(request), ordering=ordering)
+    return records_qs, paginator
+
+
+def _build_dashboard_payload(request, user, params, today):
+    """The cacheable part of the dashboard: one page of rows plus the summary card numbers."""
+    records_qs, paginator = _dashboard_listing(request, user, params, today)
+    page = paginator.get_page(params.get('cursor')) # Raises InvalidCursor
+
+    return {
+        # Days remaining and action flags are read from the row data without extra queries
+        'records': build_dashboard_rows(page, user),
+        'page': page,
+        # --- Summary Card Data (single aggregate query) ---
+        **dashboard_summary(records_qs, user),
+    }
+
+
 @login_required(login_url='login')
 
 def dashboard(request):
     user = request.user
-    records_qs = iec_records.objects.all()
-
-    # Filter records based on user role
-    if user.role in ['ier_inv', 'pci_inv']:
-        records_qs = records_qs.filter(
-            Q(created_by=user) | Q(assigned_to=user)
-        ).distinct() # Use distinct() if a record could be created by and assigned to the same user
-    # Add more role-based filters here if needed for other roles (e.g., admin, dir)
-
-    records_qs = records_qs.order_by('-id') # Apply ordering after filtering
     today = date.today()
-    
-    # Get the initial status key from the workflow definition
-    initial_status_key = get_initial_status_key()
-    # print(f"\nDEBUG: Overall Initial Workflow Status Key: '{initial_status_key}'") # DEBUG REMOVED
-
-    # Calculate days remaining for each record
-    processed_records = []
-    for record in records_qs:
-        if record.due_date:
-            delta = record.due_date - today
-            record.days_remaining = delta.days
-            if record.days_remaining < 0:
-                record.overdue_days_count = abs(record.days_remaining)  # Store positive overdue days
-            # No need for an else for overdue_days_count if not overdue, template will handle
-        else:
-            # Ensure days_remaining is set if due_date is None
-            record.days_remaining = None # Handle cases where due_date might be null
-        
-        # --- DETAILED DEBUGGING FOR acknowledge_and_route BUTTON ---
-        # print(f"\n--- DEBUG: Processing Record ID: {record.id} (Ref: {record.iec_ref}) ---") # DEBUG REMOVED
-        # print(f"DEBUG: Current Logged-in User: '{user}' (ID: {user.id})") # DEBUG REMOVED
-        # print(f"DEBUG: Record Status: '{record.status}'") # DEBUG REMOVED
-        # print(f"DEBUG: Record Created By: '{record.created_by}' (ID: {record.created_by.id if record.created_by else 'N/A'})") # DEBUG REMOVED
-        
-        condition1_initial_key_exists = bool(initial_status_key)
-        condition2_status_matches = initial_status_key and record.status == initial_status_key
-        condition3_user_is_creator = record.created_by == user
 
-        # print(f"DEBUG: Condition 1 (Initial key exists?): {condition1_initial_key_exists}") # DEBUG REMOVED
-        # print(f"DEBUG: Condition 2 (Record status ('{record.status}') == Initial key ('{initial_status_key}')?): {condition2_status_matches}") # DEBUG REMOVED
-        # print(f"DEBUG: Condition 3 (Record created_by ('{record.created_by}') == Current user ('{user}')?): {condition3_user_is_creator}") # DEBUG REMOVED
-        
-        # Determine if the current user can acknowledge and route this record
-        record.can_acknowledge_and_route = False # Default to False
-        if condition1_initial_key_exists and condition2_status_matches and condition3_user_is_creator:
-            record.can_acknowledge_and_route = True
-        
-        # Determine if the current user can submit the Notice of PCI
-        record.can_submit_notice_pci = False
-        if len(CASE_WORKFLOW_STEPS) > 1 and \
-           record.status == CASE_WORKFLOW_STEPS[1].key and \
-           record.assigned_to == user: # Assuming index 1 is 'notice_pci'
-            record.can_submit_notice_pci = True
-
-        # Determine if the current user can submit Comment/Counter Affidavit
-        record.can_submit_comment_affidavit = False
-        expected_status_key_for_comment = "N/A (Workflow too short)"
-        if len(CASE_WORKFLOW_STEPS) > 2:
-            expected_status_key_for_comment = CASE_WORKFLOW_STEPS[2].key
-
-        condition_workflow_length = len(CASE_WORKFLOW_STEPS) > 2
-        condition_status_match = record.status == expected_status_key_for_comment if condition_workflow_length else False
-        condition_assignment_match = record.assigned_to == user
-
-        if condition_workflow_length and condition_status_match and condition_assignment_match:
-            record.can_submit_comment_affidavit = True
-        # --- END DETAILED DEBUGGING ---
-        processed_records.append(record)
-    
-    # --- Calculate Summary Card Data ---
-    total_ier_count = records_qs.count()
-    completed_ier_count = records_qs.filter(status='resolved').count() # Assuming 'resolved' is your final completed status
-    
-    # Active tasks: assigned to the user and not yet resolved
-    active_tasks_count = records_qs.filter(assigned_to=user).exclude(status='resolved').count()
-    
-    # Pending requests: created by the user and in the initial state, awaiting routing
-    pending_routing_count = 0
-    if initial_status_key: # Ensure initial_status_key is available
-        pending_routing_count = records_qs.filter(created_by=user, status=initial_status_key).count()
+    # Query string for the page links, keeping sort/filter options
+    params = request.GET.copy()
+    page_query = params.copy()
+    page_query.pop('cursor', None)
+
+    # The payload is cached per user and invalidated when one of their records changes (see signals.py)
+    try:
+        payload = dashboard_cache.get_or_build(user, params, today, lambda: _build_dashboard_payload(request, user, params, today))
+    except InvalidCursor:
+        messages.warning(request, "That page link is no longer valid. Showing the first page.")
+        payload = dashboard_cache.get_or_build(user, page_query, today, lambda: _build_dashboard_payload(request, user, page_query, today))
 
     context = {
-        'records': processed_records,
+        **payload,
+        'page_query': page_query.urlencode(),
+        'sort': params.get('sort'),
+        'overdue_only': bool(params.get('overdue')),
         'current_date': today, # Add today's date to the context
-        'total_ier_count': total_ier_count,
-        'completed_ier_count': completed_ier_count,
-        'active_tasks_count': active_tasks_count,
-        'pending_routing_count': pending_routing_count,
     }
 
     return render(request, 'sdcmisapp/dashboard.html', context=context) 
 
+# EXPORT (CSV)
+
+@login_required(login_url='login')
+
+def export_iec_csv(request):
+    # Same visibility and ?location= / ?status= / ?overdue= filters as the dashboard listing
+    records_qs = iec_records.objects.for_user(request.user).apply_list_filters(request.GET)
+
+    response = StreamingHttpResponse(iter_csv_lines(records_qs), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="iec_records_{date.today():%Y%m%d}.csv"'
+    return response
+
+# SEARCH
+
+@login_required(login_url='login')
+
+def search_record(request):
+    query = request.GET.get('q', '').strip()
+    records = []
+    page = None
+
+    if query:
+        # Rank matching record ids on the search index, one keyset page at a time
+        paginator = KeysetPaginator(search_ranking(query, request.user), page_size=get_page_size(request), ordering=SEARCH_ORDERING)
+        try:
+            page = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            page = paginator.get_page(None)
+
+        # Then load just that page's rows, keeping the ranking order
+        ids = [item['record_id'] for item in page]
+        rows_by_id = {row['id']: row for row in dashboard_rows_queryset(iec_records.objects.filter(id__in=ids))}
+        records = build_dashboard_rows([rows_by_id[record_id] for record_id in ids if record_id in rows_by_id], request.user)
+
+    page_query = request.GET.copy()
+    page_query.pop('cursor', None)
+
+    context = {
+        'query': query,
+        'records': records,
+        'page': page,
+        'page_query': page_query.urlencode(),
+    }
+    return render(request, 'sdcmisapp/search.html', context=context)
+
+# NATIONAL OVERVIEW (SLA rollups)
+
+@login_required(login_url='login')
+
+def national_overview(request):
+    # Investigators only see their own cases, so the all-locations overview is for the other roles
+    if request.user.role in INVESTIGATOR_ROLES:
+        return HttpResponseForbidden("The national overview is not available to investigators.")
+    today = date.today()
+    # Read from the rollup tables (see rollups.py), not from iec_records
+    context = {**rollups.national_overview(today), 'current_date': today}
+    return render(request, 'sdcmisapp/overview.html', context=context)
+
+# METRICS (Prometheus)
+
+def _is_metrics_scraper(request):
+    token = getattr(settings, 'SDCMIS_METRICS_TOKEN', '')
+    return bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def metrics(request):
+    # Admins (or Prometheus with the bearer token) only
+    user = request.user
+    is_admin = user.is_authenticated and (user.is_superuser or user.role == 'admin')
+    if not (is_admin or _is_metrics_scraper(request)):
+        return HttpResponseForbidden("Admins only.")
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # create record
 
 @login_required(login_url='login')
@@ -194,15 +248,11 @@ def  iec_addrecord(request):
             record.created_by = request.user
             record.assigned_to = request.user # Initially assign to the creator for the first step
 
-            initial_status_key = get_initial_status_key()
-            if initial_status_key:
-                record.status = initial_status_key
-                initial_step_config = get_task_step_by_key(initial_status_key)
-                if initial_step_config and record.date_received:
-                    record.due_date = record.date_received + timedelta(days=initial_step_config.days_to_complete)
-                elif record.date_received: # Fallback if step details not found (should ideally not happen)
-                    # Consider logging a warning here
-                    record.due_date = record.date_received + timedelta(days=2) # Original fallback
+            initial_step_config = CASE_WORKFLOW.initial_step
+            if initial_step_config:
+                record.status = initial_step_config.key
+                if record.date_received:
+                    record.due_date = compute_due_date(initial_step_config, record.date_received)
             else:
                 # This case should ideally be prevented by ensuring CASE_WORKFLOW_STEPS is not empty
                 messages.error(request, "Workflow is not configured correctly (no initial step).")
@@ -259,7 +309,10 @@ def view_iec(request,pk):
 
     all_records = iec_records.objects.get(id=pk)
 
-    context = {'iec_records': all_records}
+    context = {
+        'iec_records': all_records,
+        'transitions': CaseTransition.objects.timeline(pk).select_related('actor', 'to_assignee'), # Step history
+    }
 
     return render(request, 'sdcmisapp/view_iec.html', context=context)
 
@@ -279,6 +332,136 @@ def delete_iec(request,pk):
 
 # defining the steps
 
+def _eligible_routing_users(user):
+    """Active IER/PCI investigators in the user's location, other than the user, to route a case to."""
+    # Eligible users are active, in the same location as the current user (creator), with specific roles, excluding the current user.
+    # The form renders from the cached roster (roster.routing_choices()); this queryset validates the submitted choice.
+    user_location = user.location if hasattr(user, 'location') else None
+    if not user_location:
+        return CustomUser.objects.none()
+    return CustomUser.objects.filter(
+        Q(role__in=ROUTING_ROLES), # Filter by specified roles
+        is_active=True,
+        location=user_location
+    ).exclude(pk=user.pk).order_by('username')
+
+
+def _route_case(record, user, form):
+    """
+    Saves the Initial Evaluation Report and routes the case to the chosen investigator
+    (or, with auto_assign, the eligible one with the lightest workload).
+    Returns (next workflow step, whether the IER was created, assignee). Raises TransitionError.
+    """
+    # The IER, the PCI record and the routing are saved together or not at all
+    initial_status_key = get_initial_status_key()
+    with transaction.atomic():
+        # Locked and checked again, so a record routed concurrently (here or in bulk_route) is not routed twice
+        record = iec_records.objects.select_for_update().get(pk=record.pk)
+        check_transition(record, user, initial_status_key, actor=ACTOR_CREATOR, action="this routing action")
+        assignee = form.cleaned_data['assign_to']
+        if form.cleaned_data.get('auto_assign'):
+            # Inside the transaction: the candidates stay locked until the case is assigned
+            assignee = least_loaded(_eligible_routing_users(user))
+            if assignee is None:
+                raise TransitionError("There are no other active IER or PCI Investigators in your location to assign this task to.")
+        ier, ier_created = InitialEvaluationReport.objects.get_or_create(
+            iec_record=record,
+            defaults={
+                'submitted_by': user,
+                # submitted_on is auto_now_add
+                'director_approval_date': form.cleaned_data.get('director_approval_date'),
+                'remarks': form.cleaned_data.get('submission_remarks'),
+            }
+        )
+        next_workflow_step = advance(record, initial_status_key, assign_to=assignee, actor=user)
+
+        # If transitioning to a PCI step, ensure PreChargeInvestigation record exists
+        if next_workflow_step.key == NOTICE_PCI_STEP_KEY:
+            PreChargeInvestigation.objects.get_or_create(iec_record=record)
+    return next_workflow_step, ier_created, assignee
+
+
+# Most records shown (and routed) at once on the bulk routing page
+BULK_ROUTE_LIMIT = 200
+
+
+def _bulk_route_cases(record_ids, user, form):
+    """
+    Routes many records at once: the same checks as acknowledge_and_route for each record,
+    then bulk inserts of the missing IERs and PCIs and one bulk advance of the records.
+    Returns (next workflow step or None, routed records, [(record, error)] for the records skipped).
+    Raises TransitionError when nothing can be routed (e.g. no one to auto-assign to).
+    """
+    initial_status_key = get_initial_status_key()
+    with transaction.atomic():
+        # Locked, so a record routed concurrently (here or in acknowledge_and_route) is seen as such
+        records = list(iec_records.objects.select_for_update().filter(pk__in=record_ids).order_by('date_received', 'id'))
+        routable, skipped = [], []
+        for record in records:
+            try:
+                check_transition(record, user, initial_status_key, actor=ACTOR_CREATOR, action="this routing action")
+            except TransitionError as e:
+                skipped.append((record, str(e)))
+            else:
+                routable.append(record)
+        if not routable:
+            return None, [], skipped
+
+        if form.cleaned_data.get('auto_assign'):
+            assignees = spread(_eligible_routing_users(user), len(routable))
+            if not assignees:
+                raise TransitionError("There are no other active IER or PCI Investigators in your location to assign these tasks to.")
+        else:
+            assignees = form.cleaned_data['assign_to']
+
+        existing_iers = set(InitialEvaluationReport.objects.filter(iec_record__in=routable).values_list('iec_record_id', flat=True))
+        InitialEvaluationReport.objects.bulk_create([
+            InitialEvaluationReport(
+                iec_record=record,
+                submitted_by=user,
+                director_approval_date=form.cleaned_data.get('director_approval_date'),
+                remarks=form.cleaned_data.get('submission_remarks'),
+            )
+            for record in routable if record.pk not in existing_iers
+        ], batch_size=500)
+
+        next_workflow_step = advance_many(routable, initial_status_key, assign_to=assignees, actor=user)
+
+        if next_workflow_step.key == NOTICE_PCI_STEP_KEY:
+            existing_pcis = set(PreChargeInvestigation.objects.filter(iec_record__in=routable).values_list('iec_record_id', flat=True))
+            new_pcis = [PreChargeInvestigation(iec_record=record) for record in routable if record.pk not in existing_pcis]
+            # All the records are the user's (checked above), so one block of PCI numbers for their location
+            numbers = reserve_references(PRECHARGE_NO_KIND, location_code_for(user), date.today().year, len(new_pcis)) if new_pcis else []
+            for pci, number in zip(new_pcis, numbers):
+                pci.precharge_no = number
+            PreChargeInvestigation.objects.bulk_create(new_pcis, batch_size=500)
+    return next_workflow_step, routable, skipped
+
+
+def _save_notice_pci(iec_record, user, form):
+    """Saves the Notice of PCI and moves the case on. Returns the next workflow step. Raises TransitionError."""
+    with transaction.atomic():
+        updated_pci_record = form.save(commit=False)
+        updated_pci_record.notice_pci_submitted_by = user
+        updated_pci_record.notice_pci_submitted_on = date.today() # System date of submission
+        # precharge_no is handled by the form if it's editable.
+        updated_pci_record.save()
+
+        # Transition to the next step ('comment_counter_affidavit'). Assigned_to remains the same PCI investigator.
+        # Base due date on when respondent received notice, if available (falls back to today)
+        return advance(iec_record, NOTICE_PCI_STEP_KEY, start_date=updated_pci_record.notice_pci_respondent_received_on, actor=user)
+
+
+def _save_comment_counter_affidavit(iec_record, user, form):
+    """Saves the Comment/Counter Affidavit and moves the case on. Returns the next workflow step. Raises TransitionError."""
+    with transaction.atomic():
+        updated_pci_record = form.save() # Save changes to pci_record
+
+        # Transition to the next step ('pci_report_draft_charge').
+        # If no date received, the due date is based on today
+        return advance(iec_record, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, start_date=updated_pci_record.comment_counter_affidavit_received_on, actor=user)
+
+
 @login_required(login_url='login')
 def acknowledge_and_route(request, pk):
     record = get_object_or_404(iec_records, id=pk)
@@ -286,99 +469,37 @@ def acknowledge_and_route(request, pk):
     initial_status_key = get_initial_status_key()
 
     # --- Authorization and State Check ---
-    if record.created_by != user:
-        messages.error(request, "Only the creator of the record can perform this initial routing.")
-        return redirect('dashboard')
-
-    if not initial_status_key: # Should not happen if workflow is configured
-        messages.error(request, "Workflow initial step is not configured. Cannot proceed.")
-        return redirect('dashboard')
-        
-    if record.status != initial_status_key:
-        current_status_display = record.get_status_display()
-        expected_initial_step = get_task_step_by_key(initial_status_key)
-        expected_status_display = expected_initial_step.description if expected_initial_step else "the initial state"
-        messages.error(request, f"Record {record.iec_ref} (current status: '{current_status_display}') is not in the expected state ('{expected_status_display}') for this routing action.")
+    try:
+        check_transition(record, user, initial_status_key, actor=ACTOR_CREATOR, action="this routing action")
+    except TransitionError as e:
+        messages.error(request, str(e))
         return redirect('dashboard')
 
     # --- Determine eligible users for routing ---
-    # Eligible users are active, in the same location as the current user (creator), with specific roles, excluding the current user.
-    user_location = user.location if hasattr(user, 'location') else None
-    eligible_roles = ['ier_inv', 'pci_inv'] # Define the roles for routing
-    eligible_users_qs = CustomUser.objects.none()
-    if user_location:
-        eligible_users_qs = CustomUser.objects.filter(
-            Q(role__in=eligible_roles), # Filter by specified roles
-            is_active=True,
-            location=user_location
-        ).exclude(pk=user.pk).order_by('username')
+    eligible_users_qs = _eligible_routing_users(user)
+    eligible_users_choices = routing_choices(user)  # Cached, so rendering the form does not query the user table
 
     if request.method == "POST":
-        form = RouteTaskForm(request.POST, eligible_users_queryset=eligible_users_qs)
+        form = RouteTaskForm(request.POST, eligible_users_queryset=eligible_users_qs, eligible_users_choices=eligible_users_choices)
         if form.is_valid():
-            # Status check already done above.
-            if len(CASE_WORKFLOW_STEPS) > 1:
-                next_workflow_step = CASE_WORKFLOW_STEPS[1] # The step after initial (index 1)
-
-                # Create the InitialEvaluationReport instance
-                try:
-                    InitialEvaluationReport.objects.create(
-                        iec_record=record,
-                        submitted_by=request.user,
-                        # submitted_on is auto_now_add
-                        director_approval_date=form.cleaned_data.get('director_approval_date'),
-                        remarks=form.cleaned_data.get('submission_remarks')
-                    )
-                except Exception as e: # Catch potential integrity errors if trying to create a duplicate for OneToOneField
-                    # This might also catch if iec_record already has an IER.
-                    # Consider using get_or_create or updating if exists, if that's the desired behavior.
-                    # For OneToOne, create should typically only happen once.
-                    existing_ier = InitialEvaluationReport.objects.filter(iec_record=record).first()
-                    if existing_ier:
-                         messages.warning(request, f"Initial Evaluation Report for {record.iec_ref} already exists. Proceeding with routing.")
-                    else:
-                        messages.error(request, f"Could not save Initial Evaluation Report details. Error: {e}")
-                        return redirect('dashboard') # Or back to the form
-
-                # If transitioning to a PCI step, ensure PreChargeInvestigation record exists
-                if next_workflow_step.key == CASE_WORKFLOW_STEPS[1].key: # 'notice_pci'
-                    pci_obj, created = PreChargeInvestigation.objects.get_or_create(
-                        iec_record=record
-                        # You can add defaults here if other fields in PreChargeInvestigation
-                        # need specific values upon creation, e.g.,
-                        # defaults={'some_other_field': 'initial_value'}
-                    )
-                    # Defaults for precharge_no etc., will be handled by model or later forms
-                    # --- DEBUG: Confirm PreChargeInvestigation creation/retrieval ---
-                    # print(f"DEBUG (acknowledge_and_route): PreChargeInvestigation for IEC ID {record.id} (iec_ref: {record.iec_ref}): {'Created' if created else 'Retrieved'}.")
-                    # print(f"DEBUG (acknowledge_and_route): PCI Object details: PK={pci_obj.pk if pci_obj else 'N/A'}, iec_record_id={pci_obj.iec_record_id if pci_obj else 'N/A'}, precharge_no='{pci_obj.precharge_no if pci_obj else 'N/A'}'")
-                    # --- END DEBUG ---
-
-                
-                # Existing logic for routing the iec_record
-                next_assignee = form.cleaned_data['assign_to']
-                record.status = next_workflow_step.key
-                record.assigned_to = next_assignee
-                record.due_date = date.today() + timedelta(days=next_workflow_step.days_to_complete)
-                record.save()
-
-                # --- DEBUG: Confirm state after save in acknowledge_and_route ---
-                # print(f"DEBUG (acknowledge_and_route): IEC Record {record.iec_ref} saved. Status: {record.status}, Assigned To: {record.assigned_to.username if record.assigned_to else 'N/A'}")
-                # --- END DEBUG ---
-
-                messages.success(request, f"Initial Evaluation Report for {record.iec_ref} submitted and task routed to {next_assignee.username} for '{next_workflow_step.description}'.")
-                return redirect('dashboard')
-            else:
-                messages.error(request, f"No subsequent step defined in the workflow to route record {record.iec_ref} to.")
+            try:
+                next_workflow_step, ier_created, next_assignee = _route_case(record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
                 return redirect('dashboard')
+
+            if not ier_created:
+                messages.warning(request, f"Initial Evaluation Report for {record.iec_ref} already exists. Proceeding with routing.")
+            messages.success(request, f"Initial Evaluation Report for {record.iec_ref} submitted and task routed to {next_assignee.username} for '{next_workflow_step.description}'.")
+            return redirect('dashboard')
         else:
             messages.error(request, "Please correct the errors below.")
             # eligible_users_exist will be set before rendering
             # Fall through to render template with form errors
     else: # GET request
-        form = RouteTaskForm(eligible_users_queryset=eligible_users_qs)
+        form = RouteTaskForm(eligible_users_queryset=eligible_users_qs, eligible_users_choices=eligible_users_choices)
 
-    eligible_users_exist = eligible_users_qs.exists()
+    eligible_users_exist = bool(eligible_users_choices)
     if request.method == 'GET' and not eligible_users_exist: # Show warning only on initial load if no users
         messages.warning(request, "There are no other active IER or PCI Investigators in your location to route this task to.")
 
@@ -390,72 +511,77 @@ def acknowledge_and_route(request, pk):
     return render(request, 'sdcmisapp/acknowledge_route_confirm.html', context)
 
 
+@login_required(login_url='login')
+def bulk_route(request):
+    user = request.user
+    pending_records = iec_records.objects.filter(created_by=user, status=get_initial_status_key())
+    eligible_users_qs = _eligible_routing_users(user)
+    eligible_users_choices = routing_choices(user)
+
+    if request.method == "POST":
+        # Any of the user's records validates, so one routed in the meantime is reported as skipped rather than failing the form
+        form = BulkRouteTaskForm(
+            request.POST,
+            eligible_users_queryset=eligible_users_qs,
+            eligible_users_choices=eligible_users_choices,
+            records_queryset=iec_records.objects.filter(created_by=user),
+        )
+        if form.is_valid():
+            record_ids = [record.pk for record in form.cleaned_data['records']][:BULK_ROUTE_LIMIT]
+            try:
+                next_workflow_step, routed, skipped = _bulk_route_cases(record_ids, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
+                return redirect('bulk_route')
+
+            for record, error in skipped:
+                messages.warning(request, f"{record.iec_ref} was not routed: {error}")
+            if routed:
+                messages.success(request, f"{len(routed)} record(s) routed for '{next_workflow_step.description}'.")
+            return redirect('dashboard')
+        messages.error(request, "Please correct the errors below.")
+    else:
+        form = BulkRouteTaskForm(eligible_users_queryset=eligible_users_qs, eligible_users_choices=eligible_users_choices)
+
+    context = {
+        'form': form,
+        'records': pending_records.order_by('date_received', 'id')[:BULK_ROUTE_LIMIT],
+        'pending_count': pending_records.count(),
+        'limit': BULK_ROUTE_LIMIT,
+        'eligible_users_exist': bool(eligible_users_choices),
+    }
+    return render(request, 'sdcmisapp/bulk_route.html', context)
+
+
 @login_required(login_url='login')
 def submit_notice_pci(request, pk):
     iec_record = get_object_or_404(iec_records, id=pk)
     user = request.user
 
-    # --- DEBUG: State check at start of submit_notice_pci ---
-    # print(f"DEBUG (submit_notice_pci): Checking Record {iec_record.iec_ref} (ID: {pk})")
-    # print(f"DEBUG (submit_notice_pci): IEC Current Status: {iec_record.status}, IEC Assigned To: {iec_record.assigned_to.username if iec_record.assigned_to else 'N/A'}")
-    # --- END DEBUG ---
-
     try:
         pci_record = PreChargeInvestigation.objects.get(iec_record=iec_record)
     except PreChargeInvestigation.DoesNotExist:
         messages.error(request, f"Pre-Charge Investigation details not found for {iec_record.iec_ref}. This record should have been created when the case was assigned for PCI. Please contact admin.")
         return redirect('view_iec', pk=iec_record.id)
 
-    # Expected status for this action: 'notice_pci' (index 1 of CASE_WORKFLOW_STEPS)
-    expected_status_key = CASE_WORKFLOW_STEPS[1].key if len(CASE_WORKFLOW_STEPS) > 1 else None
-    current_step_config = get_task_step_by_key(expected_status_key) if expected_status_key else None
-
-    if not current_step_config:
-        messages.error(request, "Workflow 'Notice of PCI' step is not configured. Cannot proceed.")
-        return redirect('view_iec', pk=iec_record.id)
-
-    # --- DEBUG: Check if PCI record was found ---
-    # print(f"DEBUG (submit_notice_pci): PreChargeInvestigation record found in DB: {pci_record is not None}. PCI PK: {pci_record.pk if pci_record else 'N/A'}")
-    # --- END DEBUG ---
-
-    if iec_record.status != expected_status_key:
-        # print(f"DEBUG (submit_notice_pci): IEC Status check failed. Expected: '{expected_status_key}', Got: '{iec_record.status}'")
-        messages.error(request, f"Record {iec_record.iec_ref} (current status: '{iec_record.get_status_display()}') is not in the expected state ('{current_step_config.description}') for submitting the Notice of PCI.")
-        return redirect('view_iec', pk=iec_record.id)
-
-    if iec_record.assigned_to != user:
-        # print(f"DEBUG (submit_notice_pci): IEC Assignment check failed. Expected: '{user.username}', Got: '{iec_record.assigned_to.username if iec_record.assigned_to else 'N/A'}'")
-        messages.error(request, f"This task ('{current_step_config.description}') for {iec_record.iec_ref} is not assigned to you. It is assigned to {iec_record.assigned_to.username if iec_record.assigned_to else 'N/A'}.")
+    # Expected status for this action: 'notice_pci', assigned to the current user
+    try:
+        current_step_config = check_transition(iec_record, user, NOTICE_PCI_STEP_KEY, action="submitting the Notice of PCI")
+    except TransitionError as e:
+        messages.error(request, str(e))
         return redirect('view_iec', pk=iec_record.id)
 
     if request.method == "POST":
         form = NoticePCISubmissionForm(request.POST, instance=pci_record)
         if form.is_valid():
-            updated_pci_record = form.save(commit=False)
-            updated_pci_record.notice_pci_submitted_by = user
-            updated_pci_record.notice_pci_submitted_on = date.today() # System date of submission
-            # precharge_no is handled by the form if it's editable.
-            updated_pci_record.save()
-
-            # Transition to the next step: 'comment_counter_affidavit' (index 2)
-            if len(CASE_WORKFLOW_STEPS) > 2:
-                next_workflow_step = CASE_WORKFLOW_STEPS[2]
-                iec_record.status = next_workflow_step.key
-                # Due date for the next step. Assigned_to likely remains the same PCI investigator.
-                if updated_pci_record.notice_pci_respondent_received_on:
-                    # Base due date on when respondent received notice, if available
-                    iec_record.due_date = updated_pci_record.notice_pci_respondent_received_on + timedelta(days=next_workflow_step.days_to_complete)
-                else:
-                    # Fallback to today if respondent received date is not set
-                    iec_record.due_date = date.today() + timedelta(days=next_workflow_step.days_to_complete)
-                
-                # iec_record.assigned_to remains the same for now for the PCI investigator.
-                iec_record.save()
-                messages.success(request, f"Notice of Pre-Charge Investigation for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
-                return redirect('dashboard') # Or your desired success page
-            else:
-                messages.error(request, "Workflow next step ('Comment/Counter Affidavit') is not configured.")
-                return redirect('dashboard') # Or an appropriate error/info page
+            try:
+                next_workflow_step = _save_notice_pci(iec_record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
+                return redirect('dashboard')
+
+            messages.success(request, f"Notice of Pre-Charge Investigation for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
+            return redirect('dashboard') # Or your desired success page
         else:
             messages.error(request, "Please correct the errors below.")
     else: # GET request
@@ -481,50 +607,24 @@ def submit_comment_counter_affidavit(request, pk):
         messages.error(request, f"Pre-Charge Investigation details not found for {iec_record.iec_ref}. Please contact admin.")
         return redirect('view_iec', pk=iec_record.id)
 
-    # Expected status for this action: 'comment_counter_affidavit' (index 2 of CASE_WORKFLOW_STEPS)
-    if len(CASE_WORKFLOW_STEPS) <= 2: # Current step is index 2
-        messages.error(request, "Workflow 'Comment/Counter Affidavit' step is not configured correctly.")
-        return redirect('view_iec', pk=iec_record.id)
-    
-    current_workflow_step_index = 2
-    expected_status_key = CASE_WORKFLOW_STEPS[current_workflow_step_index].key
-    current_step_config = get_task_step_by_key(expected_status_key)
-
-    if not current_step_config:
-        messages.error(request, "Workflow 'Comment/Counter Affidavit' step configuration is missing.")
-        return redirect('view_iec', pk=iec_record.id)
-
-    # Authorization checks
-    if iec_record.status != expected_status_key:
-        messages.error(request, f"Record {iec_record.iec_ref} (current status: '{iec_record.get_status_display()}') is not in the expected state ('{current_step_config.description}') for submitting the Comment/Counter Affidavit.")
-        return redirect('view_iec', pk=iec_record.id)
-
-    if iec_record.assigned_to != user:
-        messages.error(request, f"This task ('{current_step_config.description}') for {iec_record.iec_ref} is not assigned to you. It is assigned to {iec_record.assigned_to.username if iec_record.assigned_to else 'N/A'}.")
+    # Expected status for this action: 'comment_counter_affidavit', assigned to the current user
+    try:
+        current_step_config = check_transition(iec_record, user, COMMENT_COUNTER_AFFIDAVIT_STEP_KEY, action="submitting the Comment/Counter Affidavit")
+    except TransitionError as e:
+        messages.error(request, str(e))
         return redirect('view_iec', pk=iec_record.id)
 
     if request.method == "POST":
         form = CommentCounterAffidavitSubmissionForm(request.POST, instance=pci_record)
         if form.is_valid():
-            updated_pci_record = form.save() # Save changes to pci_record
-
-            # Transition to the next step: 'pci_report_draft_charge' (index 3)
-            if len(CASE_WORKFLOW_STEPS) > (current_workflow_step_index + 1):
-                next_workflow_step_index = current_workflow_step_index + 1
-                next_workflow_step = CASE_WORKFLOW_STEPS[next_workflow_step_index]
-                
-                iec_record.status = next_workflow_step.key
-                if updated_pci_record.comment_counter_affidavit_received_on:
-                    iec_record.due_date = updated_pci_record.comment_counter_affidavit_received_on + timedelta(days=next_workflow_step.days_to_complete)
-                else: # If no date received, base due date on today
-                    iec_record.due_date = date.today() + timedelta(days=next_workflow_step.days_to_complete)
-                
-                iec_record.save()
-                messages.success(request, f"Comment/Counter Affidavit for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
-                return redirect('dashboard')
-            else:
-                messages.error(request, f"Workflow next step after '{current_step_config.description}' is not configured.")
+            try:
+                next_workflow_step = _save_comment_counter_affidavit(iec_record, user, form)
+            except TransitionError as e:
+                messages.error(request, str(e))
                 return redirect('dashboard')
+
+            messages.success(request, f"Comment/Counter Affidavit for {iec_record.iec_ref} submitted. Case moved to '{next_workflow_step.description}'.")
+            return redirect('dashboard')
         else:
             messages.error(request, "Please correct the errors below.")
     else: # GET request
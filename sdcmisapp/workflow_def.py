@@ -51,17 +51,78 @@ CASE_WORKFLOW_STEPS = [
     TaskStep("resolved", "Resolved", 15),
 ]
 
+class CompiledWorkflow:
+    """
+    A workflow compiled once into lookup tables, so finding a step, the step
+    after it, or its position is a dictionary lookup instead of a list scan.
+    """
+    def __init__(self, steps):
+        """
+        Args:
+            steps (list[TaskStep]): The ordered steps of the workflow.
+
+        Raises:
+            ValueError: If two steps share the same key.
+        """
+        self.steps = tuple(steps)
+        self._step_by_key = {step.key: step for step in self.steps}
+        if len(self._step_by_key) != len(self.steps):
+            raise ValueError("Workflow step keys must be unique.")
+        self._index_by_key = {step.key: index for index, step in enumerate(self.steps)}
+        self._next_by_key = {
+            step.key: self.steps[index + 1] if index + 1 < len(self.steps) else None
+            for index, step in enumerate(self.steps)
+        }
+
+    def __contains__(self, key):
+        return key in self._step_by_key
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def initial_step(self):
+        """The first step of the workflow, or None for an empty workflow."""
+        return self.steps[0] if self.steps else None
+
+    @property
+    def final_step(self):
+        """The last step of the workflow, or None for an empty workflow."""
+        return self.steps[-1] if self.steps else None
+
+    def get_step(self, key):
+        """Returns the TaskStep for a key, or None if the key is unknown."""
+        return self._step_by_key.get(key)
+
+    def next_step(self, key):
+        """Returns the TaskStep following the given key, or None for the last/unknown step."""
+        return self._next_by_key.get(key)
+
+    def index_of(self, key):
+        """Returns the position of the step in the workflow, or None if the key is unknown."""
+        return self._index_by_key.get(key)
+
+    def is_final(self, key):
+        return self.final_step is not None and key == self.final_step.key
+
+
+# Compiled once at import time; use this for all step lookups
+CASE_WORKFLOW = CompiledWorkflow(CASE_WORKFLOW_STEPS)
+
+# Keys of the steps that have dedicated views
+INITIAL_EVALUATION_STEP_KEY = "initial_evaluation"
+NOTICE_PCI_STEP_KEY = "notice_pci"
+COMMENT_COUNTER_AFFIDAVIT_STEP_KEY = "comment_counter_affidavit"
+RESOLVED_STEP_KEY = "resolved"
+
 def get_status_choices():
     """Returns a list of choices for the status field based on CASE_WORKFLOW_STEPS."""
     return [(step.key, step.description) for step in CASE_WORKFLOW_STEPS]
 
 def get_initial_status_key():
     """Returns the key of the first step in the workflow."""
-    return CASE_WORKFLOW_STEPS[0].key if CASE_WORKFLOW_STEPS else None
+    return CASE_WORKFLOW.initial_step.key if CASE_WORKFLOW.initial_step else None
 
 def get_task_step_by_key(key: str) -> TaskStep | None:
     """Retrieves a TaskStep object by its key."""
-    for step in CASE_WORKFLOW_STEPS:
-        if step.key == key:
-            return step
-    return None
\ No newline at end of file
+    return CASE_WORKFLOW.get_step(key)